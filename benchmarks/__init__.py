@@ -0,0 +1,3 @@
+from __future__ import annotations
+
+"""Performance benchmarks for stub generation; run ``python -m benchmarks.run``."""
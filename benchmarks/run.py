@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+"""Benchmark stub generation on synthetic modules.
+
+Each case is written to a temporary directory and stubbed ``--repeat`` times
+with a fresh import; the fastest repeat of every phase is reported together
+with its peak ``tracemalloc`` allocation.  ``--baseline`` compares the results
+with a stored ``--json`` file and exits with status 1 on a regression::
+
+    python -m benchmarks.run --scale 2000 --json baseline.json
+    python -m benchmarks.run --scale 2000 --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from .synthetic import available_cases, generate
+
+# Bump when the result layout changes.
+_FORMAT = 1
+
+
+def _drop(name: str) -> None:
+    from macrotype.meta_types import clear_module_overloads
+
+    sys.modules.pop(name, None)
+    clear_module_overloads(name)
+
+
+def run_case(case: str, scale: int, workdir: Path, *, repeat: int = 3) -> dict[str, Any]:
+    """Stub the *case* module at *scale* and return its best phase timings."""
+    from macrotype.profiling import PassProfiler
+    from macrotype.stubgen import process_file
+
+    name = f"mt_bench_{case}"
+    src = workdir / f"{name}.py"
+    src.write_text(generate(case, scale))
+    phases: dict[str, dict[str, float]] = {}
+    totals: list[float] = []
+    peak = 0
+    for _ in range(repeat):
+        _drop(name)
+        profile = PassProfiler()
+        try:
+            process_file(src, workdir / f"{name}.pyi", profile=profile)
+        finally:
+            profile.close()
+            _drop(name)
+        stats = profile.by_phase()
+        totals.append(sum(s.wall for s in stats.values()))
+        for phase, s in stats.items():
+            best = phases.setdefault(phase, {"wall": s.wall, "peak": s.peak})
+            best["wall"] = min(best["wall"], s.wall)
+            best["peak"] = max(best["peak"], s.peak)
+            peak = max(peak, s.peak)
+    return {
+        "lines": src.read_text().count("\n"),
+        "total": min(totals),
+        "peak": peak,
+        "phases": phases,
+    }
+
+
+def run(scale: int, *, cases: list[str] | None = None, repeat: int = 3) -> dict[str, Any]:
+    """Benchmark *cases* (default: all available) and return the results."""
+    cases = cases or available_cases()
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="macrotype-bench-") as tmp:
+        workdir = Path(tmp)
+        sys.path.insert(0, tmp)
+        try:
+            for case in cases:
+                results[case] = run_case(case, scale, workdir, repeat=repeat)
+        finally:
+            sys.path.remove(tmp)
+    return {
+        "format": _FORMAT,
+        "scale": scale,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "cases": results,
+    }
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    threshold: float = 0.25,
+    min_time: float = 0.005,
+) -> list[str]:
+    """Return a message for every measurement more than *threshold* worse than *baseline*.
+
+    Times are compared per case and per phase; phases that took less than
+    *min_time* seconds in the baseline are too noisy and skipped.  Peak memory
+    is compared per case.
+    """
+    regressions: list[str] = []
+    limit = 1 + threshold
+    for case, cur in current["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if base is None:
+            continue
+        checks = [(f"{case} total", cur["total"], base["total"])]
+        for phase, stats in cur["phases"].items():
+            old = base["phases"].get(phase)
+            if old is not None:
+                checks.append((f"{case} {phase}", stats["wall"], old["wall"]))
+        for label, new, old in checks:
+            if old >= min_time and new > old * limit:
+                regressions.append(
+                    f"{label}: {new * 1000:.1f} ms vs {old * 1000:.1f} ms (+{new / old - 1:.0%})"
+                )
+        if base["peak"] and cur["peak"] > base["peak"] * limit:
+            regressions.append(
+                f"{case} peak memory: {cur['peak'] / 1024:.0f} KiB vs "
+                f"{base['peak'] / 1024:.0f} KiB (+{cur['peak'] / base['peak'] - 1:.0%})"
+            )
+    return regressions
+
+
+def format_results(results: dict[str, Any], *, phases: int = 5) -> str:
+    """Format case totals and the *phases* slowest phases of each case."""
+    lines = [f"{'case':<14} {'lines':>8} {'time ms':>10} {'peak KiB':>10}  slowest phases"]
+    for case, r in results["cases"].items():
+        slowest = sorted(r["phases"].items(), key=lambda kv: kv[1]["wall"], reverse=True)
+        summary = ", ".join(f"{name} {s['wall'] * 1000:.1f}" for name, s in slowest[:phases])
+        lines.append(
+            f"{case:<14} {r['lines']:>8} {r['total'] * 1000:>10.1f} "
+            f"{r['peak'] / 1024:>10.1f}  {summary}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__)
+    parser.add_argument("--scale", type=int, default=1000, help="Size of the synthetic modules")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best is kept")
+    parser.add_argument(
+        "--case",
+        action="append",
+        choices=available_cases(),
+        help="Only run this case (may be repeated)",
+    )
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="Compare with results stored by --json")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown relative to the baseline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.005,
+        help="Ignore phases faster than this many seconds in the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.scale, cases=args.case, repeat=args.repeat)
+    print(format_results(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, sort_keys=True))
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("scale") != args.scale:
+            print(
+                f"warning: baseline was recorded at scale {baseline.get('scale')}",
+                file=sys.stderr,
+            )
+        regressions = compare(results, baseline, threshold=args.threshold, min_time=args.min_time)
+        for message in regressions:
+            print(f"regression: {message}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+
+__all__ = ["compare", "format_results", "main", "run", "run_case"]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+"""Generate synthetic modules that stress the stub generation pipeline."""
+
+import importlib.util
+from typing import Callable
+
+
+def _nested(depth: int, leaf: str = "int") -> str:
+    shapes = ("list[{}]", "dict[str, {}]", "tuple[{}, ...]", "set[{}] | None", "Mapping[str, {}]")
+    ann = leaf
+    for level in range(depth):
+        ann = shapes[level % len(shapes)].format(ann)
+    return ann
+
+
+def functions_module(scale: int) -> str:
+    lines = ["from collections.abc import Callable, Mapping, Sequence", ""]
+    for i in range(scale):
+        lines += [
+            f"def func_{i}(a: int, b: str = 'x', *args: float, key: bytes | None = None, "
+            f"**kw: Sequence[int]) -> Mapping[str, list[int]] | None:",
+            f"    return None  # result of {i}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def generics_module(scale: int, depth: int = 8) -> str:
+    lines = [
+        "from collections.abc import Callable, Mapping",
+        "from typing import Generic, TypeVar",
+        "",
+        "T = TypeVar('T')",
+        "",
+        "class Box(Generic[T]):",
+        "    item: T",
+        "",
+    ]
+    for i in range(scale):
+        ann = _nested(depth - i % 3)
+        lines += [
+            f"type Alias{i} = {ann}",
+            f"value_{i}: Box[{ann}] | None = None",
+            f"def nested_{i}(x: Callable[[{ann}], Box[T]], y: T) -> dict[str, Box[T]]: ...",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def enums_module(scale: int, members: int = 200) -> str:
+    lines = ["from enum import Enum, IntFlag", ""]
+    for i in range(max(1, scale // 50)):
+        lines.append(f"class Color{i}(Enum):")
+        lines += [f"    MEMBER_{j} = {j}  # member {j}" for j in range(members)]
+        lines.append("")
+        lines.append(f"class Perm{i}(IntFlag):")
+        lines += [f"    BIT_{j} = {1 << (j % 60)}" for j in range(60)]
+        lines.append("")
+    return "\n".join(lines)
+
+
+def dataclasses_module(scale: int) -> str:
+    lines = [
+        "from dataclasses import dataclass, field",
+        "from typing import NotRequired, TypedDict",
+        "",
+    ]
+    for i in range(scale):
+        prev = f"Record{i - 1}" if i else "int"
+        lines += [
+            "@dataclass(frozen=True)",
+            f"class Record{i}:",
+            "    id: int",
+            "    name: str = ''",
+            "    tags: list[str] = field(default_factory=list)",
+            f"    parent: {prev} | None = None",
+            "",
+            f"class Payload{i}(TypedDict, total=False):",
+            "    id: int",
+            "    name: str",
+            "    extra: NotRequired[dict[str, list[int]]]",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def overloads_module(scale: int, variants: int = 6) -> str:
+    kinds = ("int", "str", "bytes", "float", "list[int]", "dict[str, int]", "tuple[int, str]")
+    lines = ["from typing import overload", ""]
+    for i in range(scale):
+        for j in range(variants):
+            kind = kinds[j % len(kinds)]
+            lines += [
+                "@overload",
+                f"def convert_{i}(x: {kind}, *, strict: bool = ...) -> {kind}: ...",
+            ]
+        lines += [f"def convert_{i}(x, *, strict=False):", "    return x", ""]
+    return "\n".join(lines)
+
+
+def sqlalchemy_module(scale: int) -> str:
+    lines = [
+        "from sqlalchemy import ForeignKey",
+        "from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship",
+        "",
+        "class Base(DeclarativeBase):",
+        "    pass",
+        "",
+    ]
+    for i in range(scale):
+        lines += [
+            f"class Model{i}(Base):",
+            f"    __tablename__ = 'model_{i}'",
+            "    id: Mapped[int] = mapped_column(primary_key=True)",
+            "    name: Mapped[str]",
+            "    note: Mapped[str | None]",
+            "    score: Mapped[float] = mapped_column(default=0.0)",
+        ]
+        if i:
+            lines += [
+                f"    parent_id: Mapped[int] = mapped_column(ForeignKey('model_{i - 1}.id'))",
+                f"    parent: Mapped['Model{i - 1}'] = relationship()",
+            ]
+        lines.append("")
+    return "\n".join(lines)
+
+
+# Each case maps to a generator and the fraction of ``scale`` it uses.
+CASES: dict[str, tuple[Callable[[int], str], float]] = {
+    "functions": (functions_module, 1.0),
+    "generics": (generics_module, 0.25),
+    "enums": (enums_module, 1.0),
+    "dataclasses": (dataclasses_module, 0.25),
+    "overloads": (overloads_module, 0.25),
+    "sqlalchemy": (sqlalchemy_module, 0.1),
+}
+
+
+def available_cases() -> list[str]:
+    """Return the cases whose dependencies are installed."""
+    cases = list(CASES)
+    if importlib.util.find_spec("sqlalchemy") is None:
+        cases.remove("sqlalchemy")
+    return cases
+
+
+def generate(case: str, scale: int) -> str:
+    """Return the source of the *case* module at *scale*."""
+    fn, factor = CASES[case]
+    return fn(max(1, int(scale * factor))) + "\n"
+
+
+__all__ = ["CASES", "available_cases", "generate"]
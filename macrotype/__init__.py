@@ -2,6 +2,17 @@
 
 from types import ModuleType
 
-from .modules import from_module
+__all__ = ["from_module", "generate_many", "ModuleType"]
 
-__all__ = ["from_module", "ModuleType"]
+
+def __getattr__(name: str):
+    # Imported lazily so ``macrotype daemon`` clients start quickly.
+    if name == "from_module":
+        from .modules import from_module
+
+        return from_module
+    if name == "generate_many":
+        from .stubgen import generate_many
+
+        return generate_many
+    raise AttributeError(name)
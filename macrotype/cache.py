@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+"""Persistent, content-addressed cache of generated stub lines."""
+
+import ast
+import hashlib
+import json
+import os
+import sys
+import sysconfig
+from dataclasses import dataclass
+from importlib.machinery import ModuleSpec, PathFinder
+from pathlib import Path
+from typing import Callable
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump when the on-disk layout changes.
+_FORMAT = "2"
+
+
+@dataclass(kw_only=True)
+class CacheEntry:
+    """Cached outcome of generating stubs for one module."""
+
+    lines: list[str] | None = None
+    error: str | None = None
+    plugin: bool = False
+    deps: list[str] | None = None
+    # How the stub was generated, see ``_file_module_decl``; not cached.
+    static: bool | None = None
+    # The failure depends on the environment rather than the source, e.g. a
+    # missing third-party package; such entries are not cached.
+    transient: bool = False
+
+    def result(self) -> list[str]:
+        """Return the cached lines or re-raise the cached failure."""
+        if self.lines is not None:
+            return self.lines
+        if self.plugin:
+            from .stubgen import MypyPluginError
+
+            raise MypyPluginError(self.error)
+        raise RuntimeError(self.error)
+
+
+def _sha(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _external_roots() -> tuple[str, ...]:
+    paths = sysconfig.get_paths()
+    roots = {paths[k] for k in ("stdlib", "platstdlib", "purelib", "platlib") if k in paths}
+    return tuple(sorted(roots))
+
+
+def _macrotype_fingerprint() -> str:
+    """Fingerprint of the installed macrotype sources."""
+    pkg = Path(__file__).parent
+    parts = []
+    for path in sorted(pkg.rglob("*.py")):
+        st = path.stat()
+        parts.append(f"{path.relative_to(pkg)}:{st.st_mtime_ns}:{st.st_size}")
+    return _sha(*parts)
+
+
+def imported_module_names(tree: ast.AST, module_name: str, *, is_package: bool) -> set[str]:
+    """Return every module name that ``tree`` may import.
+
+    Relative imports are resolved against *module_name*.  For ``from a import b``
+    both ``a`` and ``a.b`` are reported since ``b`` may be a submodule.
+    """
+
+    package = module_name if is_package else module_name.rpartition(".")[0]
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                parts = package.split(".") if package else []
+                if node.level - 1 > len(parts):
+                    continue
+                base_parts = parts[: len(parts) - (node.level - 1)]
+                if node.module:
+                    base_parts.append(node.module)
+                base = ".".join(base_parts)
+            else:
+                base = node.module or ""
+            if not base:
+                continue
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+    return names
+
+
+class StubCache:
+    """Cache stub lines keyed on source, interpreter, macrotype and dependencies.
+
+    Entries live under *root* as small JSON files.  The key of a module combines
+    the hash of its source, the options it was generated with, the Python and
+    macrotype versions, and fingerprints of every module it transitively
+    imports: project modules by content hash and installed ones by path, size
+    and mtime.  Failures are cached too so known-broken modules are not
+    re-imported on every run, except import errors, which may go away with
+    an installed package or a different ``sys.path``.  When the cache grows beyond *max_bytes* the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._env = _sha(_FORMAT, sys.version, _macrotype_fingerprint())
+        self._external = _external_roots()
+        self._origins: dict[str, str | None] = {}
+        self._specs: dict[str, ModuleSpec | None] = {}
+        self._digests: dict[str, str] = {}
+        self._deps: dict[str, frozenset[str]] = {}
+        self._keys: dict[tuple[str, str, str], str | None] = {}
+        self._size: int | None = None
+        self.hits = 0
+        self.misses = 0
+
+    # -- public API -----------------------------------------------------
+
+    def get(
+        self,
+        src: Path,
+        code: str,
+        *,
+        variant: str = "",
+        parse: Callable[[], ast.Module] | None = None,
+    ) -> CacheEntry | None:
+        """Return the cached entry for *src* or ``None`` on a miss.
+
+        If the imports of *code* have to be found, it is parsed with *parse*
+        when given, so a caller that needs the tree anyway parses only once.
+        """
+        key = self._key(src, code, variant, parse)
+        path = self._entry_path(key) if key else None
+        data = self._read(path) if path else None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:  # pragma: no cover - raced with eviction
+            pass
+        return CacheEntry(
+            lines=data.get("lines"),
+            error=data.get("error"),
+            plugin=data.get("plugin", False),
+            deps=data.get("deps"),
+        )
+
+    def put(
+        self,
+        src: Path,
+        code: str,
+        entry: CacheEntry,
+        *,
+        variant: str = "",
+        parse: Callable[[], ast.Module] | None = None,
+    ) -> None:
+        """Store *entry* as the outcome of generating stubs for *src*.
+
+        Transient failures are not stored, so they are retried next time.
+        """
+        if entry.transient:
+            return
+        key = self._key(src, code, variant, parse)
+        if key is None:
+            return
+        payload = {
+            "lines": entry.lines,
+            "error": entry.error,
+            "plugin": entry.plugin,
+            "deps": entry.deps,
+        }
+        self._write(self._entry_path(key), payload)
+
+    def reset(self) -> None:
+        """Forget in-memory lookups so source changes are seen by long-lived callers."""
+        self._origins.clear()
+        self._specs.clear()
+        self._digests.clear()
+        self._keys.clear()
+
+    # -- keys -----------------------------------------------------------
+
+    def _key(
+        self, src: Path, code: str, variant: str, parse: Callable[[], ast.Module] | None = None
+    ) -> str | None:
+        memo_key = (str(src), _sha(code), variant)
+        if memo_key not in self._keys:
+            self._keys[memo_key] = self._compute_key(src, code, variant, parse)
+        return self._keys[memo_key]
+
+    def _compute_key(
+        self, src: Path, code: str, variant: str, parse: Callable[[], ast.Module] | None = None
+    ) -> str | None:
+        from .stubgen import _module_name_from_path
+
+        module_name = _module_name_from_path(src)
+        self._origins.setdefault(module_name, str(src.resolve()))
+        self._digests[module_name] = _sha(module_name, code)
+        try:
+            deps = self._closure(module_name, code, src.name == "__init__.py", parse)
+        except SyntaxError:
+            return None
+        parts = [self._env, variant, self._digests[module_name]]
+        parts.extend(f"{name}={self._fingerprint(name)}" for name in sorted(deps))
+        return _sha(*parts)
+
+    def _closure(
+        self,
+        module_name: str,
+        code: str,
+        is_package: bool,
+        parse: Callable[[], ast.Module] | None = None,
+    ) -> set[str]:
+        """Return all modules reachable from *module_name* through imports."""
+        seen: set[str] = set()
+        stack = list(self._direct_deps(module_name, code, is_package, parse))
+        while stack:
+            name = stack.pop()
+            if name in seen or name == module_name:
+                continue
+            seen.add(name)
+            origin = self._origin(name)
+            if origin is None or self._is_external(origin) or not origin.endswith(".py"):
+                continue
+            try:
+                dep_code = Path(origin).read_text()
+            except (OSError, UnicodeDecodeError):
+                continue
+            self._digests.setdefault(name, _sha(name, dep_code))
+            try:
+                stack.extend(self._direct_deps(name, dep_code, Path(origin).name == "__init__.py"))
+            except SyntaxError:
+                continue
+        return seen
+
+    def _direct_deps(
+        self,
+        module_name: str,
+        code: str,
+        is_package: bool,
+        parse: Callable[[], ast.Module] | None = None,
+    ) -> frozenset[str]:
+        digest = _sha(module_name, code)
+        if digest in self._deps:
+            return self._deps[digest]
+        path = self.root / "deps" / digest[:2] / f"{digest}.json"
+        data = self._read(path)
+        if data is None:
+            tree = parse() if parse is not None else ast.parse(code)
+            deps = frozenset(imported_module_names(tree, module_name, is_package=is_package))
+            self._write(path, sorted(deps))
+        else:
+            deps = frozenset(data)
+        self._deps[digest] = deps
+        return deps
+
+    def _fingerprint(self, name: str) -> str:
+        origin = self._origin(name)
+        if origin is None:
+            return "missing"
+        if name in self._digests:
+            return self._digests[name]
+        try:
+            st = os.stat(origin)
+        except OSError:
+            return f"builtin:{origin}"
+        return f"{origin}:{st.st_mtime_ns}:{st.st_size}"
+
+    def _is_external(self, origin: str) -> bool:
+        return origin.startswith(self._external)
+
+    def _origin(self, name: str) -> str | None:
+        """Locate *name* without importing it."""
+        if name not in self._origins:
+            spec = self._spec(name)
+            origin = None
+            if spec is not None:
+                origin = spec.origin if spec.has_location else f"<{name}>"
+            self._origins[name] = origin
+        return self._origins[name]
+
+    def _spec(self, name: str) -> ModuleSpec | None:
+        if name in self._specs:
+            return self._specs[name]
+        spec: ModuleSpec | None = None
+        mod = sys.modules.get(name)
+        if mod is not None:
+            spec = getattr(mod, "__spec__", None) or ModuleSpec(name, None)
+        else:
+            parent, _, _ = name.rpartition(".")
+            search = None
+            if parent:
+                parent_spec = self._spec(parent)
+                search = parent_spec.submodule_search_locations if parent_spec else None
+            if not parent or search is not None:
+                try:
+                    spec = PathFinder.find_spec(name, search)
+                except (ImportError, ValueError):
+                    spec = None
+        self._specs[name] = spec
+        return spec
+
+    # -- storage --------------------------------------------------------
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / "stubs" / key[:2] / f"{key}.json"
+
+    @staticmethod
+    def _read(path: Path) -> object | None:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: Path, payload: object) -> None:
+        data = json.dumps(payload)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(data)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp, path)
+        if self._size is None:
+            self._size = self._disk_usage()
+        else:
+            self._size += len(data.encode()) - replaced
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _files(self) -> list[Path]:
+        return [p for sub in ("stubs", "deps") for p in (self.root / sub).rglob("*.json")]
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for path in self._files():
+            try:
+                total += path.stat().st_size
+            except OSError:  # pragma: no cover - raced with eviction
+                pass
+        return total
+
+    def _evict(self) -> None:
+        """Drop least recently used files until the cache fits in ``max_bytes``."""
+        files: list[tuple[int, int, Path]] = []
+        for path in self._files():
+            try:
+                st = path.stat()
+            except OSError:  # pragma: no cover - raced with eviction
+                continue
+            files.append((st.st_mtime_ns, st.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:  # pragma: no cover - raced with eviction
+                continue
+            total -= size
+        self._size = total
+
+
+__all__ = ["CacheEntry", "DEFAULT_MAX_BYTES", "StubCache", "imported_module_names"]
@@ -1,8 +1,40 @@
 from __future__ import annotations
 
+import argparse
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from macrotype.cache import StubCache
+    from macrotype.depgraph import DependencyGraph
 
 DEFAULT_OUT_DIR = Path("__macrotype__")
+DEFAULT_CACHE_DIR = DEFAULT_OUT_DIR / ".cache"
+
+# Options that only affect how stubs are produced, never their content.  They
+# are kept out of the ``# Generated via:`` header.
+EXECUTION_OPTIONS = {
+    "-j",
+    "--jobs",
+    "--cache-dir",
+    "--profile-json",
+    "--memory-report",
+    "--preload",
+    "--max-rss",
+}
+EXECUTION_FLAGS = {
+    "--no-cache",
+    "--poll",
+    "--warm",
+    "--profile-passes",
+    "--import-profile",
+    "--evict-modules",
+}
+EXECUTION_LISTS = {"--changed-files"}
+
+# ``macrotype daemon <command>`` is dispatched to the daemon client.
+DAEMON_COMMANDS = {"start", "stop", "status", "run"}
+DEFAULT_DAEMON_SOCKET = DEFAULT_OUT_DIR / ".daemon.sock"
 
 
 def _default_output_path(path: Path, cwd: Path, *, is_file: bool) -> Path:
@@ -16,7 +48,146 @@ def _default_output_path(path: Path, cwd: Path, *, is_file: bool) -> Path:
     return base.with_suffix(".pyi") if is_file else base
 
 
+def _add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help="Directory of the incremental stub cache (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always import and regenerate every module",
+    )
+
+
+def _add_preload_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--preload",
+        type=lambda value: [name for name in value.split(",") if name],
+        metavar="PKG1,PKG2",
+        help="Import these packages once in a fork server and fork the stub workers from it",
+    )
+
+
+def _add_hybrid_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--hybrid",
+        action="store_true",
+        help=(
+            "Stub modules without dynamic constructs without importing them; modules with "
+            "'from' imports of third-party or dynamic modules are still imported"
+        ),
+    )
+
+
+def _add_memory_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--evict-modules",
+        action="store_true",
+        help="Drop project modules from sys.modules after writing each stub",
+    )
+    parser.add_argument(
+        "--max-rss",
+        type=int,
+        metavar="MB",
+        help="Generate stubs in a worker process that is replaced once it uses MB megabytes",
+    )
+
+
+def _check_memory_arguments(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if args.max_rss is None:
+        return
+    if args.jobs > 1:
+        parser.error("--max-rss cannot be combined with --jobs")
+    # These need the stubs to be generated in this process.
+    in_process = (
+        "debug_failure",
+        "profile_passes",
+        "profile_json",
+        "memory_report",
+        "import_profile",
+    )
+    for dest in in_process:
+        if getattr(args, dest, None):
+            parser.error(f"--max-rss cannot be combined with --{dest.replace('_', '-')}")
+
+
+def _max_rss_bytes(args: argparse.Namespace) -> int | None:
+    return None if args.max_rss is None else args.max_rss * 1024 * 1024
+
+
+def _make_cache(
+    args: argparse.Namespace, pool: dict[str, StubCache] | None = None
+) -> StubCache | None:
+    """Return the cache selected by *args*.
+
+    Long-lived callers pass a *pool* so caches, and their in-memory lookups,
+    are reused across invocations.
+    """
+    if args.no_cache:
+        return None
+    from macrotype.cache import StubCache
+
+    if pool is None:
+        return StubCache(Path(args.cache_dir))
+    key = str(Path(args.cache_dir).resolve())
+    cache = pool.get(key)
+    if cache is None:
+        cache = pool[key] = StubCache(Path(key))
+    else:
+        cache.reset()
+    return cache
+
+
+def _load_graph(args: argparse.Namespace) -> DependencyGraph:
+    from macrotype.depgraph import DependencyGraph
+
+    return DependencyGraph.load(Path(args.cache_dir) / "depgraph.json")
+
+
+def _strip_options(
+    argv: list[str],
+    options: set[str],
+    flags: set[str] | frozenset[str] = frozenset(),
+    lists: set[str] | frozenset[str] = frozenset(),
+) -> list[str]:
+    """Return *argv* without *options* and their values, or bare *flags*.
+
+    Options in *lists* are dropped together with every value up to the next
+    option.  Used to keep execution-only flags such as ``--jobs`` out of the
+    ``# Generated via:`` header so stubs do not change when they are toggled.
+    """
+
+    out: list[str] = []
+    it = iter(argv)
+    skipping = False
+    for arg in it:
+        if skipping and not arg.startswith("-"):
+            continue
+        skipping = arg in lists
+        if skipping or arg in flags:
+            continue
+        if arg in options:
+            next(it, None)
+            continue
+        if any(arg.startswith(f"{opt}=") for opt in options if opt.startswith("--")):
+            continue
+        if any(arg.startswith(opt) and len(arg) > 2 for opt in options if len(opt) == 2):
+            continue
+        out.append(arg)
+    return out
+
+
 def main(argv: list[str] | None = None) -> int:
+    import sys
+
+    args = list(argv or sys.argv[1:])
+    if args[:1] == ["daemon"] and args[1:2] and args[1] in DAEMON_COMMANDS:
+        from .daemon import main as _daemon_main
+
+        return _daemon_main(args[1:])
+
     from .__main__ import main as _main
 
     return _main(argv)
@@ -28,4 +199,24 @@ def check_main(argv: list[str] | None = None) -> int:
     return _main(argv)
 
 
-__all__ = ["main", "check_main", "DEFAULT_OUT_DIR", "_default_output_path"]
+__all__ = [
+    "main",
+    "check_main",
+    "DEFAULT_OUT_DIR",
+    "DEFAULT_CACHE_DIR",
+    "DEFAULT_DAEMON_SOCKET",
+    "DAEMON_COMMANDS",
+    "EXECUTION_OPTIONS",
+    "EXECUTION_FLAGS",
+    "EXECUTION_LISTS",
+    "_add_cache_arguments",
+    "_add_hybrid_argument",
+    "_add_memory_arguments",
+    "_add_preload_argument",
+    "_check_memory_arguments",
+    "_default_output_path",
+    "_load_graph",
+    "_make_cache",
+    "_max_rss_bytes",
+    "_strip_options",
+]
@@ -3,18 +3,88 @@ from __future__ import annotations
 import argparse
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .. import stubgen
-from ..modules.source import extract_source_info
-from . import _default_output_path
-from .watch import watch_and_run
+from . import (
+    EXECUTION_FLAGS,
+    EXECUTION_LISTS,
+    EXECUTION_OPTIONS,
+    _add_cache_arguments,
+    _add_hybrid_argument,
+    _add_memory_arguments,
+    _add_preload_argument,
+    _check_memory_arguments,
+    _default_output_path,
+    _load_graph,
+    _make_cache,
+    _max_rss_bytes,
+    _strip_options,
+)
+
+# ``stubgen`` and the analysis pipeline are imported where they are used, so
+# ``--help`` and the parent process of watch mode start quickly.
+
+if TYPE_CHECKING:
+    from macrotype.cache import StubCache
+    from macrotype.cli.warm import WarmWorker
+    from macrotype.depgraph import DependencyGraph
+    from macrotype.profiling import ImportProfiler, PassProfiler
+
+
+def _warm_worker(
+    args: argparse.Namespace, command: str, graph: DependencyGraph | None = None
+) -> WarmWorker:
+    """Return a :class:`WarmWorker` regenerating the stubs for ``args.paths``."""
+    from macrotype import stubgen
+    from macrotype.cli.warm import WarmWorker
+
+    cwd = Path.cwd()
+    targets: list[tuple[Path, Path]] = []
+    for target in args.paths:
+        path = Path(target)
+        default = _default_output_path(path, cwd, is_file=path.is_file())
+        targets.append((path.resolve(), Path(args.output) if args.output else default))
+
+    def regenerate(src: Path) -> None:
+        for path, out in targets:
+            if src == path:
+                dest = out
+            elif src.is_relative_to(path):
+                if stubgen._looks_like_mypy_plugin(stubgen._module_name_from_path(src)):
+                    return
+                dest = out / src.relative_to(path).with_suffix(".pyi")
+            else:
+                continue
+            # A module that fails to import is skipped as in a cold run; only
+            # failures outside a single file make the worker start over.
+            try:
+                stubgen.process_file(
+                    src,
+                    dest,
+                    command=command,
+                    strict=args.strict,
+                    allow_type_checking=args.allow_type_checking,
+                    graph=graph,
+                )
+            except Exception as exc:
+                print(f"Skipping {src}: {exc}", file=sys.stderr)
+            return
+
+    def regenerate_all() -> None:
+        for path, _ in targets:
+            for src in [path] if path.is_file() else stubgen.iter_python_files(path):
+                regenerate(src.resolve())
+
+    return WarmWorker([path for path, _ in targets], regenerate, regenerate_all, graph=graph)
 
 
 def _stdout_write(lines: list[str], command: str | None = None) -> None:
+    from macrotype import stubgen
+
     sys.stdout.write("\n".join(stubgen._header_lines(command) + lines) + "\n")
 
 
-def _stub_main(argv: list[str]) -> int:
+def _stub_main(argv: list[str], *, caches: dict[str, StubCache] | None = None) -> int:
     parser = argparse.ArgumentParser(prog="macrotype")
     parser.add_argument(
         "paths",
@@ -33,6 +103,16 @@ def _stub_main(argv: list[str]) -> int:
         action="store_true",
         help="Watch for changes and regenerate stubs",
     )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Detect changes in watch mode by polling mtimes instead of inotify",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="In watch mode, keep imports loaded and regenerate only changed modules",
+    )
     parser.add_argument(
         "--strict",
         action="store_true",
@@ -48,9 +128,50 @@ def _stub_main(argv: list[str]) -> int:
         action="store_true",
         help="Print stack trace and enter pdb on stub generation failure",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate stubs for directories",
+    )
+    parser.add_argument(
+        "--profile-passes",
+        action="store_true",
+        help="Print time and allocations of every phase and transformer to stderr",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="Also write the --profile-passes measurements to FILE as JSON",
+    )
+    parser.add_argument(
+        "--memory-report",
+        metavar="FILE",
+        help="Write peak and retained allocations and top allocation sites per module "
+        "and phase to FILE as JSON",
+    )
+    parser.add_argument(
+        "--import-profile",
+        action="store_true",
+        help="Print the slowest module imports and third-party packages to stderr",
+    )
+    parser.add_argument(
+        "--changed-files",
+        nargs="+",
+        action="extend",
+        metavar="FILE",
+        help="Only regenerate stubs that may depend on these files; give it after the paths",
+    )
+    _add_preload_argument(parser)
+    _add_hybrid_argument(parser)
+    _add_memory_arguments(parser)
+    _add_cache_arguments(parser)
     args = parser.parse_args(argv)
-    command = "macrotype " + " ".join(argv)
-    allow_tc = args.allow_type_checking
+    _check_memory_arguments(parser, args)
+    command = "macrotype " + " ".join(
+        _strip_options(argv, EXECUTION_OPTIONS, EXECUTION_FLAGS, EXECUTION_LISTS)
+    )
 
     if args.watch:
         if args.paths == ["-"]:
@@ -59,34 +180,118 @@ def _stub_main(argv: list[str]) -> int:
             sys.executable,
             "-m",
             "macrotype",
-            *[a for a in argv if a not in {"-w", "--watch"}],
+            *_strip_options(argv, set(), {"-w", "--watch", "--warm"}, EXECUTION_LISTS),
         ]
-        return watch_and_run(args.paths, cmd)
+        from .watch import watch_and_run, watch_warm
+
+        backend = "poll" if args.poll else "auto"
+        if args.warm:
+            if args.output == "-":
+                parser.error("--warm cannot write to stdout")
+            header = "macrotype " + " ".join(
+                _strip_options(cmd[3:], EXECUTION_OPTIONS, EXECUTION_FLAGS)
+            )
+            worker = _warm_worker(args, header, _load_graph(args))
+            return watch_warm(args.paths, worker, cmd, backend=backend)
+        changed_option = None if args.output == "-" else "--changed-files"
+        return watch_and_run(args.paths, cmd, backend=backend, changed_option=changed_option)
 
+    memory = None
+    if args.memory_report:
+        from ..profiling import MemoryProfiler
+
+        memory = MemoryProfiler()
+    show_passes = args.profile_passes or args.profile_json
+    profile: PassProfiler | None = memory
+    if profile is None and show_passes:
+        from ..profiling import PassProfiler
+
+        profile = PassProfiler()
+    import_profile = None
+    if args.import_profile:
+        from ..profiling import ImportProfiler
+
+        import_profile = ImportProfiler()
+    try:
+        _generate(args, command, profile=profile, import_profile=import_profile, caches=caches)
+    finally:
+        if import_profile is not None:
+            end = "\n\n" if show_passes else "\n"
+            print(import_profile.table(), file=sys.stderr, end=end)
+        if profile is not None:
+            profile.close()
+        if memory is not None:
+            Path(args.memory_report).write_text(memory.report_json())
+        if profile is not None and show_passes:
+            from macrotype.types import parse_cache
+
+            print(profile.table(), file=sys.stderr)
+            info = parse_cache.info()
+            print(
+                f"\nparse cache: {info.hits} hits, {info.misses} misses, "
+                f"{info.currsize}/{info.maxsize} entries",
+                file=sys.stderr,
+            )
+            if args.profile_json:
+                Path(args.profile_json).write_text(profile.to_json())
+    return 0
+
+
+def _generate(
+    args: argparse.Namespace,
+    command: str,
+    *,
+    profile: PassProfiler | None,
+    import_profile: ImportProfiler | None = None,
+    caches: dict[str, StubCache] | None,
+) -> None:
+    from macrotype import stubgen
+
+    allow_tc = args.allow_type_checking
     if args.paths == ["-"]:
+        from macrotype.modules.source import extract_source_info
+
         code = sys.stdin.read()
         info = extract_source_info(code, allow_type_checking=allow_tc)
         module = stubgen.load_module_from_code(code, "<stdin>", allow_type_checking=True)
-        lines = stubgen.stub_lines(module, source_info=info, strict=args.strict)
+        lines = stubgen.stub_lines(module, source_info=info, strict=args.strict, profile=profile)
         if args.output and args.output != "-":
             stubgen.write_stub(Path(args.output), lines, command)
         else:
             _stdout_write(lines, command)
-        return 0
+        return
 
     cwd = Path.cwd()
+    cache = _make_cache(args, caches)
+    stats = stubgen.WriteStats()
+    # The graph is kept in the cache directory.  Without the cache, it is
+    # only read for --changed-files and not created otherwise.
+    graph = None
+    if args.output != "-" and (not args.no_cache or args.changed_files):
+        graph = _load_graph(args)
+    only = None
+    if args.changed_files and graph:
+        only = graph.affected(Path(f) for f in args.changed_files)
     for target in args.paths:
         path = Path(target)
         default_output = None
         if args.output != "-":
             default_output = _default_output_path(path, cwd, is_file=path.is_file())
         if path.is_file():
+            if only is not None and path.resolve() not in only:
+                continue
             if args.output == "-":
+                from macrotype.modules.source import extract_source_info
+                from macrotype.profiling import profile_import
+
                 code = path.read_text()
                 module_name = stubgen._module_name_from_path(path)
                 info = extract_source_info(code, allow_type_checking=allow_tc)
-                module = stubgen.load_module(module_name, allow_type_checking=True)
-                lines = stubgen.stub_lines(module, source_info=info, strict=args.strict)
+                with profile_import(import_profile, module_name):
+                    module = stubgen.load_module(module_name, allow_type_checking=True)
+                lines = stubgen.stub_lines(
+                    module, source_info=info, strict=args.strict, profile=profile
+                )
                 _stdout_write(lines, command)
             else:
                 dest = Path(args.output) if args.output else default_output
@@ -96,6 +301,13 @@ def _stub_main(argv: list[str]) -> int:
                     command=command,
                     strict=args.strict,
                     allow_type_checking=allow_tc,
+                    cache=cache,
+                    stats=stats,
+                    graph=graph,
+                    profile=profile,
+                    hybrid=args.hybrid,
+                    import_profile=import_profile,
+                    debug_failure=args.debug_failure,
                 )
         else:
             out_dir = (
@@ -108,8 +320,22 @@ def _stub_main(argv: list[str]) -> int:
                 strict=args.strict,
                 allow_type_checking=allow_tc,
                 debug_failure=args.debug_failure,
+                jobs=args.jobs,
+                cache=cache,
+                stats=stats,
+                graph=graph,
+                only=only,
+                profile=profile,
+                preload=args.preload,
+                hybrid=args.hybrid,
+                import_profile=import_profile,
+                evict=args.evict_modules,
+                max_rss=_max_rss_bytes(args),
             )
-    return 0
+    if graph is not None:
+        graph.save()
+    if stats.written or stats.unchanged:
+        print(stats.summary(), file=sys.stderr)
 
 
 def main(argv: list[str] | None = None) -> int:
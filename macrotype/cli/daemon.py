@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+"""``macrotype daemon``: regenerate stubs from a long-lived interpreter.
+
+The server listens on a Unix socket and handles each ``run`` request exactly
+like the ``macrotype`` command line, in its own interpreter.  Third-party
+imports and the stub caches stay warm between requests, so the client only
+pays for connecting and for the modules that actually changed.
+
+Requests and responses are single JSON documents; the client shuts down its
+side of the connection after sending.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from . import DEFAULT_DAEMON_SOCKET
+
+if TYPE_CHECKING:
+    from macrotype.cache import StubCache
+
+_BUFSIZE = 64 * 1024
+
+# Modification times within this long before a request started may be from a
+# save during the request, depending on the file system's time resolution.
+_MTIME_SLACK_NS = 2_000_000_000
+
+
+def _recv_all(conn: socket.socket) -> bytes:
+    chunks: list[bytes] = []
+    while chunk := conn.recv(_BUFSIZE):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def request(socket_path: Path, payload: dict[str, Any], *, timeout: float | None = None) -> Any:
+    """Send *payload* to the daemon at *socket_path* and return its response.
+
+    Raises :class:`OSError` if no daemon is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(os.fspath(socket_path))
+        conn.sendall(json.dumps(payload).encode())
+        conn.shutdown(socket.SHUT_WR)
+        return json.loads(_recv_all(conn))
+
+
+class DaemonServer:
+    """Serve stub generation requests on a Unix socket.
+
+    Project modules are those loaded from below *root*, and requests must
+    run from there.  Before each request, the ones whose source changed since
+    they were imported are dropped from ``sys.modules`` together with the
+    project modules that depend on them.
+    """
+
+    def __init__(self, socket_path: Path, root: Path) -> None:
+        from .warm import WarmWorker
+
+        self.socket_path = socket_path
+        self.root = root.resolve()
+        self.worker = WarmWorker([self.root])
+        self.caches: dict[str, StubCache] = {}
+        self.started = time.monotonic()
+        self.requests = 0
+        # None for modules whose source may have changed while being imported.
+        self._mtimes: dict[Path, int | None] = {}
+        self._stopping = False
+
+    def serve(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(os.fspath(self.socket_path))
+            server.listen()
+            try:
+                while not self._stopping:
+                    conn, _ = server.accept()
+                    with conn:
+                        try:
+                            response = self.handle(json.loads(_recv_all(conn)))
+                        except (ValueError, TypeError, AttributeError):
+                            response = {"error": "malformed request"}
+                        with contextlib.suppress(OSError):
+                            conn.sendall(json.dumps(response).encode())
+            finally:
+                self.socket_path.unlink(missing_ok=True)
+
+    def handle(self, req: dict[str, Any]) -> dict[str, Any]:
+        """Answer the decoded request *req*; raise :class:`ValueError` if malformed."""
+        if not isinstance(req, dict):
+            raise ValueError("request is not an object")
+        command = req.get("command")
+        if command == "status":
+            return {
+                "pid": os.getpid(),
+                "root": str(self.root),
+                "uptime": time.monotonic() - self.started,
+                "requests": self.requests,
+                "modules": len(self.worker.project_modules()),
+            }
+        if command == "stop":
+            self._stopping = True
+            return {"stopping": True}
+        if command == "run":
+            argv, cwd = req.get("argv", []), req.get("cwd", str(self.root))
+            if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+                raise ValueError("argv is not a list of strings")
+            if not isinstance(cwd, str):
+                raise ValueError("cwd is not a string")
+            self.requests += 1
+            return self.run(argv, Path(cwd))
+        return {"error": f"unknown command {command!r}"}
+
+    def _refresh(self) -> None:
+        stale: set[Path] = set()
+        for path, mtime in self._mtimes.items():
+            try:
+                current = path.stat().st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime:
+                stale.add(path)
+        if stale:
+            self.worker.invalidate(stale)
+            for path in stale:
+                del self._mtimes[path]
+
+    def _snapshot(self, started: int) -> None:
+        """Record the sources of modules imported by a request that began at *started*."""
+        for path in self.worker.project_modules().values():
+            if path not in self._mtimes:
+                with contextlib.suppress(OSError):
+                    mtime = path.stat().st_mtime_ns
+                    # Saved during the request: the module may be from the
+                    # old source, so it is refreshed before the next one.
+                    self._mtimes[path] = None if mtime >= started - _MTIME_SLACK_NS else mtime
+
+    def run(self, argv: list[str], cwd: Path) -> dict[str, Any]:
+        """Run ``macrotype *argv*`` from *cwd* and return its exit code and output."""
+        from .__main__ import _stub_main
+
+        if {"-w", "--watch"} & set(argv):
+            return {"code": 2, "stdout": "", "stderr": "--watch is not supported by the daemon\n"}
+        if not cwd.resolve().is_relative_to(self.root):
+            # Modules from there would never be refreshed.
+            message = f"{cwd} is outside the daemon root {self.root}\n"
+            return {"code": 2, "stdout": "", "stderr": message}
+        self._refresh()
+        started = time.time_ns()
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            with contextlib.chdir(cwd):
+                try:
+                    code = _stub_main(argv, caches=self.caches)
+                except SystemExit as exc:
+                    code = exc.code if isinstance(exc.code, int) else 1
+                except Exception:
+                    import traceback
+
+                    traceback.print_exc()
+                    code = 1
+        self._snapshot(started)
+        return {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+def _status(socket_path: Path) -> dict[str, Any] | None:
+    try:
+        return request(socket_path, {"command": "status"}, timeout=5)
+    except (OSError, ValueError):
+        return None
+
+
+def _start(socket_path: Path, timeout: float) -> int:
+    import subprocess
+
+    status = _status(socket_path)
+    if status is not None:
+        print(f"macrotype daemon is already running (pid {status['pid']})")
+        return 0
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    log = socket_path.with_suffix(".log")
+    with open(log, "ab") as fh:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "macrotype.cli.daemon", "--socket", str(socket_path)],
+            stdin=subprocess.DEVNULL,
+            stdout=fh,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            print(f"macrotype daemon exited during startup; see {log}", file=sys.stderr)
+            return 1
+        status = _status(socket_path)
+        if status is not None:
+            print(f"macrotype daemon started (pid {status['pid']})")
+            return 0
+        time.sleep(0.05)
+    print(f"macrotype daemon did not start within {timeout}s; see {log}", file=sys.stderr)
+    return 1
+
+
+def _run(socket_path: Path, argv: list[str]) -> int:
+    payload: dict[str, Any] = {"command": "run", "argv": argv, "cwd": os.getcwd()}
+    try:
+        response = request(socket_path, payload)
+    except OSError:
+        print(
+            "macrotype daemon is not running; start it with 'macrotype daemon start'",
+            file=sys.stderr,
+        )
+        return 2
+    if "error" in response:
+        print(response["error"], file=sys.stderr)
+        return 2
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["code"]
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Client entry point for ``macrotype daemon start|stop|status|run``."""
+    argv = list(argv or sys.argv[1:])
+    if argv[:1] == ["run"] and "-h" not in argv[1:2] and "--help" not in argv[1:2]:
+        # Forward everything else verbatim; only a leading --socket is ours.
+        rest = argv[1:]
+        socket_path = DEFAULT_DAEMON_SOCKET
+        if rest[:1] == ["--socket"] and len(rest) > 1:
+            socket_path, rest = Path(rest[1]), rest[2:]
+        return _run(socket_path, rest)
+    parser = argparse.ArgumentParser(prog="macrotype daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help in [
+        ("start", "Start the daemon in the background"),
+        ("stop", "Stop the daemon"),
+        ("status", "Report whether the daemon is running"),
+        ("run", "Generate stubs; takes the same arguments as macrotype"),
+    ]:
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument(
+            "--socket",
+            type=Path,
+            default=DEFAULT_DAEMON_SOCKET,
+            help="Unix socket of the daemon (default: %(default)s)",
+        )
+        if name == "start":
+            sub.add_argument("--timeout", type=float, default=10.0)
+        if name == "run":
+            sub.add_argument("args", nargs="*", help="Arguments for macrotype")
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        return _start(args.socket, args.timeout)
+    if args.command == "run":
+        return _run(args.socket, args.args)
+    status = _status(args.socket)
+    if status is None:
+        print("macrotype daemon is not running")
+        return 1 if args.command == "status" else 0
+    if args.command == "stop":
+        request(args.socket, {"command": "stop"}, timeout=5)
+        print(f"macrotype daemon stopped (pid {status['pid']})")
+        return 0
+    print(
+        f"macrotype daemon running (pid {status['pid']}) for {status['root']}: "
+        f"{status['requests']} request(s), {status['modules']} project module(s) loaded, "
+        f"up {status['uptime']:.0f}s"
+    )
+    return 0
+
+
+def serve_main(argv: list[str] | None = None) -> int:
+    """Server entry point started by ``macrotype daemon start``."""
+    parser = argparse.ArgumentParser(prog="macrotype daemon server")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_DAEMON_SOCKET)
+    args = parser.parse_args(argv)
+    DaemonServer(args.socket, Path.cwd()).serve()
+    return 0
+
+
+__all__ = ["DaemonServer", "main", "request", "serve_main"]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(serve_main())
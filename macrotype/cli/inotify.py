@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+"""Minimal Linux inotify bindings used by watch mode."""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Iterable
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyUnavailable(OSError):
+    """Raised when inotify cannot be used on this platform."""
+
+
+def _libc() -> ctypes.CDLL:
+    name = ctypes.util.find_library("c")
+    try:
+        libc = ctypes.CDLL(name or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError) as exc:
+        raise InotifyUnavailable("inotify is not available") from exc
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return libc
+
+
+def _skip_dir(name: str) -> bool:
+    return name.startswith(".") or name == "__pycache__"
+
+
+class InotifyWatcher:
+    """Report changed ``.py`` files below *paths* using inotify.
+
+    Every directory under the watched roots gets its own watch; directories
+    created later are added as they appear.  :meth:`wait` blocks until a change
+    arrives and then keeps reading until the tree has been quiet for
+    *debounce* seconds, so an editor's save burst (write, rename, chmod...)
+    is reported as a single set of paths.
+    """
+
+    def __init__(self, paths: Iterable[Path], *, debounce: float = 0.05) -> None:
+        self._libc = _libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise InotifyUnavailable(err, os.strerror(err))
+        self.fd = fd
+        self.debounce = debounce
+        self._dirs: dict[int, Path] = {}
+        self._files: set[Path] | None = set()
+        for p in paths:
+            p = Path(p).absolute()
+            if p.is_dir():
+                self._add_tree(p)
+                self._files = None
+            else:
+                self._add_dir(p.parent)
+                if self._files is not None:
+                    self._files.add(p)
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> InotifyWatcher:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _add_dir(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise InotifyUnavailable(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        self._dirs[wd] = path
+
+    def _add_tree(self, root: Path) -> None:
+        self._add_dir(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not _skip_dir(d)]
+            for d in dirnames:
+                self._add_dir(Path(dirpath) / d)
+
+    def _wanted(self, path: Path) -> bool:
+        if path.suffix != ".py":
+            return False
+        return self._files is None or path in self._files
+
+    def _read(self, changed: set[Path]) -> bool:
+        """Drain pending events into *changed*; return ``False`` on overflow."""
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return True
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                raw = buf[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return False
+                parent = self._dirs.get(wd)
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                if parent is None or not raw:
+                    continue
+                path = parent / os.fsdecode(raw)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _skip_dir(path.name):
+                        self._add_tree(path)
+                        changed.update(p for p in path.rglob("*.py") if self._wanted(p))
+                    continue
+                if self._wanted(path):
+                    changed.add(path)
+
+    def _rescan(self) -> set[Path]:
+        roots = set(self._dirs.values())
+        if self._files is not None:
+            return set(self._files)
+        return {p for root in roots for p in root.glob("*.py")}
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Return the set of changed files, or an empty set after *timeout*."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: set[Path] = set()
+        ok = self._read(changed)
+        deadline = time.monotonic() + self.debounce
+        while ok:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                break
+            ok = self._read(changed)
+            deadline = time.monotonic() + self.debounce
+        if not ok:
+            return self._rescan()
+        return changed
+
+
+__all__ = ["InotifyUnavailable", "InotifyWatcher"]
@@ -5,14 +5,43 @@ import os
 import subprocess
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from .. import stubgen
-from . import DEFAULT_OUT_DIR, _default_output_path
-from .watch import watch_and_run
+from . import (
+    DEFAULT_OUT_DIR,
+    EXECUTION_FLAGS,
+    EXECUTION_OPTIONS,
+    _add_cache_arguments,
+    _add_hybrid_argument,
+    _add_memory_arguments,
+    _add_preload_argument,
+    _check_memory_arguments,
+    _default_output_path,
+    _make_cache,
+    _max_rss_bytes,
+    _strip_options,
+)
 
+if TYPE_CHECKING:
+    from macrotype.cache import StubCache
+
+
+def _generate_stubs(
+    paths: list[str],
+    out_dir: Path,
+    command: str,
+    *,
+    jobs: int = 1,
+    cache: StubCache | None = None,
+    preload: list[str] | None = None,
+    hybrid: bool = False,
+    evict: bool = False,
+    max_rss: int | None = None,
+) -> list[Path]:
+    from macrotype import stubgen
 
-def _generate_stubs(paths: list[str], out_dir: Path, command: str) -> list[Path]:
     cwd = Path.cwd()
+    stats = stubgen.WriteStats()
     outputs: list[Path] = []
     for target in paths:
         path = Path(target)
@@ -20,10 +49,33 @@ def _generate_stubs(paths: list[str], out_dir: Path, command: str) -> list[Path]
         rel = default.relative_to(DEFAULT_OUT_DIR)
         dest = out_dir / rel
         if path.is_file():
-            outputs.append(stubgen.process_file(path, dest, command=command, strict=True))
+            outputs.append(
+                stubgen.process_file(
+                    path,
+                    dest,
+                    command=command,
+                    strict=True,
+                    cache=cache,
+                    stats=stats,
+                    hybrid=hybrid,
+                )
+            )
         else:
-            stubgen.process_directory(path, dest, command=command, strict=True)
+            stubgen.process_directory(
+                path,
+                dest,
+                command=command,
+                strict=True,
+                jobs=jobs,
+                cache=cache,
+                stats=stats,
+                preload=preload,
+                hybrid=hybrid,
+                evict=evict,
+                max_rss=max_rss,
+            )
             outputs.append(dest)
+    print(stats.summary(), file=sys.stderr)
     return outputs
 
 
@@ -46,9 +98,29 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Watch for changes and re-run the checker",
     )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Detect changes in watch mode by polling mtimes instead of inotify",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to generate stubs",
+    )
+    _add_preload_argument(parser)
+    _add_hybrid_argument(parser)
+    _add_memory_arguments(parser)
+    _add_cache_arguments(parser)
     args = parser.parse_args(cli_argv)
+    _check_memory_arguments(parser, args)
 
-    command = "macrotype-check " + " ".join(cli_argv + (["--"] + tool_args if tool_args else []))
+    command = "macrotype-check " + " ".join(
+        _strip_options(cli_argv, EXECUTION_OPTIONS, EXECUTION_FLAGS)
+        + (["--"] + tool_args if tool_args else [])
+    )
 
     if args.watch:
         cmd = [
@@ -59,10 +131,22 @@ def main(argv: list[str] | None = None) -> int:
         ]
         if tool_args:
             cmd += ["--", *tool_args]
-        return watch_and_run(args.paths, cmd)
+        from .watch import watch_and_run
+
+        return watch_and_run(args.paths, cmd, backend="poll" if args.poll else "auto")
 
     out_dir = Path(args.output)
-    stub_paths = _generate_stubs(args.paths, out_dir, command)
+    stub_paths = _generate_stubs(
+        args.paths,
+        out_dir,
+        command,
+        jobs=args.jobs,
+        cache=_make_cache(args),
+        preload=args.preload,
+        hybrid=args.hybrid,
+        evict=args.evict_modules,
+        max_rss=_max_rss_bytes(args),
+    )
 
     env = os.environ.copy()
     stub_path = str(out_dir)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+"""Long-lived, in-process stub regeneration for watch mode."""
+
+import importlib
+import sys
+import traceback
+from pathlib import Path
+from types import ModuleType
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
+
+from .. import stubgen
+from ..meta_types import clear_module_overloads
+
+if TYPE_CHECKING:
+    from macrotype.depgraph import DependencyGraph
+
+
+class WarmWorker:
+    """Regenerate stubs in this interpreter, reloading only what changed.
+
+    Third-party modules stay imported between runs.  When files change, the
+    project modules defined by those files and every project module that
+    depends on them are dropped from ``sys.modules`` and only their stubs are
+    regenerated by calling *regenerate* with each source path.  *roots* are the
+    watched files and directories; modules loaded from outside them are never
+    dropped.  *regenerate_all*, if given, performs the initial full run.
+
+    With a *graph*, modules recorded as depending on the changed ones are
+    regenerated as well, even if they are not currently imported, and the
+    graph is saved after every successful run.  Without *regenerate*, the
+    worker only tracks and drops stale modules through :meth:`invalidate`.
+    """
+
+    def __init__(
+        self,
+        roots: Sequence[Path],
+        regenerate: Callable[[Path], object] | None = None,
+        regenerate_all: Callable[[], object] | None = None,
+        *,
+        graph: DependencyGraph | None = None,
+    ) -> None:
+        self.roots = [Path(r).resolve() for r in roots]
+        self.regenerate = regenerate
+        self.regenerate_all = regenerate_all
+        self.graph = graph
+        self._paths: dict[str, Path | None] = {}
+
+    def _guard(self, fn: Callable[[], object]) -> bool:
+        try:
+            fn()
+        except (Exception, SystemExit):
+            traceback.print_exc()
+            self.drop(self.project_modules())
+            return False
+        if self.graph is not None and self.graph.path is not None:
+            self.graph.save()
+        return True
+
+    def start(self) -> bool:
+        """Generate every stub, importing the project into this interpreter."""
+        if self.regenerate_all is None:
+            return True
+        return self._guard(self.regenerate_all)
+
+    def _in_project(self, file: Path) -> bool:
+        return any(file == root or file.is_relative_to(root) for root in self.roots)
+
+    def project_modules(self) -> dict[str, Path]:
+        """Return loaded project modules keyed by name."""
+        found: dict[str, Path] = {}
+        for name, mod in list(sys.modules.items()):
+            file = getattr(mod, "__file__", None)
+            if not file or not file.endswith(".py"):
+                continue
+            path = self._project_path(file)
+            if path is not None:
+                found[name] = path
+        return found
+
+    def _project_path(self, file: str) -> Path | None:
+        try:
+            return self._paths[file]
+        except KeyError:
+            pass
+        path = Path(file).resolve()
+        result = self._paths[file] = path if self._in_project(path) else None
+        return result
+
+    def dependents(self, names: set[str]) -> set[str]:
+        """Return *names* plus every loaded project module that depends on them."""
+        project = self.project_modules()
+        reverse: dict[str, set[str]] = {}
+        for name in project:
+            mod = sys.modules.get(name)
+            for dep in _module_dependencies(mod, set(project)):
+                reverse.setdefault(dep, set()).add(name)
+        result = set(names)
+        stack = list(names)
+        while stack:
+            for user in reverse.get(stack.pop(), ()):
+                if user not in result:
+                    result.add(user)
+                    stack.append(user)
+        return result
+
+    def drop(self, names: Iterable[str]) -> None:
+        for name in names:
+            sys.modules.pop(name, None)
+            clear_module_overloads(name)
+        importlib.invalidate_caches()
+
+    def invalidate(self, changed: Iterable[Path]) -> set[Path]:
+        """Drop the modules affected by *changed* files and return the files to regenerate."""
+        changed = {Path(p).resolve() for p in changed}
+        project = self.project_modules()
+        by_file = {path: name for name, path in project.items()}
+        names = {by_file.get(p) or stubgen._module_name_from_path(p) for p in changed}
+        affected = self.dependents(names)
+        files = {project[n] for n in affected if n in project} | changed
+        if self.graph is not None:
+            affected |= self.graph.dependents(names)
+            files |= {f for f in self.graph.affected(changed) if self._in_project(f)}
+        self.drop(affected)
+        return files
+
+    def update(self, changed: Iterable[Path]) -> bool:
+        """Regenerate stubs affected by *changed* files.
+
+        Returns ``False`` if regeneration failed; all project modules are then
+        dropped so the next update starts from a clean slate.
+        """
+        files = self.invalidate(changed)
+
+        def run() -> None:
+            for src in sorted(files):
+                if src.exists() and self.regenerate is not None:
+                    self.regenerate(src)
+
+        return self._guard(run)
+
+
+def _module_dependencies(mod: ModuleType | None, candidates: set[str]) -> set[str]:
+    """Return the names in *candidates* that *mod* references through its globals.
+
+    Submodules bound on a package by the import system are not dependencies of
+    the package; re-importing them rebinds the attribute.
+    """
+    if mod is None:
+        return set()
+    deps: set[str] = set()
+    prefix = mod.__name__ + "."
+    for value in list(vars(mod).values()):
+        try:
+            name = value.__name__ if isinstance(value, ModuleType) else value.__module__
+        except Exception:
+            continue
+        if isinstance(value, ModuleType) and name.startswith(prefix):
+            continue
+        if isinstance(name, str) and name in candidates and name != mod.__name__:
+            deps.add(name)
+    return deps
+
+
+__all__ = ["WarmWorker"]
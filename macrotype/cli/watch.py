@@ -1,21 +1,71 @@
 from __future__ import annotations
 
 import subprocess
+import sys
 import time
 from pathlib import Path
 from threading import Event
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, Literal, Protocol
 
-from .. import stubgen
+if TYPE_CHECKING:
+    from macrotype.cli.warm import WarmWorker
+
+Backend = Literal["auto", "inotify", "poll"]
 
 
 def _snapshot(paths: Iterable[Path]) -> dict[Path, float]:
+    from macrotype.stubgen import iter_python_files
+
     files: list[Path] = []
     for p in paths:
-        files.extend(stubgen.iter_python_files(p))
+        files.extend(iter_python_files(p))
     return {f: f.stat().st_mtime for f in files if f.exists()}
 
 
+class Watcher(Protocol):
+    def wait(self, timeout: float | None = None) -> set[Path]: ...
+
+    def close(self) -> None: ...
+
+
+class PollingWatcher:
+    """Fallback watcher that compares mtime snapshots every *interval* seconds."""
+
+    def __init__(self, paths: Iterable[Path], *, interval: float = 0.5) -> None:
+        self.paths = [Path(p) for p in paths]
+        self.interval = interval
+        self._mtimes = _snapshot(self.paths)
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        new = _snapshot(self.paths)
+        changed = {p for p in new.keys() | self._mtimes.keys() if new.get(p) != self._mtimes.get(p)}
+        self._mtimes = new
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(
+    paths: Iterable[Path], *, backend: Backend = "auto", interval: float = 0.5
+) -> Watcher:
+    """Return an inotify watcher when available, otherwise a polling one."""
+
+    paths = list(paths)
+    if backend != "poll" and sys.platform.startswith("linux"):
+        from .inotify import InotifyUnavailable, InotifyWatcher
+
+        try:
+            return InotifyWatcher(paths)
+        except InotifyUnavailable:
+            if backend == "inotify":
+                raise
+    elif backend == "inotify":
+        raise RuntimeError("inotify is only available on Linux")
+    return PollingWatcher(paths, interval=interval)
+
+
 def watch_and_run(
     paths: Iterable[str | Path],
     cmd: list[str],
@@ -24,33 +74,82 @@ def watch_and_run(
     stop_event: Event | None = None,
     cwd: Path | None = None,
     env: dict[str, str] | None = None,
+    backend: Backend = "auto",
+    changed_option: str | None = None,
 ) -> int:
     """Run *cmd* and watch *paths* for changes.
 
     When any ``.py`` file under ``paths`` changes, ``cmd`` is executed again.
-    If ``stop_event`` is provided, the loop terminates when the event is set.
+    If *changed_option* is given, the changed files are passed to the re-runs
+    after that option.  Changes are detected with inotify on Linux and by
+    polling mtimes every *interval* seconds elsewhere or when
+    ``backend="poll"``.  If ``stop_event`` is provided, the loop terminates
+    when the event is set.
     """
 
     path_objs = [Path(p) for p in paths]
 
-    def run() -> int:
-        return subprocess.run(cmd, check=False, cwd=cwd, env=env).returncode
+    def run(changed: Iterable[Path] = ()) -> int:
+        args = list(cmd)
+        if changed and changed_option:
+            args += [changed_option, *sorted(map(str, changed))]
+        return subprocess.run(args, check=False, cwd=cwd, env=env).returncode
 
+    watcher = make_watcher(path_objs, backend=backend, interval=interval)
     code = run()
-    mtimes = _snapshot(path_objs)
     print("Watching for changes. Press Ctrl+C to exit.")
     try:
         while True:
             if stop_event and stop_event.is_set():
                 break
-            time.sleep(interval)
-            new = _snapshot(path_objs)
-            if new != mtimes:
-                mtimes = new
-                code = run()
+            changed = watcher.wait(interval)
+            if changed:
+                code = run(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return code
+
+
+def watch_warm(
+    paths: Iterable[str | Path],
+    worker: WarmWorker,
+    cold_cmd: list[str],
+    *,
+    after: Callable[[], int] | None = None,
+    interval: float = 0.5,
+    stop_event: Event | None = None,
+    backend: Backend = "auto",
+) -> int:
+    """Regenerate stubs in-process with *worker* whenever *paths* change.
+
+    Only the changed modules and their dependents are regenerated.  If that
+    fails, *cold_cmd* is run in a fresh interpreter instead.  *after*, if
+    given, runs after each successful regeneration and provides the exit code.
+    """
+
+    def step(ok: bool) -> int:
+        if not ok:
+            print("Warm regeneration failed; running a cold rebuild.", file=sys.stderr)
+            return subprocess.run(cold_cmd, check=False).returncode
+        return after() if after is not None else 0
+
+    watcher = make_watcher([Path(p) for p in paths], backend=backend, interval=interval)
+    code = step(worker.start())
+    print("Watching for changes. Press Ctrl+C to exit.")
+    try:
+        while True:
+            if stop_event and stop_event.is_set():
+                break
+            changed = watcher.wait(interval)
+            if changed:
+                code = step(worker.update(changed))
     except KeyboardInterrupt:
         pass
+    finally:
+        watcher.close()
     return code
 
 
-__all__ = ["watch_and_run"]
+__all__ = ["watch_and_run", "watch_warm", "make_watcher", "PollingWatcher"]
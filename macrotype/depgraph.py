@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+"""Import-dependency graph between generated modules."""
+
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .cache import imported_module_names
+
+if TYPE_CHECKING:
+    from macrotype.modules.ir import ModuleDecl
+
+# Bump when the on-disk layout changes.
+_FORMAT = 1
+
+
+def module_dependencies(mi: ModuleDecl) -> frozenset[str]:
+    """Return the modules the stub of *mi* may depend on.
+
+    These are the modules the emitted stub imports from, as found by
+    ``resolve_imports``, plus every module imported by the source.
+    """
+    name = mi.obj.__name__
+    deps = set(mi.imports.froms)
+    if mi.source is not None and mi.source.code is not None:
+        is_package = hasattr(mi.obj, "__path__")
+        deps |= imported_module_names(mi.source.tree, name, is_package=is_package)
+    deps.discard(name)
+    return frozenset(deps)
+
+
+class DependencyGraph:
+    """Which generated modules depend on which others.
+
+    Every generated module is recorded with its source file and the modules it
+    depends on.  :meth:`affected` turns a set of changed files into the source
+    files whose stubs may be stale.  The graph is stored as JSON at *path*.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self.files: dict[str, Path] = {}
+        self.deps: dict[str, frozenset[str]] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> DependencyGraph:
+        """Read the graph stored at *path*; a missing or corrupt file gives an empty graph."""
+        graph = cls(path)
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return graph
+        if not isinstance(data, dict) or data.get("format") != _FORMAT:
+            return graph
+        for name, entry in data["modules"].items():
+            graph.files[name] = Path(entry["file"])
+            graph.deps[name] = frozenset(entry["deps"])
+        return graph
+
+    def save(self) -> None:
+        if self.path is None:
+            raise ValueError("graph has no path")
+        modules = {
+            name: {"file": str(self.files[name]), "deps": sorted(self.deps[name])}
+            for name in sorted(self.files)
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"format": _FORMAT, "modules": modules}))
+        os.replace(tmp, self.path)
+
+    def record(self, module_name: str, src: Path, deps: Iterable[str]) -> None:
+        self.files[module_name] = src.resolve()
+        self.deps[module_name] = frozenset(deps)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def dependents(self, names: Iterable[str]) -> set[str]:
+        """Return *names* plus every recorded module that transitively depends on them."""
+        reverse: dict[str, set[str]] = {}
+        for name, deps in self.deps.items():
+            for dep in deps:
+                reverse.setdefault(dep, set()).add(name)
+        result = set(names)
+        stack = list(result)
+        while stack:
+            for user in reverse.get(stack.pop(), ()):
+                if user not in result:
+                    result.add(user)
+                    stack.append(user)
+        return result
+
+    def affected(self, changed: Iterable[Path]) -> set[Path]:
+        """Return the source files whose stubs may change when *changed* files do.
+
+        The changed files themselves are included.
+        """
+        from .stubgen import _module_name_from_path
+
+        changed = {Path(p).resolve() for p in changed}
+        by_file = {path: name for name, path in self.files.items()}
+        names = {by_file.get(p) or _module_name_from_path(p) for p in changed}
+        return {self.files[n] for n in self.dependents(names) if n in self.files} | changed
+
+
+__all__ = ["DependencyGraph", "module_dependencies"]
@@ -56,6 +56,14 @@ def clear_registry() -> None:
             pass
 
 
+def clear_module_overloads(module: str) -> None:
+    """Forget overloads registered by *module*, e.g. before re-importing it."""
+    _OVERLOAD_REGISTRY.pop(module, None)
+    registry = getattr(typing, "_overload_registry", None)
+    if registry is not None:
+        registry.pop(module, None)
+
+
 @contextmanager
 def patch_typing():
     """Context manager that patches ``typing.overload`` and ``get_overloads``."""
@@ -103,6 +111,7 @@ __all__ = [
     "overload_for",
     "get_overloads",
     "clear_registry",
+    "clear_module_overloads",
     "patch_typing",
     "all_annotations",
 ]
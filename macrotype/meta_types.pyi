@@ -18,12 +18,14 @@ __all__ = [
     "overload_for",
     "get_overloads",
     "clear_registry",
+    "clear_module_overloads",
     "patch_typing",
     "all_annotations",
 ]
 
 def overload_for(*args, **kwargs): ...
 def clear_registry() -> None: ...
+def clear_module_overloads(module: str) -> None: ...
 def patch_typing(): ...
 def get_caller_module(level: int) -> str: ...
 def set_module(obj: Any, module: str) -> None: ...
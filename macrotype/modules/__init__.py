@@ -3,10 +3,12 @@ from __future__ import annotations
 """Module analysis pipeline."""
 
 from types import ModuleType
+from typing import TYPE_CHECKING
 
-from .emit import emit_module
 from .ir import ModuleDecl, SourceInfo
-from .scanner import scan_module
+
+if TYPE_CHECKING:
+    from macrotype.profiling import PassProfiler
 
 __all__ = [
     "ModuleDecl",
@@ -29,6 +31,7 @@ __all__ = [
     "prune_inherited_typeddict_fields",
     "prune_protocol_methods",
     "emit_module",
+    "iter_emit_module",
     "scan_module",
     "transform_dataclasses",
     "resolve_imports",
@@ -36,6 +39,16 @@ __all__ = [
 
 
 def __getattr__(name: str):
+    # Imported lazily so that loading the IR, e.g. for a cache hit, does not
+    # pull in ``inspect`` and every transformer.
+    if name in {"emit_module", "iter_emit_module"}:
+        from . import emit
+
+        return getattr(emit, name)
+    if name == "scan_module":
+        from .scanner import scan_module
+
+        return scan_module
     if name in {
         "add_source_info",
         "add_comments",
@@ -63,58 +76,84 @@ def __getattr__(name: str):
     raise AttributeError(name)
 
 
+# Transformers applied by :func:`from_module`, in order.
+_PASSES = (
+    "canonicalize_foreign_symbols",
+    "recover_custom_generics",
+    "unwrap_decorated_functions",
+    "canonicalize_local_aliases",
+    "synthesize_aliases",
+    "transform_newtypes",
+    "transform_enums",
+    "transform_generics",
+    "transform_dataclasses",
+    "apply_dataclass_transform",
+    "infer_constant_types",
+    "prune_inherited_typeddict_fields",
+    "normalize_descriptors",
+    "transform_namedtuples",
+    "infer_param_defaults",
+    "normalize_flags",
+    "prune_protocol_methods",
+    "expand_overloads",
+    "recover_custom_generics",
+    "add_comments",
+    "resolve_imports",
+)
+
+
 def from_module(
     mod: ModuleType,
     *,
     source_info: SourceInfo | None = None,
     strict: bool = False,
+    profile: PassProfiler | None = None,
 ) -> ModuleDecl:
     """Scan *mod* into a :class:`ModuleDecl` and attach comments.
 
     If *strict* is ``True``, all annotations are normalized and validated via
-    ``macrotype.types`` before returning.
+    ``macrotype.types`` before returning.  If *profile* is given, the scan,
+    every transformer and normalization are timed as separate phases.
     """
 
+    from macrotype.profiling import profile_phase
+
     from . import transformers as _t
+    from .scanner import scan_module
 
-    mi = scan_module(mod)
-    _t.add_source_info(mi, source_info)
-    _t.canonicalize_foreign_symbols(mi)
-    _t.recover_custom_generics(mi)
-    _t.unwrap_decorated_functions(mi)
-    _t.canonicalize_local_aliases(mi)
-    _t.synthesize_aliases(mi)
-    _t.transform_newtypes(mi)
-    _t.transform_enums(mi)
-    _t.transform_generics(mi)
-    _t.transform_dataclasses(mi)
-    _t.apply_dataclass_transform(mi)
-    _t.infer_constant_types(mi)
-    _t.prune_inherited_typeddict_fields(mi)
-    _t.normalize_descriptors(mi)
-    _t.transform_namedtuples(mi)
-    _t.infer_param_defaults(mi)
-    _t.normalize_flags(mi)
-    _t.prune_protocol_methods(mi)
-    _t.expand_overloads(mi)
-    _t.recover_custom_generics(mi)
-    _t.add_comments(mi)
-    _t.resolve_imports(mi)
+    name = mod.__name__
+    with profile_phase(profile, name, "scan_module"):
+        mi = scan_module(mod)
+    with profile_phase(profile, name, "add_source_info"):
+        _t.add_source_info(mi, source_info)
+    for pass_name in _PASSES:
+        with profile_phase(profile, name, pass_name):
+            getattr(_t, pass_name)(mi)
 
     if strict:
-        from macrotype.types import normalize_annotation
+        from macrotype.types import normalize_many
 
         from .ir import AnnExpr
 
-        for decl in mi.iter_all_decls():
-            for site in decl.get_annotation_sites():
-                if site.role != "alias_value":
-                    ctx = "call_params" if site.role == "param" else "top"
-                    ann = site.annotation
-                    if isinstance(ann, AnnExpr):
-                        norm = normalize_annotation(ann.evaluated, ctx=ctx)
-                        site.annotation = AnnExpr(expr=ann.expr, evaluated=norm)
-                    else:
-                        site.annotation = normalize_annotation(ann, ctx=ctx)
+        with profile_phase(profile, name, "normalize"):
+            sites = [
+                site
+                for decl in mi.iter_all_decls()
+                for site in decl.get_annotation_sites()
+                if site.role != "alias_value"
+            ]
+            normalized = normalize_many(
+                [
+                    s.annotation.evaluated if isinstance(s.annotation, AnnExpr) else s.annotation
+                    for s in sites
+                ],
+                ctx=["call_params" if s.role == "param" else "top" for s in sites],
+            )
+            for site, norm in zip(sites, normalized):
+                ann = site.annotation
+                if isinstance(ann, AnnExpr):
+                    site.annotation = AnnExpr(expr=ann.expr, evaluated=norm)
+                else:
+                    site.annotation = norm
 
     return mi
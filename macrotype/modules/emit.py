@@ -3,7 +3,7 @@ from __future__ import annotations
 import enum
 import inspect
 import types
-from typing import Annotated, Any, Callable, ForwardRef, Iterable, get_args, get_origin
+from typing import Annotated, Any, Callable, ForwardRef, Iterable, Iterator, get_args, get_origin
 
 INDENT = "    "
 
@@ -36,34 +36,20 @@ def _qualname(obj: Any, default: str | None = None) -> str:
 
 def emit_module(mi: ModuleDecl) -> list[str]:
     """Emit `.pyi` lines for a ModuleDecl using annotations only."""
-    annotations = collect_all_annotations(mi)
-    atoms: dict[int, Any] = {}
-    for ann in annotations:
-        atoms.update(flatten_annotation_atoms(ann))
-    for sym in mi.get_all_decls():
-        if isinstance(sym, TypeDefDecl) and sym.value is not None:
-            atoms.update(flatten_annotation_atoms(sym.value.annotation))
-
-    context = mi.obj.__dict__
-    name_map = build_name_map(atoms.values(), context)
-
+    name_map = _module_name_map(mi)
+    # Generated modules repeat a few annotation objects across many sites.
+    memo: dict[int, tuple[Any, str]] = {}
     lines: list[str] = []
-    for sym in mi.members:
-        if not sym.emit:
-            continue
-        lines.extend(_emit_decl(sym, name_map, mi.obj.__name__, indent=0))
+    for chunk in _emit_members(mi, name_map, memo):
+        lines.extend(chunk)
         lines.append("")
     if lines and lines[-1] == "":
         lines.pop()
 
     if mi.imports:
-        mi.imports.cull(lines, context)
+        mi.imports.cull(lines, mi.obj.__dict__)
 
-    pre: list[str] = []
-    if mi.source and mi.source.headers:
-        pre.extend(mi.source.headers)
-    imports = mi.imports.lines() if mi.imports else []
-    pre.extend(imports)
+    pre = _prelude(mi)
     if lines:
         if pre:
             pre.append("")
@@ -71,6 +57,75 @@ def emit_module(mi: ModuleDecl) -> list[str]:
     return pre
 
 
+# Rendered declarations beyond this many characters are spooled to disk.
+SPOOL_MAX = 1 << 20
+
+
+def iter_emit_module(mi: ModuleDecl) -> Iterator[str]:
+    """Yield the lines of :func:`emit_module` without holding the whole stub.
+
+    Imports come first but depend on every declaration, so each declaration
+    is rendered once, while the names it uses are collected, into a
+    temporary file that only spills to disk past :data:`SPOOL_MAX`.  The
+    lines are read back from it after the imports.
+    """
+    import tempfile
+
+    name_map = _module_name_map(mi)
+    memo: dict[int, tuple[Any, str]] = {}
+    usage = mi.imports.usage() if mi.imports else None
+    with tempfile.SpooledTemporaryFile(SPOOL_MAX, mode="w+", newline="\n") as body:
+        first = True
+        for chunk in _emit_members(mi, name_map, memo):
+            text = "\n".join(chunk)
+            if usage is not None:
+                usage.update((text,))
+            if not first:
+                body.write("\n")
+            first = False
+            if chunk:
+                body.write(text + "\n")
+        if usage is not None:
+            mi.imports.cull_unused(usage, mi.obj.__dict__)
+
+        pre = _prelude(mi)
+        yield from pre
+        if not first and pre:
+            yield ""
+        body.seek(0)
+        for line in body:
+            yield line[:-1]
+
+
+def _module_name_map(mi: ModuleDecl) -> dict[int, str]:
+    names = mi.name_context
+    annotations = collect_all_annotations(mi)
+    annotations += [
+        sym.value.annotation
+        for sym in mi.iter_all_decls()
+        if isinstance(sym, TypeDefDecl) and sym.value is not None
+    ]
+    return names.name_map(names.atoms(annotations).values())
+
+
+def _emit_members(
+    mi: ModuleDecl, name_map: dict[int, str], memo: dict[int, tuple[Any, str]]
+) -> Iterator[list[str]]:
+    """Yield the lines of every emitted top-level declaration of *mi*."""
+    for sym in mi.members:
+        if sym.emit:
+            yield _emit_decl(sym, name_map, mi.obj.__name__, indent=0, memo=memo)
+
+
+def _prelude(mi: ModuleDecl) -> list[str]:
+    pre: list[str] = []
+    if mi.source and mi.source.headers:
+        pre.extend(mi.source.headers)
+    if mi.imports:
+        pre.extend(mi.imports.lines())
+    return pre
+
+
 def _add_comment(line: str, comment: str | None) -> str:
     if comment:
         return f"{line}  # {comment}"
@@ -156,11 +211,16 @@ def flatten_annotation_atoms(ann: Any) -> dict[int, Any]:
     return atoms
 
 
-def build_name_map(atoms: Iterable[Any], context: dict[str, Any]) -> dict[int, str]:
-    """Map annotation atoms to names based on module context."""
+_PRIMITIVES = (type(None), bool, int, float, complex, str, bytes)
+
+# Most entries :func:`stringify_annotation` keeps in a memo.
+_MEMO_LIMIT = 4096
+
+
+def _reverse_names(context: dict[str, Any]) -> dict[int, str]:
+    """Map the id of every object bound in *context* to its name there."""
     module_name = context.get("__name__")
     reverse: dict[int, str] = {}
-    primitives = (type(None), bool, int, float, complex, str, bytes)
 
     def _collect_nested(obj: Any, prefix: str) -> None:
         if not (inspect.isclass(obj) and getattr(obj, "__module__", None) == module_name):
@@ -174,48 +234,124 @@ def build_name_map(atoms: Iterable[Any], context: dict[str, Any]) -> dict[int, s
                 _collect_nested(val, qual)
 
     for k, v in context.items():
-        if isinstance(v, primitives) or inspect.isroutine(v):
+        if isinstance(v, _PRIMITIVES) or inspect.isroutine(v):
             continue
         reverse.setdefault(id(v), k)
         _collect_nested(v, k)
+    return reverse
 
-    name_map: dict[int, str] = {}
-
-    def _best_name(obj: Any) -> str:
-        if isinstance(obj, primitives):
-            return _qualname(obj)
-        qual = getattr(obj, "__qualname__", None)
-        if qual and "." in qual:
-            return qual
-        name = getattr(obj, "__name__", None)
-        if name is not None:
-            return name
-        tname = getattr(type(obj), "__qualname__", getattr(type(obj), "__name__", None))
-        if tname is not None:
-            return tname
-        return _qualname(obj)
-
-    for atom in atoms:
-        atom_id = id(atom)
-        if isinstance(atom, ForwardRef):
-            name_map[atom_id] = atom.__forward_arg__
-            continue
-        if atom_id in reverse:
-            name = reverse[atom_id]
-            mod = getattr(atom, "__module__", None)
-            qual = _best_name(atom)
-            if mod not in {module_name, "builtins"} and qual != name:
-                name_map[atom_id] = qual
-            else:
-                name_map[atom_id] = name
-            continue
-        name_map[atom_id] = _best_name(atom)
 
-    return name_map
+def _best_name(obj: Any) -> str:
+    if isinstance(obj, _PRIMITIVES):
+        return _qualname(obj)
+    qual = getattr(obj, "__qualname__", None)
+    if qual and "." in qual:
+        return qual
+    name = getattr(obj, "__name__", None)
+    if name is not None:
+        return name
+    tname = getattr(type(obj), "__qualname__", getattr(type(obj), "__name__", None))
+    if tname is not None:
+        return tname
+    return _qualname(obj)
+
+
+def _atom_name(atom: Any, reverse: dict[int, str], module_name: str | None) -> str:
+    if isinstance(atom, ForwardRef):
+        return atom.__forward_arg__
+    name = reverse.get(id(atom))
+    if name is None:
+        return _best_name(atom)
+    qual = _best_name(atom)
+    if getattr(atom, "__module__", None) not in {module_name, "builtins"} and qual != name:
+        return qual
+    return name
 
 
-def stringify_annotation(ann: Any, name_map: dict[int, str], module_name: str | None = None) -> str:
-    """Emit string form of a type annotation."""
+def build_name_map(atoms: Iterable[Any], context: dict[str, Any]) -> dict[int, str]:
+    """Map annotation atoms to names based on module context."""
+    module_name = context.get("__name__")
+    reverse = _reverse_names(context)
+    return {id(atom): _atom_name(atom, reverse, module_name) for atom in atoms}
+
+
+class NameContext:
+    """Annotation atoms and their names for one module.
+
+    ``resolve_imports`` and :func:`emit_module` both need the atoms of every
+    annotation and a name for each atom.  This computes them once per
+    :class:`ModuleDecl` (see :attr:`ModuleDecl.name_context`): atoms are
+    memoized per annotation object and names per atom, and the module
+    namespace is scanned only once.  A pass that replaces an annotation
+    therefore only pays for the new one.  The memo keeps every annotation and
+    atom alive, so ids are never reused while it exists.
+    """
+
+    def __init__(self, context: dict[str, Any]) -> None:
+        self.context = context
+        self.module_name = context.get("__name__")
+        self._reverse: dict[int, str] | None = None
+        self._atoms: dict[int, tuple[Any, dict[int, Any]]] = {}
+        self._names: dict[int, tuple[Any, str]] = {}
+
+    def atoms(self, annotations: Iterable[Any]) -> dict[int, Any]:
+        """Return the atoms of all *annotations* keyed by id."""
+        atoms: dict[int, Any] = {}
+        for ann in annotations:
+            entry = self._atoms.get(id(ann))
+            if entry is None:
+                entry = self._atoms[id(ann)] = (ann, flatten_annotation_atoms(ann))
+            atoms.update(entry[1])
+        return atoms
+
+    def name_map(self, atoms: Iterable[Any]) -> dict[int, str]:
+        """Return :func:`build_name_map` of *atoms* in the module namespace."""
+        if self._reverse is None:
+            self._reverse = _reverse_names(self.context)
+        name_map: dict[int, str] = {}
+        for atom in atoms:
+            entry = self._names.get(id(atom))
+            if entry is None:
+                name = _atom_name(atom, self._reverse, self.module_name)
+                entry = self._names[id(atom)] = (atom, name)
+            name_map[id(atom)] = entry[1]
+        return name_map
+
+
+def stringify_annotation(
+    ann: Any,
+    name_map: dict[int, str],
+    module_name: str | None = None,
+    *,
+    memo: dict[int, tuple[Any, str]] | None = None,
+) -> str:
+    """Emit string form of a type annotation.
+
+    With *memo*, every annotation object, nested ones included, is formatted
+    once and looked up by identity afterwards.  The strings depend on
+    *name_map* and *module_name*, so a memo must only be shared by calls that
+    pass the same ones; :func:`emit_module` uses one per module.  Entries keep
+    their annotation alive so ids are not reused while the memo exists.  The
+    memo is emptied whenever it reaches ``_MEMO_LIMIT`` entries, so modules
+    whose annotations are all distinct do not keep a second copy of the stub.
+    """
+    if memo is None:
+        return _stringify(ann, name_map, module_name, None)
+    entry = memo.get(id(ann))
+    if entry is None:
+        text = _stringify(ann, name_map, module_name, memo)
+        if len(memo) >= _MEMO_LIMIT:
+            memo.clear()
+        entry = memo[id(ann)] = (ann, text)
+    return entry[1]
+
+
+def _stringify(
+    ann: Any,
+    name_map: dict[int, str],
+    module_name: str | None,
+    memo: dict[int, tuple[Any, str]] | None,
+) -> str:
     if ann is Ellipsis:
         return "..."
 
@@ -244,7 +380,7 @@ def stringify_annotation(ann: Any, name_map: dict[int, str], module_name: str |
     origin, args = _origin_and_args(ann)
 
     if origin in {types.UnionType, t.Union}:
-        items = [(arg, stringify_annotation(arg, name_map, module_name)) for arg in args]
+        items = [(arg, stringify_annotation(arg, name_map, module_name, memo=memo)) for arg in args]
         items.sort(key=lambda item: (0 if isinstance(item[0], t.TypeVar) else 1, item[1]))
         return " | ".join(s for _, s in items)
 
@@ -256,18 +392,20 @@ def stringify_annotation(ann: Any, name_map: dict[int, str], module_name: str |
         name = name_map.get(id(origin), _qualname(origin, "Callable"))
         if len(args) == 2:
             params, ret = args
-            ret_str = stringify_annotation(ret, name_map, module_name)
+            ret_str = stringify_annotation(ret, name_map, module_name, memo=memo)
             if params is Ellipsis:
                 return f"{name}[..., {ret_str}]"
             if isinstance(params, t.ParamSpec) or get_origin(params) is t.Concatenate:
-                params_str = stringify_annotation(params, name_map, module_name)
+                params_str = stringify_annotation(params, name_map, module_name, memo=memo)
                 return f"{name}[{params_str}, {ret_str}]"
             if not isinstance(params, (list, tuple)):
                 params = [params]
         else:
             *params, ret = args
-            ret_str = stringify_annotation(ret, name_map, module_name)
-        params_str = ", ".join(stringify_annotation(p, name_map, module_name) for p in params)
+            ret_str = stringify_annotation(ret, name_map, module_name, memo=memo)
+        params_str = ", ".join(
+            stringify_annotation(p, name_map, module_name, memo=memo) for p in params
+        )
         return f"{name}[[{params_str}], {ret_str}]"
 
     if origin is t.Unpack:
@@ -280,11 +418,11 @@ def stringify_annotation(ann: Any, name_map: dict[int, str], module_name: str |
             ps = getattr(inner, "__origin__", None)
             name = name_map.get(id(ps), _qualname(ps))
             return f"**{name}.kwargs"
-        return f"Unpack[{stringify_annotation(inner, name_map, module_name)}]"
+        return f"Unpack[{stringify_annotation(inner, name_map, module_name, memo=memo)}]"
 
     if origin is Annotated:
         first, *metas = args
-        parts = [stringify_annotation(first, name_map, module_name)]
+        parts = [stringify_annotation(first, name_map, module_name, memo=memo)]
         for meta in metas:
             name = name_map.get(id(meta))
             if (
@@ -303,7 +441,9 @@ def stringify_annotation(ann: Any, name_map: dict[int, str], module_name: str |
 
     if origin is not None:
         name = name_map.get(id(origin), _qualname(origin))
-        inner = ", ".join(stringify_annotation(arg, name_map, module_name) for arg in args)
+        inner = ", ".join(
+            stringify_annotation(arg, name_map, module_name, memo=memo) for arg in args
+        )
         return f"{name}[{inner}]"
     else:
         return name_map.get(id(ann), _qualname(ann))
@@ -322,14 +462,21 @@ def stringify_value(val: Any, name_map: dict[int, str]) -> str:
     return name_map.get(id(val), repr(val))
 
 
-def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent: int) -> list[str]:
+def _emit_decl(
+    sym: Decl,
+    name_map: dict[int, str],
+    module_name: str,
+    *,
+    indent: int,
+    memo: dict[int, tuple[Any, str]] | None = None,
+) -> list[str]:
     if not sym.emit:
         return []
     pad = INDENT * indent
 
     match sym:
         case VarDecl(site=site):
-            ty = stringify_annotation(site.annotation, name_map, module_name)
+            ty = stringify_annotation(site.annotation, name_map, module_name, memo=memo)
             line = f"{pad}{sym.name}: {ty}"
             line = _add_comment(line, sym.comment or site.comment)
             return [line]
@@ -341,21 +488,21 @@ def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent:
                     rhs = stringify_value(site.annotation, name_map)
                 case t.TypeAliasType():  # type: ignore[attr-defined]
                     keyword = "type "
-                    rhs = stringify_annotation(site.annotation, name_map, module_name)
+                    rhs = stringify_annotation(site.annotation, name_map, module_name, memo=memo)
                     param_str = f"[{', '.join(params)}]" if params else ""
                 case t.TypeVar():
-                    rhs = _stringify_typevar(alias, name_map, module_name)
+                    rhs = _stringify_typevar(alias, name_map, module_name, memo=memo)
                 case t.ParamSpec():
                     rhs = _stringify_paramspec(alias)
                 case t.TypeVarTuple():
                     rhs = _stringify_typevartuple(alias)
                 case t.TypeAlias:  # type: ignore[misc]
-                    rhs = stringify_annotation(site.annotation, name_map, module_name)
+                    rhs = stringify_annotation(site.annotation, name_map, module_name, memo=memo)
                 case t.NewType:
-                    ty = stringify_annotation(site.annotation, name_map, module_name)
+                    ty = stringify_annotation(site.annotation, name_map, module_name, memo=memo)
                     rhs = f'NewType("{sym.name}", {ty})'
                 case types.GenericAlias():
-                    rhs = stringify_annotation(site.annotation, name_map, module_name)
+                    rhs = stringify_annotation(site.annotation, name_map, module_name, memo=memo)
                 case _:
                     raise NotImplementedError(f"Unsupported alias type: {alias!r}")
             line = f"{pad}{keyword}{sym.name}{param_str} = {rhs}"
@@ -376,10 +523,12 @@ def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent:
                     param_strs.append(name)
                 else:
                     param_strs.append(
-                        f"{name}: {stringify_annotation(p.annotation, name_map, module_name)}"
+                        f"{name}: {stringify_annotation(p.annotation, name_map, module_name, memo=memo)}"
                     )
             ret_str = (
-                f" -> {stringify_annotation(ret.annotation, name_map, module_name)}" if ret else ""
+                f" -> {stringify_annotation(ret.annotation, name_map, module_name, memo=memo)}"
+                if ret
+                else ""
             )
             tp_str = f"[{', '.join(tp)}]" if tp else ""
             prefix = "async " if is_async else ""
@@ -397,7 +546,7 @@ def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent:
         ):
             base_str = ""
             if bases:
-                base_str = f"({', '.join(stringify_annotation(b.annotation, name_map, module_name) for b in bases)})"
+                base_str = f"({', '.join(stringify_annotation(b.annotation, name_map, module_name, memo=memo) for b in bases)})"
             tp_str = f"[{', '.join(tp)}]" if tp else ""
             lines = [f"{pad}@{d}" for d in decos]
             first = f"{pad}class {sym.name}{tp_str}{base_str}:"
@@ -405,13 +554,13 @@ def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent:
             lines.append(first)
             if fields:
                 for f in fields:
-                    ty = stringify_annotation(f.annotation, name_map, module_name)
+                    ty = stringify_annotation(f.annotation, name_map, module_name, memo=memo)
                     line = f"{pad}{INDENT}{f.name}: {ty}"
                     line = _add_comment(line, f.comment)
                     lines.append(line)
             if members:
                 for m in members:
-                    lines.extend(_emit_decl(m, name_map, module_name, indent=indent + 1))
+                    lines.extend(_emit_decl(m, name_map, module_name, indent=indent + 1, memo=memo))
             if not fields and not members:
                 lines.append(f"{pad}{INDENT}...")
             return lines
@@ -420,14 +569,20 @@ def _emit_decl(sym: Decl, name_map: dict[int, str], module_name: str, *, indent:
             raise NotImplementedError(f"Unsupported symbol: {type(sym).__name__}")
 
 
-def _stringify_typevar(tv: t.TypeVar, name_map: dict[int, str], module_name: str) -> str:
+def _stringify_typevar(
+    tv: t.TypeVar,
+    name_map: dict[int, str],
+    module_name: str,
+    *,
+    memo: dict[int, tuple[Any, str]] | None = None,
+) -> str:
     args = [f'"{tv.__name__}"']
     bound = getattr(tv, "__bound__", None)
     constraints = getattr(tv, "__constraints__", ())
     if bound is not None:
-        args.append(f"bound={stringify_annotation(bound, name_map, module_name)}")
+        args.append(f"bound={stringify_annotation(bound, name_map, module_name, memo=memo)}")
     elif constraints:
-        args.extend(stringify_annotation(c, name_map, module_name) for c in constraints)
+        args.extend(stringify_annotation(c, name_map, module_name, memo=memo) for c in constraints)
     if getattr(tv, "__covariant__", False):
         args.append("covariant=True")
     if getattr(tv, "__contravariant__", False):
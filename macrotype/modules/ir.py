@@ -4,7 +4,12 @@ import ast
 import re
 from dataclasses import dataclass, field
 from types import EllipsisType, ModuleType
-from typing import Any, Iterable, Iterator, Literal, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Literal, Optional
+
+if TYPE_CHECKING:
+    from macrotype.modules.emit import NameContext
+
+_WORD = re.compile(r"\w+")
 
 
 @dataclass(kw_only=True)
@@ -100,6 +105,47 @@ class TypeDefDecl(Decl):
         return (self.value,) if self.value is not None else ()
 
 
+@dataclass(kw_only=True)
+class SourceIndex:
+    """Everything the transformers read from a module's source.
+
+    Built by :func:`macrotype.modules.source.build_source_index` from a single
+    tokenize pass and a single parse.  ``lines`` are split, with their line
+    ends, where tokenize and ``ast`` line numbers split.  ``ranges`` maps the qualified name of
+    every class and function, including nested class members, to the
+    ``(first, last)`` lines of each of its definitions, decorators included.
+    The annotation maps hold the source text of top-level annotations keyed
+    like ``recover_custom_generics`` looks them up: functions are numbered in
+    definition order so overloads can be told apart.
+    """
+
+    code: str
+    lines: list[str]
+    tree: ast.Module
+    comments: dict[int, str]
+    headers: list[str]
+    line_map: dict[str, int]
+    ranges: dict[str, list[tuple[int, int]]]
+    var_annotations: dict[str, str]
+    param_annotations: dict[tuple[str, int, str], str]
+    return_annotations: dict[tuple[str, int], str]
+    tc_imports: dict[str, set[str]]
+
+    def range_of(self, qualname: str, firstlineno: int | None = None) -> tuple[int, int] | None:
+        """Return the lines of *qualname*, preferring the definition at *firstlineno*.
+
+        Without a match, the first definition is used, as :mod:`inspect` does
+        for classes before Python 3.13 added ``__firstlineno__``.
+        """
+        found = self.ranges.get(qualname)
+        if not found:
+            return None
+        for rng in found:
+            if rng[0] == firstlineno:
+                return rng
+        return found[0]
+
+
 @dataclass(kw_only=True)
 class SourceInfo:
     headers: list[str]
@@ -107,15 +153,21 @@ class SourceInfo:
     line_map: dict[str, int]
     tc_imports: dict[str, set[str]] = field(default_factory=dict)
     code: str | None = None
-    _tree: ast.AST | None = field(default=None, init=False, repr=False)
+    _index: SourceIndex | None = field(default=None, init=False, repr=False)
 
     @property
-    def tree(self) -> ast.AST:
-        if self._tree is None:
+    def index(self) -> SourceIndex:
+        if self._index is None:
             if self.code is None:
-                raise ValueError("No source code available for AST")
-            self._tree = ast.parse(self.code)
-        return self._tree
+                raise ValueError("No source code available for index")
+            from .source import build_source_index
+
+            self._index = build_source_index(self.code, allow_type_checking=True)
+        return self._index
+
+    @property
+    def tree(self) -> ast.Module:
+        return self.index.tree
 
 
 @dataclass(kw_only=True)
@@ -133,27 +185,62 @@ class ImportBlock:
             lines.append(f"from typing import {', '.join(sorted(self.typing))}")
         return lines
 
+    def usage(self) -> ImportUsage:
+        """Return an empty :class:`ImportUsage` for the names imported here."""
+        names = {name.split(" as ")[-1] for names in self.froms.values() for name in names}
+        return ImportUsage(names | self.typing)
+
     def cull(self, lines: Iterable[str], defined: Iterable[str]) -> None:
-        text = "\n".join(lines)
-        defined_set = set(defined)
+        """Drop imported names that *lines* never use and *defined* does not list."""
+        usage = self.usage()
+        usage.update(lines)
+        self.cull_unused(usage, defined)
+
+    def cull_unused(self, usage: ImportUsage, defined: Iterable[str]) -> None:
+        """Drop imported names that *usage* has not seen and *defined* does not list."""
+        defined = set(defined)
+
+        def used(name: str) -> bool:
+            return name in usage or name in defined
+
         new_froms: dict[str, set[str]] = {}
         for mod, names in self.froms.items():
-            kept = {
-                name
-                for name in names
-                if (
-                    name.split(" as ")[-1] in defined_set
-                    or re.search(r"\b" + re.escape(name.split(" as ")[-1]) + r"\b", text)
-                )
-            }
+            kept = {name for name in names if used(name.split(" as ")[-1])}
             if kept:
                 new_froms[mod] = kept
         self.froms = new_froms
-        self.typing = {
-            name
-            for name in self.typing
-            if name in defined_set or re.search(r"\b" + re.escape(name) + r"\b", text)
+        self.typing = {name for name in self.typing if used(name)}
+
+
+class ImportUsage:
+    """Names used by emitted stub lines, collected without keeping the lines.
+
+    A name is used if it occurs as a whole word, as ``\\bname\\b`` would
+    find it.  Only the words of every chunk passed to :meth:`update` are
+    kept, so a stub can be checked one declaration at a time.  *names* lists
+    the imported names that are not plain words, such as dotted ones; those
+    are searched for in each chunk as it arrives.
+    """
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.words: set[str] = set()
+        self._pending = {
+            name: re.compile(r"\b" + re.escape(name) + r"\b")
+            for name in names
+            if not _WORD.fullmatch(name)
         }
+        self._found: set[str] = set()
+
+    def update(self, lines: Iterable[str]) -> None:
+        text = "\n".join(lines)
+        self.words.update(_WORD.findall(text))
+        for name, pattern in list(self._pending.items()):
+            if pattern.search(text):
+                self._found.add(name)
+                del self._pending[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.words or name in self._found
 
 
 @dataclass(kw_only=True)
@@ -162,6 +249,16 @@ class ModuleDecl(Decl):
     members: list[Decl]
     imports: ImportBlock = field(default_factory=ImportBlock)
     source: SourceInfo | None = None
+    _name_context: NameContext | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def name_context(self) -> NameContext:
+        """Annotation atoms and names shared by import resolution and emission."""
+        if self._name_context is None:
+            from .emit import NameContext
+
+            self._name_context = NameContext(self.obj.__dict__)
+        return self._name_context
 
     def get_children(self) -> tuple[Decl, ...]:
         return tuple(self.members)
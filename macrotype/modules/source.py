@@ -9,7 +9,7 @@ import tokenize
 from collections import defaultdict
 from typing import Dict, Set
 
-from .ir import SourceInfo
+from .ir import SourceIndex, SourceInfo
 
 # Comments matching this pattern are considered "pragma" headers that should be
 # preserved in generated stubs.  Other leading comments are treated as regular
@@ -60,8 +60,78 @@ def extract_type_checking_imports(
     return _tc_imports_from_tree(tree, allow_complex=allow_type_checking)
 
 
-def extract_source_info(code: str, *, allow_type_checking: bool = False) -> SourceInfo:
-    """Return SourceInfo for *code* including parsed AST."""
+# Line splitting used by ``ast`` positions: form feeds and other characters
+# ``str.splitlines`` breaks on are not line ends.
+_LINE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+
+
+def _segment(lines: list[str], node: ast.AST) -> str:
+    """Return the source of *node* like :func:`ast.get_source_segment`.
+
+    ``get_source_segment`` splits the whole module on every call, so *lines*
+    is split once by the caller instead.
+    """
+    end_lineno = getattr(node, "end_lineno", None)
+    end_col = getattr(node, "end_col_offset", None)
+    if end_lineno is None or end_col is None:
+        return ""
+    first, last, col = node.lineno - 1, end_lineno - 1, node.col_offset
+    if first == last:
+        return lines[first].encode()[col:end_col].decode()
+    head = lines[first].encode()[col:].decode()
+    tail = lines[last].encode()[:end_col].decode()
+    return "".join([head, *lines[first + 1 : last], tail])
+
+
+def _index_annotations(
+    lines: list[str],
+    body: list[ast.stmt],
+) -> tuple[dict[str, str], dict[tuple[str, int, str], str], dict[tuple[str, int], str]]:
+    var_map: dict[str, str] = {}
+    param_map: dict[tuple[str, int, str], str] = {}
+    ret_map: dict[tuple[str, int], str] = {}
+    counts: dict[str, int] = {}
+    for node in body:
+        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            var_map[node.target.id] = _segment(lines, node.annotation)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            fname = node.name
+            idx = counts.get(fname, 0)
+            counts[fname] = idx + 1
+            if node.returns is not None:
+                ret_map[(fname, idx)] = _segment(lines, node.returns)
+            args = [*node.args.posonlyargs, *node.args.args, *node.args.kwonlyargs]
+            args += [a for a in (node.args.vararg, node.args.kwarg) if a is not None]
+            for arg in args:
+                if arg.annotation is not None:
+                    param_map[(fname, idx, arg.arg)] = _segment(lines, arg.annotation)
+    return var_map, param_map, ret_map
+
+
+def _index_ranges(
+    body: list[ast.stmt], prefix: str, ranges: dict[str, list[tuple[int, int]]]
+) -> None:
+    for node in body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            first = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+            qualname = prefix + node.name
+            ranges.setdefault(qualname, []).append((first, node.end_lineno or node.lineno))
+            inner = qualname + "." if isinstance(node, ast.ClassDef) else qualname + ".<locals>."
+            _index_ranges(node.body, inner, ranges)
+        else:
+            for field in ("body", "orelse", "finalbody", "handlers", "cases"):
+                children = getattr(node, field, None)
+                if isinstance(children, list):
+                    _index_ranges([c for c in children if isinstance(c, ast.AST)], prefix, ranges)
+
+
+def build_source_index(
+    code: str, *, allow_type_checking: bool = False, tree: ast.Module | None = None
+) -> SourceIndex:
+    """Tokenize and parse *code* once and index everything later passes read.
+
+    A *tree* already parsed from *code* is used instead of parsing it again.
+    """
 
     comments: dict[int, str] = {}
     header: list[str] = []
@@ -80,7 +150,8 @@ def extract_source_info(code: str, *, allow_type_checking: bool = False) -> Sour
         ):
             first_code = start[0]
 
-    tree = ast.parse(code)
+    if tree is None:
+        tree = ast.parse(code)
     line_map: dict[str, int] = {}
     for node in tree.body:
         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
@@ -95,17 +166,46 @@ def extract_source_info(code: str, *, allow_type_checking: bool = False) -> Sour
         elif hasattr(ast, "TypeAlias") and isinstance(node, ast.TypeAlias):
             line_map[node.name] = node.lineno
 
-    tc_imports = _tc_imports_from_tree(tree, allow_complex=allow_type_checking)
+    ranges: dict[str, list[tuple[int, int]]] = {}
+    _index_ranges(tree.body, "", ranges)
+    lines = _LINE.findall(code)
+    var_map, param_map, ret_map = _index_annotations(lines, tree.body)
 
-    info = SourceInfo(
-        headers=header,
+    return SourceIndex(
+        code=code,
+        lines=lines,
+        tree=tree,
         comments=comments,
+        headers=header,
         line_map=line_map,
-        tc_imports=tc_imports,
+        ranges=ranges,
+        var_annotations=var_map,
+        param_annotations=param_map,
+        return_annotations=ret_map,
+        tc_imports=_tc_imports_from_tree(tree, allow_complex=allow_type_checking),
+    )
+
+
+def extract_source_info(
+    code: str, *, allow_type_checking: bool = False, tree: ast.Module | None = None
+) -> SourceInfo:
+    """Return SourceInfo for *code* including its :class:`SourceIndex`."""
+
+    index = build_source_index(code, allow_type_checking=allow_type_checking, tree=tree)
+    info = SourceInfo(
+        headers=index.headers,
+        comments=index.comments,
+        line_map=index.line_map,
+        tc_imports=index.tc_imports,
         code=code,
     )
-    info._tree = tree
+    info._index = index
     return info
 
 
-__all__ = ["extract_source_info", "extract_type_checking_imports", "PRAGMA_PREFIX"]
+__all__ = [
+    "build_source_index",
+    "extract_source_info",
+    "extract_type_checking_imports",
+    "PRAGMA_PREFIX",
+]
@@ -0,0 +1,562 @@
+"""Stub modules whose declarations are static without importing them.
+
+Most modules only declare functions, classes and constants whose signatures
+use builtins, the standard typing modules and each other.  Importing such a
+module mostly runs its imports and other import-time side effects, none of
+which reach the stub.  :func:`dynamic_construct` finds the first statement or
+expression in a module that could make its stub depend on more than its own
+declarations.  If there is none, :func:`static_module` executes just the
+declarations: imports from :data:`SAFE_MODULES` run as usual, every other
+``import x`` binds an empty placeholder module, and calls are limited to
+known constructors; ``if TYPE_CHECKING:`` blocks without ``else`` are left
+out, as on import.  The resulting module goes through the normal pipeline,
+so its stub is the same as after a real import.
+
+``from x import y`` is static for modules in :data:`SAFE_MODULES`, for
+modules that are already imported and define ``y``, and for modules of the
+same package, relative or not, that are static themselves and define ``y``.
+Those are executed the same way first, so ``y`` is always the object a real
+import would give.  The stub re-exports an imported name from the module
+that defines its object, which may not be ``x``, so a placeholder cannot
+stand in for it; modules with other ``from`` imports are imported as usual.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib.util
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Iterator
+
+# Standard library modules that are cheap to import, have no import-time side
+# effects and whose objects may appear in a static module's declarations.
+SAFE_MODULES = frozenset(
+    {
+        "__future__",
+        "abc",
+        "collections",
+        "collections.abc",
+        "contextlib",
+        "dataclasses",
+        "datetime",
+        "decimal",
+        "enum",
+        "fractions",
+        "functools",
+        "ipaddress",
+        "itertools",
+        "numbers",
+        "operator",
+        "pathlib",
+        "re",
+        "types",
+        "typing",
+        "uuid",
+    }
+)
+
+# Builtins that are safe to call or to use as decorators at import time.
+_SAFE_BUILTINS = frozenset(
+    {
+        "bool",
+        "bytes",
+        "classmethod",
+        "complex",
+        "dict",
+        "float",
+        "frozenset",
+        "int",
+        "list",
+        "object",
+        "property",
+        "range",
+        "set",
+        "staticmethod",
+        "str",
+        "tuple",
+    }
+)
+
+# Constructors and decorators from SAFE_MODULES that may be called at import
+# time.  None of them calls the objects it is given.
+_SAFE_CALLEES = frozenset(
+    {
+        "abc.ABCMeta",
+        "abc.abstractmethod",
+        "collections.ChainMap",
+        "collections.Counter",
+        "collections.OrderedDict",
+        "collections.defaultdict",
+        "collections.deque",
+        "collections.namedtuple",
+        "contextlib.asynccontextmanager",
+        "contextlib.contextmanager",
+        "dataclasses.dataclass",
+        "dataclasses.field",
+        "datetime.date",
+        "datetime.datetime",
+        "datetime.time",
+        "datetime.timedelta",
+        "datetime.timezone",
+        "decimal.Decimal",
+        "enum.Enum",
+        "enum.EnumMeta",
+        "enum.EnumType",
+        "enum.Flag",
+        "enum.IntEnum",
+        "enum.IntFlag",
+        "enum.StrEnum",
+        "enum.auto",
+        "enum.member",
+        "enum.nonmember",
+        "enum.property",
+        "enum.unique",
+        "fractions.Fraction",
+        "functools.cache",
+        "functools.cached_property",
+        "functools.lru_cache",
+        "functools.partial",
+        "functools.partialmethod",
+        "functools.singledispatch",
+        "functools.singledispatchmethod",
+        "functools.total_ordering",
+        "functools.wraps",
+        "ipaddress.IPv4Address",
+        "ipaddress.IPv4Network",
+        "ipaddress.IPv6Address",
+        "ipaddress.IPv6Network",
+        "ipaddress.ip_address",
+        "ipaddress.ip_interface",
+        "ipaddress.ip_network",
+        "operator.attrgetter",
+        "operator.itemgetter",
+        "pathlib.Path",
+        "pathlib.PurePath",
+        "pathlib.PurePosixPath",
+        "pathlib.PureWindowsPath",
+        "re.compile",
+        "types.MappingProxyType",
+        "types.SimpleNamespace",
+        "typing.ForwardRef",
+        "typing.NamedTuple",
+        "typing.NewType",
+        "typing.ParamSpec",
+        "typing.TypeAliasType",
+        "typing.TypeVar",
+        "typing.TypeVarTuple",
+        "typing.TypedDict",
+        "typing.cast",
+        "typing.dataclass_transform",
+        "typing.final",
+        "typing.no_type_check",
+        "typing.overload",
+        "typing.override",
+        "typing.runtime_checkable",
+        "uuid.UUID",
+    }
+)
+
+# Special methods that run user code when a class is created, subclassed or
+# subscripted, or when an attribute value is stored in a class.
+_HOOKS = frozenset({"__init_subclass__", "__class_getitem__", "__set_name__", "__prepare__"})
+
+# Methods an enum calls for each member while the class is being created.
+_MEMBER_HOOKS = frozenset({"__new__", "__init__", "_generate_next_value_"})
+
+_EXPRESSIONS = (
+    ast.Constant,
+    ast.Name,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Slice,
+    ast.Tuple,
+    ast.List,
+    ast.Set,
+    ast.Dict,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Starred,
+    ast.keyword,
+    ast.expr_context,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+)
+
+
+class _Dynamic(Exception):
+    """Raised by :class:`_Checker` with a description of what is dynamic."""
+
+
+def _where(node: ast.AST, what: str) -> _Dynamic:
+    return _Dynamic(f"line {getattr(node, 'lineno', '?')}: {what}")
+
+
+def _is_main_guard(test: ast.expr) -> bool:
+    return (
+        isinstance(test, ast.Compare)
+        and isinstance(test.left, ast.Name)
+        and test.left.id == "__name__"
+        and len(test.ops) == 1
+        and isinstance(test.ops[0], ast.Eq)
+        and isinstance(test.comparators[0], ast.Constant)
+        and test.comparators[0].value == "__main__"
+    )
+
+
+def _assigns(body: list[ast.stmt]) -> bool:
+    return any(
+        isinstance(stmt, ast.Assign) or (isinstance(stmt, ast.AnnAssign) and stmt.value)
+        for stmt in body
+    )
+
+
+def _package(name: str, path: Path) -> str:
+    if path.name == "__init__.py":
+        return name.removesuffix(".__init__")
+    return name.rpartition(".")[0]
+
+
+def _import_name(name: str, path: Path, stmt: ast.ImportFrom) -> str | None:
+    """Return the absolute name of the module that *stmt* in module *name* imports from."""
+    try:
+        return importlib.util.resolve_name(
+            "." * stmt.level + (stmt.module or ""), _package(name, path)
+        )
+    except ImportError:
+        return None
+
+
+def _project_file(name: str, path: Path, target: str) -> Path | None:
+    """Return the source file of *target* if it is in the same package as module *name*."""
+    package = _package(name, path)
+    if not package or target.partition(".")[0] != package.partition(".")[0]:
+        return None
+    base = path.resolve().parents[package.count(".") + 1].joinpath(*target.split("."))
+    for file in (base / "__init__.py", base.with_suffix(".py")):
+        if file.is_file():
+            return file
+    return None
+
+
+class _Checker:
+    """Walk the statements a module runs on import, rejecting dynamic ones.
+
+    With the *name* and *path* of the module, ``from`` imports of modules
+    that are already imported and of static modules of its package are
+    allowed.  *checked* maps those modules to the names they define, or to
+    ``None`` while they are being checked.
+    """
+
+    def __init__(
+        self,
+        name: str | None = None,
+        path: Path | None = None,
+        checked: dict[str, frozenset[str] | None] | None = None,
+    ) -> None:
+        self.name = name
+        self.path = path
+        self.checked = {} if checked is None else checked
+        # Names bound by ``import x`` of modules outside SAFE_MODULES.
+        self.placeholders: set[str] = set()
+        # Names bound to safe modules and to objects imported from them,
+        # mapped to the module and to the qualified name of the object.
+        self.safe_modules: dict[str, str] = {}
+        self.safe_names: dict[str, str] = {}
+        # Every name the module binds itself.
+        self.bound: set[str] = set()
+
+    def module(self, tree: ast.Module) -> None:
+        for stmt in tree.body:
+            self.statement(stmt, scope=self.bound)
+
+    def bind(self, name: str, scope: set[str], node: ast.AST) -> None:
+        if name in self.placeholders:
+            raise _where(node, f"{name!r} is bound more than once")
+        if scope is self.bound:
+            # Calls through a rebound name no longer reach the safe object.
+            self.safe_modules.pop(name, None)
+            self.safe_names.pop(name, None)
+        scope.add(name)
+
+    def shadowed(self, name: str, scope: set[str]) -> bool:
+        """Whether *name* is bound by the class body *scope*."""
+        return scope is not self.bound and name in scope
+
+    def statement(self, stmt: ast.stmt, *, scope: set[str]) -> None:
+        top = scope is self.bound
+        match stmt:
+            case ast.Expr(value=ast.Constant()) | ast.Pass():
+                pass
+            case ast.Import(names=names) if top:
+                for alias in names:
+                    bound = alias.asname or alias.name.split(".")[0]
+                    if alias.name in SAFE_MODULES:
+                        self.bind(bound, scope, stmt)
+                        self.safe_modules[bound] = alias.name if alias.asname else bound
+                    elif bound in scope or bound in self.safe_names or bound in self.safe_modules:
+                        raise _where(stmt, f"{bound!r} is bound more than once")
+                    else:
+                        scope.add(bound)
+                        self.placeholders.add(bound)
+            case ast.ImportFrom(module=module, names=names, level=0) if (
+                top and module in SAFE_MODULES
+            ):
+                for alias in names:
+                    if alias.name == "*":
+                        raise _where(stmt, "star import")
+                    name = alias.asname or alias.name
+                    self.bind(name, scope, stmt)
+                    self.safe_names[name] = f"{module}.{alias.name}"
+            case ast.ImportFrom(names=names) if top:
+                target, defined = self.project_module(stmt)
+                for alias in names:
+                    if alias.name == "*":
+                        raise _where(stmt, "star import")
+                    if alias.name not in defined:
+                        raise _where(stmt, f"{alias.name!r} is not defined by {target}")
+                    self.bind(alias.asname or alias.name, scope, stmt)
+            case ast.ImportFrom():
+                raise _where(stmt, f"import from {'.' * stmt.level}{stmt.module or ''}")
+            case ast.If(test=test) if top and _is_main_guard(test):
+                pass
+            case ast.If(test=test, orelse=[]) if top and self.is_type_checking(test):
+                # Never runs, so it makes no difference to the module.
+                pass
+            case ast.FunctionDef() | ast.AsyncFunctionDef():
+                self.function(stmt, scope)
+            case ast.ClassDef():
+                self.klass(stmt, scope)
+            case ast.AnnAssign(target=ast.Name(id=name), annotation=ann, value=value):
+                self.annotation(ann, scope)
+                if value is not None:
+                    self.expr(value, scope)
+                self.bind(name, scope, stmt)
+            case ast.Assign(targets=targets, value=value) if all(
+                isinstance(t, ast.Name) for t in targets
+            ):
+                self.expr(value, scope)
+                for target in targets:
+                    self.bind(target.id, scope, stmt)
+            case ast.TypeAlias(name=ast.Name(id=name), value=value):
+                self.annotation(value, scope)
+                self.bind(name, scope, stmt)
+            case _:
+                raise _where(stmt, f"{type(stmt).__name__} statement")
+
+    def project_module(self, stmt: ast.ImportFrom) -> tuple[str, frozenset[str]]:
+        """Check the module *stmt* imports from; return it and the names it defines."""
+        target = None
+        if self.name is not None and self.path is not None:
+            target = _import_name(self.name, self.path, stmt)
+        if target is None:
+            raise _where(stmt, f"import from {'.' * stmt.level}{stmt.module or ''}")
+        if target not in self.checked:
+            assert self.name is not None and self.path is not None
+            module = sys.modules.get(target)
+            if module is not None:
+                # The statement only looks the names up, as a real import does.
+                self.checked[target] = frozenset(vars(module))
+                return target, self.checked[target]
+            file = _project_file(self.name, self.path, target)
+            if file is None:
+                raise _where(stmt, f"import from {target}")
+            self.checked[target] = None
+            checker = _Checker(target, file, self.checked)
+            try:
+                checker.module(ast.parse(file.read_bytes()))
+            except _Dynamic as exc:
+                raise _where(stmt, f"import from dynamic {target} ({exc})")
+            except (OSError, SyntaxError, ValueError):
+                raise _where(stmt, f"import from unreadable {target}")
+            self.checked[target] = frozenset(checker.bound - checker.placeholders)
+        defined = self.checked[target]
+        if defined is None:
+            raise _where(stmt, f"circular import of {target}")
+        return target, defined
+
+    def function(self, node: ast.FunctionDef | ast.AsyncFunctionDef, scope: set[str]) -> None:
+        for deco in node.decorator_list:
+            self.decorator(deco, scope)
+        args = node.args
+        for default in [*args.defaults, *args.kw_defaults]:
+            if default is not None:
+                self.expr(default, scope)
+        for arg in [*args.posonlyargs, *args.args, *args.kwonlyargs, args.vararg, args.kwarg]:
+            if arg is not None and arg.annotation is not None:
+                self.annotation(arg.annotation, scope)
+        if node.returns is not None:
+            self.annotation(node.returns, scope)
+        self.bind(node.name, scope, node)
+
+    def klass(self, node: ast.ClassDef, scope: set[str]) -> None:
+        for deco in node.decorator_list:
+            self.decorator(deco, scope)
+        for base in node.bases:
+            self.expr(base, scope)
+        for kw in node.keywords:
+            if kw.arg == "metaclass" and not self.is_safe_callee(kw.value, scope):
+                raise _where(node, "custom metaclass")
+            self.expr(kw.value, scope)
+        methods = {
+            stmt.name
+            for stmt in node.body
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        if hooks := methods & _HOOKS:
+            raise _where(node, f"class defines {min(hooks)}")
+        # Plain assignments in a class with bases may create enum members.
+        if (hooks := methods & _MEMBER_HOOKS) and node.bases and _assigns(node.body):
+            raise _where(node, f"class with members defines {min(hooks)}")
+        body: set[str] = set()
+        for stmt in node.body:
+            self.statement(stmt, scope=body)
+        self.bind(node.name, scope, node)
+
+    def decorator(self, deco: ast.expr, scope: set[str]) -> None:
+        if isinstance(deco, ast.Call):
+            self.expr(deco, scope)
+        elif (
+            isinstance(deco, ast.Attribute)
+            and deco.attr in {"setter", "getter", "deleter"}
+            and isinstance(deco.value, ast.Name)
+            and self.shadowed(deco.value.id, scope)
+        ):
+            pass
+        elif not self.is_safe_callee(deco, scope):
+            raise _where(deco, f"decorator {ast.unparse(deco)}")
+
+    def is_type_checking(self, test: ast.expr) -> bool:
+        if isinstance(test, ast.Name):
+            return self.safe_names.get(test.id) == "typing.TYPE_CHECKING"
+        return (
+            isinstance(test, ast.Attribute)
+            and isinstance(test.value, ast.Name)
+            and self.safe_modules.get(test.value.id) == "typing"
+            and test.attr == "TYPE_CHECKING"
+        )
+
+    def is_safe_callee(self, func: ast.expr, scope: set[str]) -> bool:
+        if isinstance(func, ast.Name):
+            if self.shadowed(func.id, scope):
+                return False
+            if func.id in self.safe_names:
+                return self.safe_names[func.id] in _SAFE_CALLEES
+            return func.id in _SAFE_BUILTINS and func.id not in self.bound
+        return (
+            isinstance(func, ast.Attribute)
+            and isinstance(func.value, ast.Name)
+            and func.value.id in self.safe_modules
+            and not self.shadowed(func.value.id, scope)
+            and f"{self.safe_modules[func.value.id]}.{func.attr}" in _SAFE_CALLEES
+        )
+
+    def annotation(self, node: ast.expr, scope: set[str]) -> None:
+        self.expr(node, scope)
+        for sub in ast.walk(node):
+            if isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+                try:
+                    parsed = ast.parse(sub.value, mode="eval")
+                except SyntaxError:
+                    # Not an expression, so it is never evaluated either.
+                    continue
+                self.expr(parsed.body, scope)
+
+    def expr(self, node: ast.expr, scope: set[str]) -> None:
+        for sub in ast.walk(node):
+            if not isinstance(sub, _EXPRESSIONS):
+                raise _where(node, f"{type(sub).__name__} expression")
+            if isinstance(sub, ast.Name) and sub.id in self.placeholders:
+                raise _where(sub, f"uses {sub.id!r} from an unsafe import")
+            if isinstance(sub, ast.Call) and not self.is_safe_callee(sub.func, scope):
+                raise _where(sub, f"calls {ast.unparse(sub.func)}")
+
+
+def dynamic_construct(
+    tree: ast.Module, name: str | None = None, path: Path | None = None
+) -> str | None:
+    """Return why *tree* is not a static module, or ``None`` if it is.
+
+    Without the *name* and *path* of the module, any ``from`` import of a
+    module outside :data:`SAFE_MODULES` is dynamic.  With them, the answer
+    also depends on which modules are imported already.
+    """
+    checked: dict[str, frozenset[str] | None] = {} if name is None else {name: None}
+    try:
+        _Checker(name, path, checked).module(tree)
+    except _Dynamic as exc:
+        return str(exc)
+    return None
+
+
+def _skeleton(tree: ast.Module) -> ast.Module:
+    """Return *tree* with unsafe imports replaced by empty placeholder modules."""
+    body: list[ast.stmt] = []
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Import) and any(a.name not in SAFE_MODULES for a in stmt.names):
+            for alias in stmt.names:
+                if alias.name in SAFE_MODULES:
+                    body.append(ast.copy_location(ast.Import(names=[alias]), stmt))
+                    continue
+                placeholder = ast.parse(
+                    f"{alias.asname or alias.name.split('.')[0]} = "
+                    f"__import__('types').ModuleType({alias.name!r})"
+                ).body[0]
+                body.append(ast.copy_location(placeholder, stmt))
+        else:
+            body.append(stmt)
+    module = ast.Module(body=body, type_ignores=tree.type_ignores)
+    return ast.fix_missing_locations(module)
+
+
+def _execute(name: str, path: Path, tree: ast.Module, added: dict[str, ModuleType]) -> ModuleType:
+    # Modules of the package imported from, unless already imported, go first.
+    for stmt in tree.body:
+        if isinstance(stmt, ast.ImportFrom) and (stmt.level or stmt.module not in SAFE_MODULES):
+            target = _import_name(name, path, stmt)
+            if target is not None and target not in sys.modules:
+                file = _project_file(name, path, target)
+                if file is not None:
+                    _execute(target, file, ast.parse(file.read_bytes()), added)
+    spec = importlib.util.spec_from_file_location(name, path)
+    assert spec is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = added[name] = module
+    # Do not inherit this module's ``from __future__ import annotations``.
+    code = compile(_skeleton(tree), str(path), "exec", dont_inherit=True)
+    exec(code, module.__dict__)
+    return module
+
+
+@contextmanager
+def static_module(name: str, path: Path, tree: ast.Module) -> Iterator[ModuleType]:
+    """Execute the declarations of the static module *tree* as module *name*.
+
+    The module, and the modules of its package it imports from, are
+    registered in ``sys.modules`` while the context is active, as an import
+    would, and removed again afterwards so later imports load the real ones.
+    """
+    from macrotype.meta_types import clear_module_overloads, patch_typing
+
+    added: dict[str, ModuleType] = {}
+    try:
+        with patch_typing():
+            module = _execute(name, path, tree, added)
+        yield module
+    finally:
+        for mod_name, mod in added.items():
+            if sys.modules.get(mod_name) is mod:
+                del sys.modules[mod_name]
+            if mod_name != name:
+                clear_module_overloads(mod_name)
+
+
+__all__ = ["SAFE_MODULES", "dynamic_construct", "static_module"]
@@ -11,6 +11,7 @@ from macrotype.modules.ir import (
     Decl,
     FuncDecl,
     ModuleDecl,
+    SourceIndex,
     TypeDefDecl,
     VarDecl,
 )
@@ -61,7 +62,37 @@ def _build_comment_map(obj: ModuleType | type) -> dict[str, str]:
     return _build_comment_map_from_lines(lines)
 
 
-def _attach(sym: Decl, obj: object | None, cmap: dict[str, str]) -> None:
+def _indexed_comment_map(index: SourceIndex, first: int, last: int) -> dict[str, str]:
+    """Like :func:`_build_comment_map` for lines *first* to *last* of *index*."""
+    cmap: dict[str, str] = {}
+    for lineno, token in index.comments.items():
+        if not first <= lineno <= last:
+            continue
+        comment = token[1:].strip()
+        if not comment:
+            continue
+        name = _extract_name(index.lines[lineno - 1])
+        if name:
+            cmap[name] = comment
+    return cmap
+
+
+def _class_comment_map(cls: type, module: ModuleType, index: SourceIndex | None) -> dict[str, str]:
+    if index is None or cls.__module__ != module.__name__:
+        return _build_comment_map(cls)
+    rng = index.range_of(cls.__qualname__, getattr(cls, "__firstlineno__", None))
+    if rng is None:
+        return {}
+    return _indexed_comment_map(index, *rng)
+
+
+def _attach(
+    sym: Decl,
+    obj: object | None,
+    cmap: dict[str, str],
+    module: ModuleType,
+    index: SourceIndex | None,
+) -> None:
     comment = cmap.get(sym.name)
     sym.comment = comment
 
@@ -75,16 +106,24 @@ def _attach(sym: Decl, obj: object | None, cmap: dict[str, str]) -> None:
             pass
         case ClassDecl(td_fields=fields, members=members):
             if inspect.isclass(obj):
-                inner_map = _build_comment_map(obj)
+                inner_map = _class_comment_map(obj, module, index)
                 for f in fields:
                     f.comment = inner_map.get(f.name)
                 for m in members:
                     m_obj = m.obj
-                    _attach(m, m_obj, inner_map)
+                    _attach(m, m_obj, inner_map, module, index)
 
 
 def add_comments(mi: ModuleDecl) -> None:
-    """Attach same-line source comments to symbols within ``mi``."""
-    cmap = _build_comment_map(mi.obj)
+    """Attach same-line source comments to symbols within ``mi``.
+
+    Comments come from the module's :class:`SourceIndex` when its source is
+    known; otherwise the source is read back through :mod:`inspect`.
+    """
+    index = mi.source.index if mi.source is not None and mi.source.code is not None else None
+    if index is None:
+        cmap = _build_comment_map(mi.obj)
+    else:
+        cmap = _indexed_comment_map(index, 1, len(index.lines))
     for sym in mi.members:
-        _attach(sym, sym.obj, cmap)
+        _attach(sym, sym.obj, cmap, mi.obj, index)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import ast
 import typing as t
 
 from macrotype.modules.ir import AnnExpr, FuncDecl, ModuleDecl, VarDecl
@@ -25,37 +24,6 @@ def _needs_recover(obj: object) -> bool:
     return any(_needs_recover(arg) for arg in t.get_args(obj))
 
 
-def _build_maps(tree: ast.Module, code: str):
-    var_map: dict[str, str] = {}
-    param_map: dict[tuple[str, int, str], str] = {}
-    ret_map: dict[tuple[str, int], str] = {}
-    counts: dict[str, int] = {}
-    for node in tree.body:
-        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
-            var_map[node.target.id] = ast.get_source_segment(code, node.annotation) or ""
-        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            fname = node.name
-            idx = counts.get(fname, 0)
-            counts[fname] = idx + 1
-            if node.returns is not None:
-                ret_map[(fname, idx)] = ast.get_source_segment(code, node.returns) or ""
-            args = list(node.args.posonlyargs) + list(node.args.args) + list(node.args.kwonlyargs)
-            for arg in args:
-                if arg.annotation is not None:
-                    param_map[(fname, idx, arg.arg)] = (
-                        ast.get_source_segment(code, arg.annotation) or ""
-                    )
-            if node.args.vararg and node.args.vararg.annotation is not None:
-                param_map[(fname, idx, node.args.vararg.arg)] = (
-                    ast.get_source_segment(code, node.args.vararg.annotation) or ""
-                )
-            if node.args.kwarg and node.args.kwarg.annotation is not None:
-                param_map[(fname, idx, node.args.kwarg.arg)] = (
-                    ast.get_source_segment(code, node.args.kwarg.annotation) or ""
-                )
-    return var_map, param_map, ret_map
-
-
 def _apply_recover(
     site,
     expr: str | None,
@@ -79,9 +47,10 @@ def _apply_recover(
 def recover_custom_generics(mi: ModuleDecl) -> None:
     if mi.source is None or mi.source.code is None:
         return
-    code = mi.source.code
-    tree = mi.source.tree
-    var_map, param_map, ret_map = _build_maps(tree, code)
+    index = mi.source.index
+    var_map = index.var_annotations
+    param_map = index.param_annotations
+    ret_map = index.return_annotations
     glb = vars(mi.obj)
     fn_counts: dict[str, int] = {}
     for decl in mi.iter_all_decls():
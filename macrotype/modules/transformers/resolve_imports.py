@@ -6,11 +6,7 @@ from collections import defaultdict
 from collections.abc import Callable as ABC_Callable
 from typing import Callable, Iterable
 
-from ..emit import (
-    build_name_map,
-    collect_all_annotations,
-    flatten_annotation_atoms,
-)
+from ..emit import collect_all_annotations
 from ..ir import ClassDecl, Decl, ImportBlock, ModuleDecl, TypeDefDecl
 
 _MODULE_ALIASES: dict[str, str] = {
@@ -20,10 +16,8 @@ _MODULE_ALIASES: dict[str, str] = {
 
 
 def resolve_imports(mi: ModuleDecl) -> None:
-    annotations = collect_all_annotations(mi)
-    atoms: dict[int, t.Any] = {}
-    for ann in annotations:
-        atoms.update(flatten_annotation_atoms(ann))
+    names = mi.name_context
+    atoms = names.atoms(collect_all_annotations(mi))
     for sym in mi.get_all_decls():
         for deco in getattr(sym, "decorators", ()):  # capture decorator objects
             base = deco.split("(")[0].split(".")[-1]
@@ -32,7 +26,7 @@ def resolve_imports(mi: ModuleDecl) -> None:
                 atoms[id(obj)] = obj
 
     context = mi.obj.__dict__
-    name_map = build_name_map(atoms.values(), context)
+    name_map = names.name_map(atoms.values())
 
     typing_names = {
         name_map[id(a)]
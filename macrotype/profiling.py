@@ -0,0 +1,395 @@
+from __future__ import annotations
+
+"""Wall time and allocation profiling of stub generation phases and imports."""
+
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, ContextManager, Iterator
+
+
+@dataclass
+class PhaseStats:
+    """Accumulated cost of one phase for one module.
+
+    ``alloc`` is the net memory still allocated when the phase ended and
+    ``peak`` the highest allocation above the starting point, both in bytes.
+    """
+
+    calls: int = 0
+    wall: float = 0.0
+    alloc: int = 0
+    peak: int = 0
+
+
+class PassProfiler:
+    """Record per-module, per-phase wall time and tracemalloc allocations.
+
+    Phases are named after the step they time: ``import``, ``parse_source``,
+    ``scan_module``, each transformer, ``normalize``, ``emit`` and ``write``.
+    Tracing starts on the first phase; :meth:`close` stops it again unless
+    it was already running.  With ``trace_memory=False`` only wall time is
+    recorded and tracemalloc is left alone.
+    """
+
+    def __init__(self, *, trace_memory: bool = True) -> None:
+        self.stats: dict[str, dict[str, PhaseStats]] = {}
+        self.trace_memory = trace_memory
+        self._owns_tracing = False
+
+    def close(self) -> None:
+        import tracemalloc
+
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def _start_tracing(self) -> None:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+
+    @contextmanager
+    def phase(self, module: str, name: str) -> Iterator[None]:
+        import tracemalloc
+
+        if self.trace_memory:
+            self._start_tracing()
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            stats = self.stats.setdefault(module, {}).setdefault(name, PhaseStats())
+            stats.calls += 1
+            stats.wall += wall
+            if self.trace_memory:
+                after, peak = tracemalloc.get_traced_memory()
+                stats.alloc += after - before
+                stats.peak = max(stats.peak, peak - before)
+
+    def by_phase(self) -> dict[str, PhaseStats]:
+        """Return the totals of every phase over all modules."""
+        totals: dict[str, PhaseStats] = {}
+        for phases in self.stats.values():
+            for name, stats in phases.items():
+                total = totals.setdefault(name, PhaseStats())
+                total.calls += stats.calls
+                total.wall += stats.wall
+                total.alloc += stats.alloc
+                total.peak = max(total.peak, stats.peak)
+        return totals
+
+    def table(self, *, top: int = 20) -> str:
+        """Format phase totals and the *top* most expensive modules, slowest first."""
+        lines = [f"{'phase':<36} {'calls':>6} {'time ms':>10} {'alloc KiB':>11} {'peak KiB':>10}"]
+        phases = sorted(self.by_phase().items(), key=lambda kv: kv[1].wall, reverse=True)
+        for name, s in phases:
+            lines.append(
+                f"{name:<36} {s.calls:>6} {s.wall * 1000:>10.2f} "
+                f"{s.alloc / 1024:>11.1f} {s.peak / 1024:>10.1f}"
+            )
+        modules = sorted(
+            self.stats.items(),
+            key=lambda kv: sum(s.wall for s in kv[1].values()),
+            reverse=True,
+        )
+        lines.append("")
+        lines.append(f"{'module':<36} {'time ms':>10} {'alloc KiB':>11}  slowest phase")
+        for module, mod_phases in modules[:top]:
+            wall = sum(s.wall for s in mod_phases.values())
+            alloc = sum(s.alloc for s in mod_phases.values())
+            slowest = max(mod_phases, key=lambda name: mod_phases[name].wall)
+            lines.append(f"{module:<36} {wall * 1000:>10.2f} {alloc / 1024:>11.1f}  {slowest}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        import json
+
+        data = {
+            module: {name: asdict(stats) for name, stats in phases.items()}
+            for module, phases in self.stats.items()
+        }
+        return json.dumps({"modules": data}, indent=2, sort_keys=True)
+
+
+# Groups of phases in the memory report; every other phase is a transformer.
+_MEMORY_GROUPS = {
+    "import": "import",
+    "parse_source": "scan",
+    "scan_module": "scan",
+    "normalize": "normalize",
+    "emit": "emit",
+    "write": "emit",
+}
+
+
+def memory_group(phase: str) -> str:
+    """Return the memory report group of *phase*."""
+    return _MEMORY_GROUPS.get(phase, "transform")
+
+
+class MemoryProfiler(PassProfiler):
+    """Record allocations per phase group together with the lines making them.
+
+    The phases of :class:`PassProfiler` are grouped into ``import``, ``scan``
+    (source parsing and scanning), ``transform`` (every transformer),
+    ``normalize`` and ``emit`` (emission and writing).  Traces are cleared
+    whenever a module enters another group, so only memory allocated by the
+    group itself is counted, and the lines whose allocations are still alive
+    when it is left are credited to it as allocation sites.
+    """
+
+    def __init__(self, *, top: int = 10) -> None:
+        super().__init__()
+        self.top = top
+        # Bytes each source line allocated and kept alive, by module and group.
+        self.sites: dict[str, dict[str, Counter[str]]] = {}
+        self._totals: dict[str, Counter[str]] = {}
+        self._current: tuple[str, str] | None = None
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._checkpoint(None)
+        super().close()
+
+    @contextmanager
+    def phase(self, module: str, name: str) -> Iterator[None]:
+        current = (module, memory_group(name))
+        if current != self._current:
+            self._start_tracing()
+            self._checkpoint(current)
+        with super().phase(module, name):
+            yield
+
+    def _checkpoint(self, current: tuple[str, str] | None) -> None:
+        import tracemalloc
+
+        if self._current is not None:
+            module, group = self._current
+            groups = self.sites.setdefault(module, {})
+            sites = groups.get(group, Counter())
+            total = self._totals.setdefault(group, Counter())
+            own = {tracemalloc.__file__, __file__}
+            for stat in tracemalloc.take_snapshot().statistics("lineno"):
+                frame = stat.traceback[0]
+                if frame.filename not in own:
+                    site = f"{frame.filename}:{frame.lineno}"
+                    sites[site] += stat.size
+                    total[site] += stat.size
+            groups[group] = Counter(dict(sites.most_common(self.top)))
+        # Only what the next group allocates is traced from here on, which
+        # keeps its snapshot small.
+        tracemalloc.clear_traces()
+        self._current = current
+
+    def _sites(self, sites: Counter[str]) -> list[dict[str, Any]]:
+        return [{"site": site, "size": size} for site, size in sites.most_common(self.top)]
+
+    def report(self) -> dict[str, Any]:
+        """Return the peak and retained bytes of every module and group.
+
+        ``retained`` is the memory allocated by the phases that is still
+        alive when they end and ``peak`` the highest allocation during any
+        one phase.  Each group lists its phases as ``steps`` and its top
+        allocation ``sites``, the ``file:line`` locations that retained most.
+        """
+        modules: dict[str, dict[str, Any]] = {}
+        totals: dict[str, dict[str, Any]] = {}
+        for module, phases in self.stats.items():
+            groups: dict[str, dict[str, Any]] = {}
+            for name, stats in phases.items():
+                group = memory_group(name)
+                for entry in (groups.setdefault(group, {}), totals.setdefault(group, {})):
+                    entry["peak"] = max(entry.get("peak", 0), stats.peak)
+                    entry["retained"] = entry.get("retained", 0) + stats.alloc
+                steps = groups[group].setdefault("steps", {})
+                steps[name] = {"peak": stats.peak, "retained": stats.alloc}
+            for group, sites in self.sites.get(module, {}).items():
+                if group in groups:
+                    groups[group]["sites"] = self._sites(sites)
+            modules[module] = {
+                "peak": max(g["peak"] for g in groups.values()),
+                "retained": sum(g["retained"] for g in groups.values()),
+                "phases": groups,
+            }
+        for group, entry in totals.items():
+            entry["sites"] = self._sites(self._totals.get(group, Counter()))
+        return {"modules": modules, "phases": totals}
+
+    def report_json(self) -> str:
+        import json
+
+        return json.dumps(self.report(), indent=2, sort_keys=True)
+
+
+@dataclass
+class ImportStats:
+    """Cost of importing one target module.
+
+    ``modules`` lists the ``sys.modules`` entries the import added, in the
+    order their imports finished.
+    """
+
+    wall: float = 0.0
+    modules: list[str] = field(default_factory=list)
+
+
+class _TimingLoader:
+    """Loader of one module that times its execution, then steps aside."""
+
+    def __init__(self, finder: _TimingFinder, loader: Any) -> None:
+        self.finder = finder
+        self.loader = loader
+
+    def create_module(self, spec: Any) -> Any:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        # Put the real loader back first, so the module only ever sees it.
+        module.__spec__.loader = module.__loader__ = self.loader
+        nested = self.finder.nested
+        nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            wall = time.perf_counter() - start
+            children = nested.pop()
+            if nested:
+                nested[-1] += wall
+            self.finder.record(module.__name__, wall - children)
+
+
+class _TimingFinder:
+    """``sys.meta_path`` entry that times the imports found by the entries after it."""
+
+    def __init__(self, record: Callable[[str, float], None]) -> None:
+        self.record = record
+        # Time spent in the imports nested in each import still running.
+        self.nested: list[float] = []
+
+    def find_spec(self, name: str, path: Any, target: Any = None) -> Any:
+        start = time.perf_counter()
+        spec = None
+        for finder in sys.meta_path[sys.meta_path.index(self) + 1 :]:
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is not None and (spec := find_spec(name, path, target)) is not None:
+                break
+        wall = time.perf_counter() - start
+        if self.nested:
+            self.nested[-1] += wall
+        if spec is None:
+            return None
+        self.record(name, wall)
+        if hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimingLoader(self, spec.loader)
+        return spec
+
+
+class ImportProfiler:
+    """Record what importing each target module costs and what it pulls in.
+
+    While :meth:`measure` is active, every import that is not already in
+    ``sys.modules`` is timed the way ``python -X importtime`` does, so the
+    self time of each imported module, excluding the imports it triggers,
+    is known.  :meth:`by_package` adds those up per third-party package.
+    """
+
+    def __init__(self) -> None:
+        self.imports: dict[str, ImportStats] = {}
+        self.self_times: dict[str, float] = {}
+
+    def _record(self, name: str, wall: float) -> None:
+        self.self_times[name] = self.self_times.get(name, 0.0) + wall
+
+    @contextmanager
+    def measure(self, module: str) -> Iterator[None]:
+        """Time the imports made in the block as the import of *module*.
+
+        Imports are intercepted by a finder placed first on ``sys.meta_path``
+        for the duration of the block.  Nested or concurrent blocks each add
+        and remove their own finder.
+        """
+        finder = _TimingFinder(self._record)
+        before = set(sys.modules)
+        sys.meta_path.insert(0, finder)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            sys.meta_path.remove(finder)
+            stats = self.imports.setdefault(module, ImportStats())
+            stats.wall += wall
+            stats.modules += [name for name in sys.modules if name not in before]
+
+    def by_package(self) -> dict[str, ImportStats]:
+        """Return the import cost of every third-party top-level package.
+
+        Standard library modules and the packages of the profiled modules
+        are left out.  ``wall`` sums the self time of the package's modules.
+        """
+        import sysconfig
+
+        paths = sysconfig.get_paths()
+        stdlib = tuple({paths["stdlib"], paths["platstdlib"]})
+        project = {name.partition(".")[0] for name in self.imports}
+        packages: dict[str, ImportStats] = {}
+        for name, wall in self.self_times.items():
+            top = name.partition(".")[0]
+            if top in sys.stdlib_module_names or top in project:
+                continue
+            origin = getattr(sys.modules.get(name), "__file__", None) or ""
+            # e.g. _sysconfigdata, which is generated per platform
+            if origin.startswith(stdlib) and "-packages" not in origin:
+                continue
+            stats = packages.setdefault(top, ImportStats())
+            stats.wall += wall
+            stats.modules.append(name)
+        return packages
+
+    def table(self, *, top: int = 20) -> str:
+        """Format the *top* slowest imports and third-party packages."""
+        lines = [f"{'import':<48} {'time ms':>10} {'new modules':>12}"]
+        imports = sorted(self.imports.items(), key=lambda kv: kv[1].wall, reverse=True)
+        for module, s in imports[:top]:
+            lines.append(f"{module:<48} {s.wall * 1000:>10.2f} {len(s.modules):>12}")
+        lines.append("")
+        lines.append(f"{'third-party package':<48} {'time ms':>10} {'modules':>12}")
+        packages = sorted(self.by_package().items(), key=lambda kv: kv[1].wall, reverse=True)
+        for package, s in packages[:top]:
+            lines.append(f"{package:<48} {s.wall * 1000:>10.2f} {len(s.modules):>12}")
+        return "\n".join(lines)
+
+
+def profile_phase(profile: PassProfiler | None, module: str, name: str) -> ContextManager[None]:
+    """Return ``profile.phase(module, name)`` or a no-op context without a profiler."""
+    if profile is None:
+        return nullcontext()
+    return profile.phase(module, name)
+
+
+def profile_import(profile: ImportProfiler | None, module: str) -> ContextManager[None]:
+    """Return ``profile.measure(module)`` or a no-op context without a profiler."""
+    if profile is None:
+        return nullcontext()
+    return profile.measure(module)
+
+
+__all__ = [
+    "ImportProfiler",
+    "ImportStats",
+    "MemoryProfiler",
+    "PassProfiler",
+    "PhaseStats",
+    "memory_group",
+    "profile_import",
+    "profile_phase",
+]
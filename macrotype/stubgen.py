@@ -1,16 +1,30 @@
 from __future__ import annotations
 
+import ast
 import fnmatch
+import functools
 import importlib
 import importlib.util
+import os
+import stat
 import sys
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import chain
 from pathlib import Path
 from types import ModuleType
-from typing import Sequence
+from typing import TYPE_CHECKING, Any, Collection, Iterable, Iterator, Sequence, TextIO
 
+from .cache import CacheEntry, StubCache
 from .meta_types import patch_typing
-from .modules.ir import SourceInfo
-from .modules.source import extract_source_info, extract_type_checking_imports
+from .profiling import profile_import, profile_phase
+
+if TYPE_CHECKING:
+    from multiprocessing.context import BaseContext
+
+    from macrotype.depgraph import DependencyGraph
+    from macrotype.modules.ir import ModuleDecl, SourceInfo
+    from macrotype.profiling import ImportProfiler, PassProfiler
 
 
 class MypyPluginError(RuntimeError):
@@ -51,6 +65,8 @@ def load_module(name: str, *, allow_type_checking: bool = False) -> ModuleType:
     if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
         raise ImportError(f"Cannot import {name}")
     if not allow_type_checking:
+        from .modules.source import extract_type_checking_imports
+
         code = Path(spec.origin).read_text()
         try:
             extract_type_checking_imports(code)
@@ -74,6 +90,8 @@ def load_module_from_code(
     allow_type_checking: bool = False,
 ) -> ModuleType:
     if not allow_type_checking:
+        from .modules.source import extract_type_checking_imports
+
         try:
             extract_type_checking_imports(code)
         except RuntimeError as exc:
@@ -90,16 +108,140 @@ def stub_lines(
     *,
     source_info: SourceInfo | None = None,
     strict: bool = False,
+    profile: PassProfiler | None = None,
 ) -> list[str]:
     from . import modules
 
-    mi = modules.from_module(module, source_info=source_info, strict=strict)
-    return modules.emit_module(mi)
+    mi = modules.from_module(module, source_info=source_info, strict=strict, profile=profile)
+    with profile_phase(profile, module.__name__, "emit"):
+        return modules.emit_module(mi)
+
+
+@dataclass
+class WriteStats:
+    """Counts of stubs rewritten and stubs left untouched because they matched.
+
+    In hybrid mode it also counts the generated stubs by how their module was
+    loaded: executed as a static module or imported.
+    """
+
+    written: int = 0
+    unchanged: int = 0
+    static: int = 0
+    imported: int = 0
+
+    def record(self, written: bool, *, static: bool | None = None) -> None:
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+        if static is True:
+            self.static += 1
+        elif static is False:
+            self.imported += 1
+
+    def merge(self, other: WriteStats) -> None:
+        """Add the counts of *other*, e.g. from a worker process."""
+        self.written += other.written
+        self.unchanged += other.unchanged
+        self.static += other.static
+        self.imported += other.imported
+
+    def summary(self) -> str:
+        summary = f"{self.written} stub(s) written, {self.unchanged} unchanged"
+        if self.static or self.imported:
+            summary += f"; {self.static} module(s) stubbed statically, {self.imported} imported"
+        return summary
+
+
+def write_stub(dest: Path, lines: Iterable[str], command: str | None = None) -> bool:
+    """Write *lines* to *dest* unless it already holds exactly that content.
+
+    Skipping identical writes keeps the file's mtime stable so the incremental
+    caches of mypy and pyright stay valid.  Writes go through a temporary file
+    that is renamed over *dest*, so readers never see a partial stub.  Returns
+    ``True`` if the file was written.
+
+    *lines* may be any iterable, e.g. :func:`macrotype.modules.iter_emit_module`.
+    Each line is compared with *dest* as it arrives and the temporary file is
+    only opened at the first difference, so neither the new nor the old stub
+    is ever held in memory as a whole.  The comparison is exact, so a stub
+    with other line endings is rewritten.  A rewritten file keeps its
+    permissions.
+    """
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    with ExitStack() as stack:
+        try:
+            old: TextIO | None = stack.enter_context(dest.open(newline=""))
+        except OSError:
+            old = None
+        matched = 0
+        out: TextIO | None = None
+        try:
+            for chunk in _stub_chunks(lines, command):
+                if out is None and old is not None:
+                    if _read_same(old, chunk):
+                        matched += len(chunk)
+                        continue
+                if out is None:
+                    out = stack.enter_context(_open_tmp(tmp, old, matched))
+                out.write(chunk)
+            if out is None:
+                if old is not None and _read_same(old, ""):
+                    return False
+                stack.enter_context(_open_tmp(tmp, old, matched))
+        except BaseException:
+            stack.close()
+            tmp.unlink(missing_ok=True)
+            raise
+    try:
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return True
+
 
+def _stub_chunks(lines: Iterable[str], command: str | None) -> Iterator[str]:
+    """Yield the text of the stub, as ``"\\n".join(header + lines) + "\\n"`` would.
+
+    Lines end in :data:`os.linesep`, as text mode would write them.
+    """
+    empty = True
+    for line in chain(_header_lines(command), lines):
+        empty = False
+        yield line + os.linesep
+    if empty:
+        yield os.linesep
+
+
+def _read_same(old: TextIO, expected: str) -> bool:
+    """Return whether the next characters of *old* are *expected*.
+
+    ``expected == ""`` checks that *old* is exhausted.
+    """
+    try:
+        return old.read(len(expected) or 1) == expected
+    except (OSError, UnicodeDecodeError):
+        return False
 
-def write_stub(dest: Path, lines: list[str], command: str | None = None) -> None:
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    dest.write_text("\n".join(_header_lines(command) + list(lines)) + "\n")
+
+def _open_tmp(tmp: Path, old: TextIO | None, matched: int) -> TextIO:
+    """Open *tmp* for writing, starting with the first *matched* characters of *old*.
+
+    *tmp* takes the permissions of *old*, or the default ones for a new file.
+    """
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    out = tmp.open("w", newline="")
+    if old is not None:
+        os.chmod(tmp, stat.S_IMODE(os.fstat(old.fileno()).st_mode))
+    if old is not None and matched:
+        old.seek(0)
+        while matched:
+            block = old.read(min(matched, 1 << 16))
+            out.write(block)
+            matched -= len(block)
+    return out
 
 
 def process_module(
@@ -109,6 +251,7 @@ def process_module(
     command: str | None = None,
     strict: bool = False,
     source_info: SourceInfo | None = None,
+    stats: WriteStats | None = None,
 ) -> Path:
     lines = stub_lines(module, source_info=source_info, strict=strict)
     if dest is None:
@@ -116,7 +259,9 @@ def process_module(
         if file is None:
             raise ValueError("dest must be provided for modules without __file__")
         dest = Path(file).with_suffix(".pyi")
-    write_stub(dest, lines, command)
+    written = write_stub(dest, lines, command)
+    if stats is not None:
+        stats.record(written)
     return dest
 
 
@@ -132,64 +277,424 @@ def iter_python_files(target: Path, *, skip: Sequence[str] = ()) -> list[Path]:
     return files
 
 
-def process_file(
+def _file_module_decl(
     src: Path,
-    dest: Path | None = None,
+    code: str,
     *,
-    command: str | None = None,
     strict: bool = False,
     allow_type_checking: bool = False,
-) -> Path:
-    code = src.read_text()
+    profile: PassProfiler | None = None,
+    hybrid: bool = False,
+    import_profile: ImportProfiler | None = None,
+    tree: ast.Module | None = None,
+    debug_failure: bool = False,
+) -> tuple[ModuleDecl, bool | None]:
+    """Analyse *src* and return its :class:`ModuleDecl`, ready to emit.
+
+    *src* is imported unless *hybrid* is set and it is a static module, see
+    :mod:`macrotype.modules.static`.  The second item tells which of the two
+    happened: ``True`` for a static module, ``False`` for an import and
+    ``None`` when *hybrid* is not set.  The import is measured by
+    *import_profile*.  *tree* is *code* already parsed, if available.  With
+    *debug_failure*, the error that made a static module fall back to an
+    import is printed.
+    """
+    from . import modules
+    from .modules.source import extract_source_info
+
+    module_name = _module_name_from_path(src)
     try:
-        info = extract_source_info(code, allow_type_checking=allow_type_checking)
+        with profile_phase(profile, module_name, "parse_source"):
+            info = extract_source_info(code, allow_type_checking=allow_type_checking, tree=tree)
     except RuntimeError:
         raise RuntimeError(f"Skipped {src} due to TYPE_CHECKING guard")
-    module_name = _module_name_from_path(src)
     if _looks_like_mypy_plugin(module_name):
         raise MypyPluginError(f"{module_name} appears to be a mypy plugin")
-    module = load_module(module_name, allow_type_checking=True)
-    dest = dest or src.with_suffix(".pyi")
-    return process_module(
-        module,
-        dest,
-        command=command,
+    if hybrid and module_name not in sys.modules:
+        from .modules.static import dynamic_construct, static_module
+
+        if dynamic_construct(info.tree, module_name, src) is None:
+            with ExitStack() as stack:
+                try:
+                    with profile_phase(profile, module_name, "import"):
+                        module = stack.enter_context(static_module(module_name, src, info.tree))
+                    mi = modules.from_module(
+                        module, source_info=info, strict=strict, profile=profile
+                    )
+                except Exception:
+                    # Declarations that need more than the placeholders get
+                    # imported.  Forget what the partial run registered first.
+                    from .meta_types import clear_module_overloads
+
+                    sys.modules.pop(module_name, None)
+                    clear_module_overloads(module_name)
+                    if debug_failure:
+                        import traceback
+
+                        print(f"Importing {src}: static stub failed", file=sys.stderr)
+                        traceback.print_exc()
+                else:
+                    return mi, True
+    with profile_phase(profile, module_name, "import"), profile_import(import_profile, module_name):
+        module = load_module(module_name, allow_type_checking=True)
+    mi = modules.from_module(module, source_info=info, strict=strict, profile=profile)
+    return mi, False if hybrid else None
+
+
+def _generate_file_stub_entry(
+    src: Path,
+    code: str,
+    *,
+    strict: bool = False,
+    allow_type_checking: bool = False,
+    profile: PassProfiler | None = None,
+    hybrid: bool = False,
+    import_profile: ImportProfiler | None = None,
+    tree: ast.Module | None = None,
+    debug_failure: bool = False,
+) -> CacheEntry:
+    """Import *src* and return its stub lines and the modules it depends on.
+
+    *tree* is *code* already parsed, if available.
+    """
+    from . import modules
+    from .depgraph import module_dependencies
+
+    mi, static = _file_module_decl(
+        src,
+        code,
         strict=strict,
-        source_info=info,
+        allow_type_checking=allow_type_checking,
+        profile=profile,
+        hybrid=hybrid,
+        import_profile=import_profile,
+        tree=tree,
+        debug_failure=debug_failure,
     )
+    with profile_phase(profile, mi.obj.__name__, "emit"):
+        lines = modules.emit_module(mi)
+    return CacheEntry(lines=lines, deps=sorted(module_dependencies(mi)), static=static)
 
 
-def process_directory(
-    directory: Path,
-    out_dir: Path | None = None,
+def _cache_variant(strict: bool, allow_type_checking: bool, hybrid: bool) -> str:
+    return f"strict={strict};allow_type_checking={allow_type_checking};hybrid={hybrid}"
+
+
+def _cache_entry_for(exc: BaseException) -> CacheEntry:
+    return CacheEntry(
+        error=str(exc),
+        plugin=isinstance(exc, MypyPluginError),
+        transient=isinstance(exc, ImportError),
+    )
+
+
+def _file_stub_entry(
+    src: Path,
+    *,
+    strict: bool = False,
+    allow_type_checking: bool = False,
+    cache: StubCache | None = None,
+    profile: PassProfiler | None = None,
+    hybrid: bool = False,
+    import_profile: ImportProfiler | None = None,
+    debug_failure: bool = False,
+) -> CacheEntry:
+    code = src.read_text()
+    if cache is None:
+        return _generate_file_stub_entry(
+            src,
+            code,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            profile=profile,
+            hybrid=hybrid,
+            import_profile=import_profile,
+            debug_failure=debug_failure,
+        )
+    variant = _cache_variant(strict, allow_type_checking, hybrid)
+    # A miss parses the source for its imports and again to stub it.
+    parse = functools.cache(lambda: ast.parse(code))
+    entry = cache.get(src, code, variant=variant, parse=parse)
+    if entry is not None:
+        entry.result()
+        return entry
+    try:
+        entry = _generate_file_stub_entry(
+            src,
+            code,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            hybrid=hybrid,
+            tree=parse(),
+            debug_failure=debug_failure,
+        )
+    except (Exception, SystemExit) as exc:
+        cache.put(src, code, _cache_entry_for(exc), variant=variant)
+        raise
+    cache.put(src, code, entry, variant=variant)
+    return entry
+
+
+def _record(graph: DependencyGraph | None, src: Path, entry: CacheEntry) -> None:
+    if graph is not None and entry.deps is not None:
+        graph.record(_module_name_from_path(src), src, entry.deps)
+
+
+def process_file(
+    src: Path,
+    dest: Path | None = None,
     *,
     command: str | None = None,
     strict: bool = False,
     allow_type_checking: bool = False,
-    skip: Sequence[str] = (),
+    cache: StubCache | None = None,
+    stats: WriteStats | None = None,
+    graph: DependencyGraph | None = None,
+    profile: PassProfiler | None = None,
+    hybrid: bool = False,
+    import_profile: ImportProfiler | None = None,
     debug_failure: bool = False,
+) -> Path:
+    """Generate and write the stub for *src*.
+
+    When *cache* is given, a cache hit skips importing and scanning *src*.
+    If *stats* is given it records whether the stub had to be rewritten.
+    The modules *src* depends on are recorded in *graph*.  *profile* times
+    each phase; it bypasses *cache* so every phase actually runs.  Without
+    either, the stub is streamed to *dest* one declaration at a time.
+    With *hybrid*, a static module is stubbed without importing it.
+    *import_profile* measures the import of *src*; it bypasses *cache* too.
+    *debug_failure* reports why a static module had to be imported.
+    """
+    dest = dest or src.with_suffix(".pyi")
+    if cache is None and profile is None:
+        from . import modules
+
+        code = src.read_text()
+        mi, static = _file_module_decl(
+            src,
+            code,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            hybrid=hybrid,
+            import_profile=import_profile,
+            debug_failure=debug_failure,
+        )
+        # Nothing keeps the lines, so they are streamed into *dest*.
+        written = write_stub(dest, modules.iter_emit_module(mi), command)
+        if graph is not None:
+            from .depgraph import module_dependencies
+
+            _record(graph, src, CacheEntry(deps=sorted(module_dependencies(mi))))
+        if stats is not None:
+            stats.record(written, static=static)
+        return dest
+    if profile is not None or import_profile is not None:
+        cache = None
+    entry = _file_stub_entry(
+        src,
+        strict=strict,
+        allow_type_checking=allow_type_checking,
+        cache=cache,
+        profile=profile,
+        hybrid=hybrid,
+        import_profile=import_profile,
+        debug_failure=debug_failure,
+    )
+    _record(graph, src, entry)
+    with profile_phase(profile, _module_name_from_path(src), "write"):
+        written = write_stub(dest, entry.result(), command)
+    if stats is not None:
+        stats.record(written, static=entry.static)
+    return dest
+
+
+def _stub_file_job(
+    src: Path, code: str, strict: bool, allow_type_checking: bool, hybrid: bool = False
+) -> CacheEntry:
+    """Worker entry point: return the generated entry or the failure it hit."""
+    try:
+        return _generate_file_stub_entry(
+            src, code, strict=strict, allow_type_checking=allow_type_checking, hybrid=hybrid
+        )
+    except (Exception, SystemExit) as exc:
+        return _cache_entry_for(exc)
+
+
+# Imported by the fork server along with the packages given to ``preload``.
+_PRELOAD = (
+    "macrotype.stubgen",
+    "macrotype.depgraph",
+    "macrotype.modules.emit",
+    "macrotype.modules.scanner",
+    "macrotype.modules.source",
+    "macrotype.modules.transformers",
+    "macrotype.types",
+)
+
+
+# Preload list the fork server was configured with, once one has been used.
+_forkserver_preload: list[str] | None = None
+
+
+def _pool_context(preload: Sequence[str] | None) -> BaseContext:
+    """Return the multiprocessing context that starts stub generation workers.
+
+    Workers are spawned as fresh interpreters by default.  With *preload*,
+    they are forked from a fork server that has imported *preload* and
+    ``macrotype`` once, so every worker starts with those modules loaded and
+    shares their memory copy-on-write.  Platforms without fork servers fall
+    back to spawning.
+
+    There is a single fork server per process, and its preload list only
+    takes effect when it starts, so it is configured by the first call only.
+    Later calls with a different list spawn their workers instead of getting
+    a server that lacks their packages.
+    """
+    global _forkserver_preload
+    import multiprocessing
+
+    if preload is None or "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    modules = [*_PRELOAD, *preload]
+    if _forkserver_preload is None:
+        _forkserver_preload = modules
+        multiprocessing.get_context("forkserver").set_forkserver_preload(modules)
+    elif _forkserver_preload != modules:
+        return multiprocessing.get_context("spawn")
+    return multiprocessing.get_context("forkserver")
+
+
+def _process_parallel(
+    plan: list[tuple[Path, Path | None, bool]],
+    *,
+    jobs: int,
+    command: str | None,
+    strict: bool,
+    allow_type_checking: bool,
+    cache: StubCache | None,
+    stats: WriteStats | None,
+    graph: DependencyGraph | None,
+    preload: Sequence[str] | None = None,
+    hybrid: bool = False,
 ) -> list[Path]:
+    """Generate stubs for *plan* using a pool of *jobs* worker processes.
+
+    Stubs are written and errors reported by the parent in the same order as
+    :func:`process_directory` would produce sequentially.  Cache lookups also
+    happen in the parent so only misses are sent to workers.  See
+    :func:`_pool_context` for *preload*.
+    """
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    variant = _cache_variant(strict, allow_type_checking, hybrid)
     outputs: list[Path] = []
-    for src in iter_python_files(directory, skip=skip):
-        module_name = _module_name_from_path(src)
-        if _looks_like_mypy_plugin(module_name):
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=_pool_context(preload)) as pool:
+        pending: list[tuple[str, CacheEntry | Future | None]] = []
+        for src, _, plugin in plan:
+            if plugin:
+                pending.append(("", None))
+                continue
+            code = src.read_text()
+            entry = cache.get(src, code, variant=variant) if cache else None
+            if entry is None:
+                entry = pool.submit(_stub_file_job, src, code, strict, allow_type_checking, hybrid)
+            pending.append((code, entry))
+        for (src, dest, _), (code, entry) in zip(plan, pending):
+            if entry is None:
+                print(f"Skipping {src}: appears to be a mypy plugin", file=sys.stderr)
+                continue
+            if isinstance(entry, Future):
+                entry = entry.result()
+                if cache is not None:
+                    cache.put(src, code, entry, variant=variant)
+            if entry.lines is None:
+                print(f"Skipping {src}: {entry.error}", file=sys.stderr)
+                continue
+            _record(graph, src, entry)
+            dest = dest or src.with_suffix(".pyi")
+            written = write_stub(dest, entry.lines, command)
+            if stats is not None:
+                stats.record(written, static=entry.static)
+            outputs.append(dest)
+    return outputs
+
+
+def _peak_rss() -> int | None:
+    """Return the peak resident set size of this process in bytes, if known."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _ModuleEvictor:
+    """Drop the modules under *root* that were imported since the last call.
+
+    Their overloads are forgotten, and the caches that hold on to their
+    objects are cleared, so the memory they use can be reclaimed.  Modules
+    imported before the evictor was created are left alone.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+        self.seen = set(sys.modules)
+
+    def __call__(self) -> None:
+        import typing
+
+        from .meta_types import clear_module_overloads
+        from .types import parse_cache
+
+        evicted = False
+        for name in [name for name in sys.modules if name not in self.seen]:
+            file = getattr(sys.modules[name], "__file__", None)
+            # Never drop macrotype itself, e.g. when it stubs its own source.
+            own = name.partition(".")[0] == __package__
+            if file and not own and Path(file).resolve().is_relative_to(self.root):
+                del sys.modules[name]
+                clear_module_overloads(name)
+                evicted = True
+            else:
+                self.seen.add(name)
+        if evicted:
+            parse_cache.clear()
+            # ``typing`` caches subscripted aliases such as ``list[Model]`` in
+            # ``functools.lru_cache`` wrappers it does not expose.  CPython
+            # lists their ``cache_clear`` in the private ``typing._cleanups``;
+            # where that is missing the aliases stay cached until exit.
+            for cleanup in getattr(typing, "_cleanups", ()):
+                if callable(cleanup):
+                    cleanup()
+
+
+def _process_sequential(
+    plan: list[tuple[Path, Path | None, bool]],
+    *,
+    root: Path,
+    evict: bool = False,
+    max_rss: int | None = None,
+    debug_failure: bool = False,
+    **options: Any,
+) -> tuple[list[Path], int]:
+    """Generate stubs for *plan* in this process with :func:`process_file`.
+
+    *options* are passed on to :func:`process_file`.  With *evict*, project
+    modules are dropped after each stub, see :class:`_ModuleEvictor`.  Once
+    the peak RSS exceeds *max_rss* bytes, processing stops after the current
+    stub.  Returns the written stubs and how many entries of *plan* were
+    handled.
+    """
+    evictor = _ModuleEvictor(root) if evict else None
+    outputs: list[Path] = []
+    for done, (src, dest, plugin) in enumerate(plan, 1):
+        if plugin:
             print(f"Skipping {src}: appears to be a mypy plugin", file=sys.stderr)
             continue
-        if out_dir:
-            rel = src.relative_to(directory).with_suffix(".pyi")
-            dest = out_dir / rel
-        else:
-            dest = None
         try:
-            outputs.append(
-                process_file(
-                    src,
-                    dest,
-                    command=command,
-                    strict=strict,
-                    allow_type_checking=allow_type_checking,
-                )
-            )
+            outputs.append(process_file(src, dest, debug_failure=debug_failure, **options))
         except MypyPluginError as exc:
             print(f"Skipping {src}: {exc}", file=sys.stderr)
         except (Exception, SystemExit) as exc:  # pragma: no cover - defensive
@@ -201,16 +706,310 @@ def process_directory(
                 pdb.post_mortem(exc.__traceback__)
             else:
                 print(f"Skipping {src}: {exc}", file=sys.stderr)
+        if evictor is not None:
+            evictor()
+        if max_rss is not None and (_peak_rss() or 0) > max_rss:
+            return outputs, done
+    return outputs, len(plan)
+
+
+def _batch_job(
+    plan: list[tuple[Path, Path | None, bool]], max_rss: int, options: dict[str, Any]
+) -> tuple[int, list[Path], WriteStats, DependencyGraph]:
+    """Worker entry point of :func:`_process_recycled`."""
+    from .depgraph import DependencyGraph
+
+    stats, graph = WriteStats(), DependencyGraph()
+    outputs, done = _process_sequential(plan, max_rss=max_rss, stats=stats, graph=graph, **options)
+    return done, outputs, stats, graph
+
+
+def _process_recycled(
+    plan: list[tuple[Path, Path | None, bool]],
+    *,
+    max_rss: int,
+    preload: Sequence[str] | None,
+    stats: WriteStats | None,
+    graph: DependencyGraph | None,
+    **options: Any,
+) -> list[Path]:
+    """Generate stubs for *plan* sequentially in worker processes.
+
+    A worker handles modules in order until its peak RSS exceeds *max_rss*
+    bytes, then exits, and a fresh one continues with the rest.  Workers
+    start as described in :func:`_pool_context`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    outputs: list[Path] = []
+    ctx = _pool_context(preload)
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx, max_tasks_per_child=1) as pool:
+        while plan:
+            done, written, part_stats, part_graph = pool.submit(
+                _batch_job, plan, max_rss, options
+            ).result()
+            outputs += written
+            if stats is not None:
+                stats.merge(part_stats)
+            if graph is not None:
+                for name, src in part_graph.files.items():
+                    graph.record(name, src, part_graph.deps[name])
+            plan = plan[done:]
+    return outputs
+
+
+def process_directory(
+    directory: Path,
+    out_dir: Path | None = None,
+    *,
+    command: str | None = None,
+    strict: bool = False,
+    allow_type_checking: bool = False,
+    skip: Sequence[str] = (),
+    debug_failure: bool = False,
+    jobs: int = 1,
+    cache: StubCache | None = None,
+    stats: WriteStats | None = None,
+    graph: DependencyGraph | None = None,
+    only: Collection[Path] | None = None,
+    profile: PassProfiler | None = None,
+    preload: Sequence[str] | None = None,
+    hybrid: bool = False,
+    import_profile: ImportProfiler | None = None,
+    evict: bool = False,
+    max_rss: int | None = None,
+) -> list[Path]:
+    """Generate stubs for every Python file under *directory*.
+
+    With ``jobs > 1`` modules are imported and stubbed in a pool of worker
+    processes; the written stubs are identical to a sequential run.  Given
+    *preload*, a list of packages such as ``["sqlalchemy", "numpy"]``, the
+    workers are forked from a server that imported them once, even for
+    ``jobs == 1``; see :func:`_pool_context` for a later call with others.
+    ``debug_failure`` forces sequential processing so pdb can attach and
+    bypasses *cache* so failures are reproduced rather than replayed.
+    If *only* is given, files not in it are left alone.  With a *profile*
+    or an *import_profile*, modules are processed sequentially in this
+    process.  *hybrid* is passed on to :func:`process_file`.
+
+    For large trees, *evict* drops the modules under *directory* from
+    ``sys.modules`` after each stub, so only third-party imports accumulate.
+    With *max_rss*, a number of bytes, a sequential run happens in a worker
+    process that is replaced by a fresh one whenever its peak RSS exceeds
+    the limit.  It cannot be combined with ``jobs > 1``, *debug_failure*,
+    *profile* or *import_profile*, which all need this process.
+    """
+    if max_rss is not None and jobs > 1:
+        raise ValueError("max_rss requires jobs=1")
+    sequential = debug_failure or profile is not None or import_profile is not None
+    if max_rss is not None and sequential:
+        raise ValueError("max_rss cannot be combined with debug_failure or profiling")
+    if debug_failure:
+        cache = None
+    if only is not None:
+        only = {Path(p).resolve() for p in only}
+    plan: list[tuple[Path, Path | None, bool]] = []
+    for src in iter_python_files(directory, skip=skip):
+        if only is not None and src.resolve() not in only:
+            continue
+        module_name = _module_name_from_path(src)
+        if out_dir:
+            rel = src.relative_to(directory).with_suffix(".pyi")
+            dest = out_dir / rel
+        else:
+            dest = None
+        plan.append((src, dest, _looks_like_mypy_plugin(module_name)))
+
+    if (jobs > 1 or preload is not None) and max_rss is None and not sequential:
+        return _process_parallel(
+            plan,
+            jobs=jobs,
+            command=command,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            cache=cache,
+            stats=stats,
+            graph=graph,
+            preload=preload,
+            hybrid=hybrid,
+        )
+
+    if max_rss is not None:
+        return _process_recycled(
+            plan,
+            max_rss=max_rss,
+            preload=preload,
+            root=directory,
+            evict=evict,
+            stats=stats,
+            graph=graph,
+            command=command,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            cache=cache,
+            hybrid=hybrid,
+        )
+    outputs, _ = _process_sequential(
+        plan,
+        root=directory,
+        evict=evict,
+        debug_failure=debug_failure,
+        command=command,
+        strict=strict,
+        allow_type_checking=allow_type_checking,
+        cache=cache,
+        stats=stats,
+        graph=graph,
+        profile=profile,
+        hybrid=hybrid,
+        import_profile=import_profile,
+    )
     return outputs
 
 
+@dataclass
+class StubResult:
+    """The stub generated for one module by :func:`generate_many`.
+
+    ``lines`` is ``None`` when the module failed and ``error`` says why.
+    ``timings`` maps every phase that ran to its wall time in seconds and is
+    empty for stubs taken from the cache.
+    """
+
+    module: str
+    src: Path
+    dest: Path
+    lines: list[str] | None = None
+    error: str | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    cached: bool = False
+
+
+def _timed_stub_job(
+    src: Path, code: str, strict: bool, allow_type_checking: bool, hybrid: bool = False
+) -> tuple[CacheEntry, dict[str, float]]:
+    """Like :func:`_stub_file_job`, also returning the wall time of each phase."""
+    from .profiling import PassProfiler
+
+    timer = PassProfiler(trace_memory=False)
+    try:
+        entry = _generate_file_stub_entry(
+            src,
+            code,
+            strict=strict,
+            allow_type_checking=allow_type_checking,
+            profile=timer,
+            hybrid=hybrid,
+        )
+    except (Exception, SystemExit) as exc:
+        entry = _cache_entry_for(exc)
+    timings = {name: s.wall for phases in timer.stats.values() for name, s in phases.items()}
+    return entry, timings
+
+
+def _stub_result(
+    src: Path, dest: Path, entry: CacheEntry, timings: dict[str, float], *, cached: bool
+) -> StubResult:
+    return StubResult(
+        module=_module_name_from_path(src),
+        src=src,
+        dest=dest,
+        lines=entry.lines,
+        error=entry.error,
+        timings=timings,
+        cached=cached,
+    )
+
+
+def generate_many(
+    targets: Iterable[str | Path],
+    *,
+    jobs: int = 1,
+    cache: StubCache | None = None,
+    strict: bool = False,
+    out_dir: Path | None = None,
+    allow_type_checking: bool = False,
+    skip: Sequence[str] = (),
+    preload: Sequence[str] | None = None,
+    hybrid: bool = False,
+) -> Iterator[StubResult]:
+    """Generate the stubs of the modules in *targets*, yielding each when done.
+
+    *targets* are Python files and directories, searched like
+    :func:`process_directory`.  Nothing is written: every :class:`StubResult`
+    carries the stub lines and the ``.pyi`` path they belong at, under
+    *out_dir* if given and next to the source otherwise, for
+    :func:`write_stub`.  Failures are reported in the result, not raised.
+
+    With ``jobs > 1`` or *preload* (see :func:`_pool_context`), cache misses
+    are stubbed by a pool of worker processes kept for the whole batch, so
+    each worker reuses its parse cache and imported modules across the
+    modules it handles, and results come in the order they finish.
+    Otherwise modules are stubbed in this process, in order, as the iterator
+    is consumed.  *cache* is only read and filled by this process.
+    """
+    plan: list[tuple[Path, Path]] = []
+    for target in map(Path, targets):
+        for src in iter_python_files(target, skip=skip):
+            if out_dir is None:
+                dest = src.with_suffix(".pyi")
+            elif target.is_file():
+                dest = out_dir / src.with_suffix(".pyi").name
+            else:
+                dest = out_dir / src.relative_to(target).with_suffix(".pyi")
+            plan.append((src, dest))
+
+    variant = _cache_variant(strict, allow_type_checking, hybrid)
+    if jobs <= 1 and preload is None:
+        for src, dest in plan:
+            code = src.read_text()
+            entry = cache.get(src, code, variant=variant) if cache else None
+            if entry is not None:
+                yield _stub_result(src, dest, entry, {}, cached=True)
+                continue
+            entry, timings = _timed_stub_job(src, code, strict, allow_type_checking, hybrid)
+            if cache is not None:
+                cache.put(src, code, entry, variant=variant)
+            yield _stub_result(src, dest, entry, timings, cached=False)
+        return
+
+    from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+    pool = ProcessPoolExecutor(max_workers=max(jobs, 1), mp_context=_pool_context(preload))
+    finished = False
+    try:
+        pending: dict[Future, tuple[Path, Path, str]] = {}
+        for src, dest in plan:
+            code = src.read_text()
+            entry = cache.get(src, code, variant=variant) if cache else None
+            if entry is not None:
+                yield _stub_result(src, dest, entry, {}, cached=True)
+                continue
+            job = pool.submit(_timed_stub_job, src, code, strict, allow_type_checking, hybrid)
+            pending[job] = (src, dest, code)
+        for job in as_completed(pending):
+            src, dest, code = pending[job]
+            entry, timings = job.result()
+            if cache is not None:
+                cache.put(src, code, entry, variant=variant)
+            yield _stub_result(src, dest, entry, timings, cached=False)
+        finished = True
+    finally:
+        # Abandoning the iterator should not wait for the remaining modules;
+        # the workers exit once their current module is done.
+        pool.shutdown(wait=finished, cancel_futures=True)
+
+
 __all__ = [
     "load_module",
     "load_module_from_code",
     "stub_lines",
+    "WriteStats",
     "write_stub",
     "process_module",
     "iter_python_files",
     "process_file",
     "process_directory",
+    "generate_many",
+    "StubResult",
 ]
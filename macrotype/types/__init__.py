@@ -2,9 +2,11 @@ from __future__ import annotations
 
 """Type analysis pipeline with parsing and unparsing."""
 
+from typing import Iterable
+
 from .ir import Ty
 from .normalize import norm
-from .parse import parse
+from .parse import parse, parse_cache
 from .resolve import ResolveEnv, resolve
 from .unparse import unparse, unparse_top
 from .validate import validate
@@ -38,14 +40,38 @@ def normalize_annotation(obj: object, *, ctx: str = "top") -> object:
     return unparse_top(from_type(obj, ctx=ctx))
 
 
+def normalize_many(
+    annotations: Iterable[object], *, ctx: str | Iterable[str] = "top"
+) -> list[object]:
+    """Return :func:`normalize_annotation` of each of *annotations*, in order.
+
+    *ctx* is either one context for all annotations or one per annotation.
+    Each distinct annotation object is normalized only once per context, so
+    an annotation shared by hundreds of parameters costs a single pass.
+    """
+
+    annotations = list(annotations)
+    contexts = [ctx] * len(annotations) if isinstance(ctx, str) else list(ctx)
+    done: dict[tuple[int, str], object] = {}
+    result: list[object] = []
+    for ann, c in zip(annotations, contexts, strict=True):
+        key = id(ann), c
+        if key not in done:
+            done[key] = normalize_annotation(ann, ctx=c)
+        result.append(done[key])
+    return result
+
+
 __all__ = [
     "Ty",
     "from_type",
     "unparse",
     "unparse_top",
     "parse",
+    "parse_cache",
     "resolve",
     "norm",
     "validate",
     "normalize_annotation",
+    "normalize_many",
 ]
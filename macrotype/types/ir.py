@@ -1,13 +1,120 @@
 from __future__ import annotations
 
 import enum
-from dataclasses import dataclass, field
-from types import EllipsisType
-from typing import ClassVar, Literal, NewType, Optional, TypeAlias
+import weakref
+from dataclasses import MISSING, dataclass, field, fields
+from types import EllipsisType, NoneType
+from typing import Any, ClassVar, Literal, NewType, Optional, TypeAlias
 
+# ---------- Interning ----------
 
-@dataclass(frozen=True, kw_only=True, slots=True)
-class TyAnnoTree:
+# Field values of these exact types are compared by value; everything else
+# (types, typing objects, enum members, nested nodes) by identity.  Tagging
+# values with their type keeps ``Literal[1]`` and ``Literal[True]`` apart.
+_VALUE_TYPES = frozenset({str, bytes, int, bool, float, complex, NoneType})
+
+_INTERNED: weakref.WeakValueDictionary[tuple[object, ...], _Interned] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _intern_key(value: object) -> object:
+    tp = type(value)
+    if tp in _VALUE_TYPES:
+        return tp, value
+    if tp is tuple:
+        return (tuple, *map(_intern_key, value))
+    return id(value)
+
+
+class _InternMeta(type):
+    """Return one shared instance per class and field values.
+
+    A node holds its field values, and the table holds nodes weakly, so the
+    ids in a key stay valid for as long as the key is in the table.
+    """
+
+    def __call__(cls, **kwargs: Any) -> Any:
+        spec = cls.__dict__.get("_intern_spec")
+        if spec is None:
+            init = [f for f in fields(cls) if f.init]  # type: ignore[arg-type]
+            spec = cls._intern_spec = (
+                tuple((f.name, f.default) for f in init),
+                frozenset(f.name for f in init),
+            )
+        defaults, names = spec
+        if not kwargs.keys() <= names:
+            return super().__call__(**kwargs)  # raises the usual TypeError
+        key: list[object] = [cls]
+        for name, default in defaults:
+            value = kwargs.get(name, default)
+            if value is MISSING:
+                return super().__call__(**kwargs)
+            key.append(_intern_key(value))
+        tkey = tuple(key)
+        node = _INTERNED.get(tkey)
+        if node is None:
+            node = super().__call__(**kwargs)
+            _INTERNED[tkey] = node
+        return node
+
+
+class _Interned(metaclass=_InternMeta):
+    """Base of hash-consed IR nodes.
+
+    Nodes built from identical field values are the same object, so equality
+    usually succeeds on identity and results derived from a node can be kept
+    in its :attr:`memo`.  Equality stays structural for nodes whose fields are
+    equal but distinct objects, e.g. two separately built ``list[int]``.
+    """
+
+    __slots__ = ("__weakref__", "_memo")
+
+    @property
+    def memo(self) -> dict[object, Any]:
+        """Per-node cache for results derived from this node alone."""
+        try:
+            return self._memo
+        except AttributeError:
+            memo: dict[object, Any] = {}
+            object.__setattr__(self, "_memo", memo)
+            return memo
+
+    def _field_values(self) -> tuple[object, ...]:
+        return tuple(getattr(self, f.name) for f in fields(self))  # type: ignore[arg-type]
+
+    # Same semantics as the dataclass-generated methods; interning only makes
+    # the identity check hit first and lets the hash be cached.
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._field_values() == other._field_values()  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        memo = self.memo
+        h = memo.get("hash")
+        if h is None:
+            h = memo["hash"] = hash(self._field_values())
+        return h
+
+    def __reduce__(self) -> tuple[object, ...]:
+        # Rebuild through the constructor so copies are interned too.
+        return _rebuild, (type(self), {f.name: getattr(self, f.name) for f in fields(self)})
+
+
+def _rebuild(cls: type[_Interned], kwargs: dict[str, Any]) -> _Interned:
+    return cls(**kwargs)
+
+
+def interned_count() -> int:
+    """Return the number of live interned nodes."""
+    return len(_INTERNED)
+
+
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
+class TyAnnoTree(_Interned):
     annos: tuple[object, ...]
     child: Optional[TyAnnoTree] = None
 
@@ -29,8 +136,8 @@ class TyRoot:
     is_classvar: bool = False
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
-class Ty:
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
+class Ty(_Interned):
     """Base IR node (type-level AST)."""
 
     annotations: Optional["TyAnnoTree"] = field(default=None, repr=False)
@@ -65,21 +172,21 @@ class Ty:
     is_generic: ClassVar[bool] = False
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyAny(Ty):
     """The top type `Any`."""
 
     # e.g., `x: Any`
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyNever(Ty):
     """The bottom type `Never`/`NoReturn`."""
 
     # e.g., `def f() -> Never: ...`
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyType(Ty):
     """
     A (possibly annotated) regular python type, like int, MyClass, or Sequence.
@@ -92,7 +199,7 @@ class TyType(Ty):
         return self.type_
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyApp(Ty):
     """
     Generic application (type constructor applied to type arguments).
@@ -118,7 +225,7 @@ class TyApp(Ty):
     is_generic: ClassVar[bool] = True
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyUnion(Ty):
     """
     Union type (already canonicalized in normalization).
@@ -140,7 +247,7 @@ LitPrim: TypeAlias = int | bool | str | bytes | None | enum.Enum
 LitVal: TypeAlias = LitPrim | tuple["LitVal", ...]
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyLiteral(Ty):
     """
     Literal values per PEP 586.
@@ -154,7 +261,7 @@ class TyLiteral(Ty):
     values: tuple[LitVal, ...]
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyCallable(Ty):
     """
     Callable type. Parameters may include TyParamSpec / TyUnpack for advanced forms.
@@ -169,7 +276,7 @@ class TyCallable(Ty):
     ret: Ty
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyForward(Ty):
     """
     Unresolved forward reference (string form).
@@ -181,7 +288,7 @@ class TyForward(Ty):
     qualname: str
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyTypeVar(Ty):
     """
     Type variable declaration (single type parameter).
@@ -198,7 +305,7 @@ class TyTypeVar(Ty):
     contrav: bool
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyParamSpec(Ty):
     """
     ParamSpec declaration for callable parameter packs.
@@ -212,7 +319,7 @@ class TyParamSpec(Ty):
     flavor: Literal["args", "kwargs"] | None = None
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyTypeVarTuple(Ty):
     """
     TypeVarTuple declaration for variadic generics (PEP 646).
@@ -225,7 +332,7 @@ class TyTypeVarTuple(Ty):
     name: str
 
 
-@dataclass(frozen=True, kw_only=True, slots=True)
+@dataclass(frozen=True, kw_only=True, slots=True, eq=False)
 class TyUnpack(Ty):
     """
     Unpack wrapper for variadic forms (PEP 646).
@@ -238,6 +345,35 @@ class TyUnpack(Ty):
     inner: Ty
 
 
+_REPR_FIELDS: dict[type, tuple[str, ...]] = {}
+
+
+def ty_key(n: Ty) -> str:
+    """Return the deterministic sort/dedup key of *n*.
+
+    The key equals ``repr(n)`` but is cached on the node and built from the
+    cached keys of its children, so shared subtrees are only formatted once.
+    """
+    memo = n.memo
+    key = memo.get("key")
+    if key is None:
+        names = _REPR_FIELDS.get(type(n))
+        if names is None:
+            names = _REPR_FIELDS[type(n)] = tuple(f.name for f in fields(n) if f.repr)
+        parts = ", ".join(f"{name}={_field_key(getattr(n, name))}" for name in names)
+        key = memo["key"] = f"{type(n).__qualname__}({parts})"
+    return key
+
+
+def _field_key(value: object) -> str:
+    if isinstance(value, Ty):
+        return ty_key(value)
+    if type(value) is tuple and value:
+        inner = ", ".join(map(_field_key, value))
+        return f"({inner},)" if len(value) == 1 else f"({inner})"
+    return repr(value)
+
+
 def has_type_member(ty: Ty, members: set[type]) -> bool:
     """Return ``True`` if ``ty`` contains a union member of any ``members``.
 
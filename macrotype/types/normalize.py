@@ -16,6 +16,7 @@ from .ir import (
     TyType,
     TyUnion,
     TyUnpack,
+    ty_key,
 )
 
 
@@ -64,6 +65,14 @@ def norm(t: ResolvedTy | Ty, opts: NormOpts | None = None) -> NormalizedTy:
 def _norm(n: Ty | None, o: NormOpts) -> Ty | None:
     if n is None:
         return None
+    key = ("norm", o)
+    res = n.memo.get(key)
+    if res is None:
+        res = n.memo[key] = _norm_node(n, o)
+    return res
+
+
+def _norm_node(n: Ty, o: NormOpts) -> Ty:
     ann = n.annotations
     if ann and o.drop_annotated_any and isinstance(n, TyAny):
         return TyAny()
@@ -146,6 +155,6 @@ def _norm(n: Ty | None, o: NormOpts) -> Ty | None:
 
 
 def _key(n: Ty) -> str:
-    """Deterministic structural key for sorting/dedup. Keep simple (repr-based) to start."""
+    """Deterministic structural key for sorting/dedup; see :func:`ty_key`."""
 
-    return repr(n)
+    return ty_key(n)
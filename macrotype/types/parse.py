@@ -4,9 +4,10 @@ import collections.abc as abc
 import enum
 import types as _types
 import typing as t
+from collections import OrderedDict
 from dataclasses import dataclass, replace
 from types import EllipsisType
-from typing import Optional, get_args, get_origin
+from typing import Callable, Hashable, NamedTuple, Optional, get_args, get_origin
 
 from .ir import (
     LitVal,
@@ -26,6 +27,7 @@ from .ir import (
     TyTypeVarTuple,
     TyUnion,
     TyUnpack,
+    ty_key,
 )
 
 _TYPING_ATTR_TYPES: tuple[type, ...] = (type, _types.GenericAlias, str)
@@ -51,6 +53,11 @@ class ParseEnv:
             return None
         return self.typevars.get(name)
 
+    def cache_key(self) -> Hashable:
+        """Return a hashable stand-in for this env; the ``typevars`` dict is not."""
+        typevars = frozenset(self.typevars.items()) if self.typevars else None
+        return self.module, typevars, self.in_typed_dict
+
 
 # ---------- Helpers ----------
 
@@ -130,7 +137,72 @@ def _origin_args(tp: object) -> tuple[object | None, tuple[object, ...]]:
 
 # ---------- Main parser ----------
 
-_CACHE = {}
+
+class ParseCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int | None
+    currsize: int
+
+
+class ParseCache:
+    """Least-recently-used cache of parsed IR keyed by object identity and env.
+
+    Each entry keeps a strong reference to the parsed object, so its id cannot
+    be recycled by another object while the entry exists.  At most *maxsize*
+    entries are kept; ``None`` means unbounded and ``0`` disables caching.
+    Envs whose :meth:`ParseEnv.cache_key` is unhashable are not cached.
+    """
+
+    def __init__(self, maxsize: int | None = 8192) -> None:
+        self._maxsize = maxsize
+        self._entries: OrderedDict[tuple[int, Hashable], tuple[object, Ty]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int | None:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int | None) -> None:
+        self._maxsize = maxsize
+        self._trim()
+
+    def _trim(self) -> None:
+        if self._maxsize is not None:
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, tp: object, env: ParseEnv, compute: Callable[[object, ParseEnv], Ty]) -> Ty:
+        """Return the cached IR of *tp* in *env*, calling *compute* on a miss."""
+        try:
+            key = id(tp), env.cache_key()
+            entry = self._entries.get(key)
+        except TypeError:
+            return compute(tp, env)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        result = compute(tp, env)
+        if self._maxsize != 0:
+            self._entries[key] = (tp, result)
+            self._trim()
+        return result
+
+    def info(self) -> ParseCacheInfo:
+        return ParseCacheInfo(self.hits, self.misses, self._maxsize, len(self._entries))
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+parse_cache = ParseCache()
 
 
 def _cached[T](f: T) -> T:
@@ -138,10 +210,7 @@ def _cached[T](f: T) -> T:
         origin = get_origin(tp)
         if origin in (t.ClassVar, t.Final, t.Required, t.NotRequired):
             return f(tp, env)
-        cache_key = id(tp), env
-        if cache_key not in _CACHE:
-            _CACHE[cache_key] = f(tp, env)
-        return _CACHE[cache_key]
+        return parse_cache.get(tp, env, f)
 
     wrapped.wrapped = f
 
@@ -173,8 +242,8 @@ def _to_ir(tp: object, env: ParseEnv) -> Ty:
         opts: list[Ty] = []
         for a in args:
             opts.append(_to_ir(a, env))
-        uniq: dict[str, Ty] = {repr(o): o for o in opts}
-        return TyUnion(options=tuple(sorted(uniq.values(), key=repr)))
+        uniq: dict[str, Ty] = {ty_key(o): o for o in opts}
+        return TyUnion(options=tuple(uniq[k] for k in sorted(uniq)))
 
     if origin is t.Annotated:
         base, *meta = args
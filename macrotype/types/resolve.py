@@ -45,6 +45,9 @@ class ResolveEnv:
 def resolve(t: ParsedTy | Ty, env: ResolveEnv) -> ResolvedTy:
     """Resolve forward refs and qualify bare names. Pure; returns a new tree."""
     top = t if isinstance(t, TyRoot) else TyRoot(ty=t)
+    if not env.imports:
+        # Nothing to resolve: rebuilding would return the same interned nodes.
+        return ResolvedTy(top)
     inner = _res(top.ty, env) if top.ty is not None else None
     return ResolvedTy(
         TyRoot(
@@ -55,10 +55,17 @@ def _apply_annos(inner: Any, tree) -> Any:
 
 
 def _unparse(n: Ty) -> Any:
+    try:
+        return n.memo["unparse"]
+    except KeyError:
+        pass
     if n.annotations:
         inner = _unparse_no_annos(replace(n, annotations=None))
-        return _apply_annos(inner, n.annotations)
-    return _unparse_no_annos(n)
+        res = _apply_annos(inner, n.annotations)
+    else:
+        res = _unparse_no_annos(n)
+    n.memo["unparse"] = res
+    return res
 
 
 def _unparse_no_annos(n: Ty) -> Any:
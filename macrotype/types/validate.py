@@ -37,6 +37,15 @@ def validate(t: NormalizedTy, *, ctx: Context = "top") -> TyRoot:
 
 
 def _v(node: Ty, *, ctx: Context) -> None:
+    # Nodes are interned, so a subtree that validated once in *ctx* always will.
+    key = ("valid", ctx)
+    if key in node.memo:
+        return
+    _v_node(node, ctx=ctx)
+    node.memo[key] = True
+
+
+def _v_node(node: Ty, *, ctx: Context) -> None:
     match node:
         # Leaves / benign
         case TyAny() | TyNever() | TyTypeVar() | TyParamSpec() | TyTypeVarTuple():
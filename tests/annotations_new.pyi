@@ -256,7 +256,7 @@ class UsesForwardRef:
     items: list["ForwardRefModel"]
 
 def sum_of(*args: tuple[int]) -> int: ...
-def dict_echo[*Ts](**kwargs: dict[str, Any]) -> dict[str, Any]: ...
+def dict_echo(**kwargs: dict[str, Any]) -> dict[str, Any]: ...
 def use_params[**P](func: Callable[P, int], *args: P.args, **kwargs: P.kwargs) -> int: ...
 def is_str_list(val: list[object]) -> TypeGuard[list[str]]: ...
 def is_int(val: object) -> TypeGuard[int]: ...
@@ -286,7 +286,7 @@ def echo_literal(value: LiteralString) -> LiteralString: ...
 NONE_VAR: None
 
 async def async_add_one(x: int) -> int: ...
-async def gen_range[*Ts](n: int) -> AsyncIterator[int]: ...
+async def gen_range(n: int) -> AsyncIterator[int]: ...
 @final
 class FinalClass: ...
 
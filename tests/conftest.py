@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+
+class TmpPackages:
+    """Throwaway packages under a ``sys.path`` directory, importable by name."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.names: list[str] = []
+
+    def make(self, name: str, files: dict[str, str]) -> Path:
+        """Create package *name* with ``__init__.py`` and *files*; return its path."""
+        pkg = self.root / name
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("")
+        for filename, code in files.items():
+            (pkg / filename).write_text(code)
+        self.names.append(name)
+        return pkg
+
+    def forget(self) -> None:
+        """Drop the packages and their submodules from ``sys.modules``."""
+        for name in self.names:
+            for mod in [m for m in sys.modules if m == name or m.startswith(name + ".")]:
+                del sys.modules[mod]
+
+
+@pytest.fixture
+def tmp_packages(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Yield :class:`TmpPackages` rooted at ``tmp_path``, forgotten after the test."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    packages = TmpPackages(tmp_path)
+    yield packages
+    packages.forget()
@@ -23,6 +23,7 @@ from macrotype.modules.emit import (
     build_name_map,
     emit_module,
     flatten_annotation_atoms,
+    iter_emit_module,
     stringify_annotation,
 )
 from macrotype.modules.ir import (
@@ -252,6 +253,18 @@ def test_paramspec_unpacked_in_generic():
     assert stringify_annotation(ann2, nm2) == "Callable[[*P.args, **P.kwargs], int]"
 
 
+def test_stringify_memo():
+    inner = list[int]
+    ann = dict[str, inner] | None
+    nm = build_name_map(flatten_annotation_atoms(ann), {})
+    memo: dict[int, tuple[Any, str]] = {}
+    assert stringify_annotation(ann, nm, memo=memo) == "None | dict[str, list[int]]"
+    assert memo[id(inner)] == (inner, "list[int]")
+    memo[id(inner)] = (inner, "cached")
+    assert stringify_annotation(inner, nm, memo=memo) == "cached"
+    assert stringify_annotation(inner, nm) == "list[int]"
+
+
 mod10 = ModuleType("m10")
 orig = pathlib.Path.__module__
 set_module(pathlib.Path, "pathlib._local")
@@ -388,3 +401,31 @@ def test_emit_module_table() -> None:
     got = [emit_module(mi) for mi, _ in CASES]
     expected = [exp for _, exp in CASES]
     assert got == expected
+
+
+def test_iter_emit_module_matches_emit_module() -> None:
+    for mi, expected in CASES:
+        resolve_imports(mi)
+        assert list(iter_emit_module(mi)) == expected
+
+
+def test_name_context_shared_by_resolve_imports_and_emit(monkeypatch):
+    import macrotype.modules.emit as emit
+
+    mod = ModuleType("name_ctx")
+    mod.Path = pathlib.Path
+    site = Site(role="var", annotation=list[pathlib.Path])
+    mi = ModuleDecl(name=mod.__name__, obj=mod, members=[VarDecl(name="x", site=site)])
+
+    calls: list[Any] = []
+    flatten = emit.flatten_annotation_atoms
+    monkeypatch.setattr(
+        emit, "flatten_annotation_atoms", lambda ann: calls.append(ann) or flatten(ann)
+    )
+    resolve_imports(mi)
+    assert emit_module(mi)[-1] == "x: list[Path]"
+    assert calls == [list[pathlib.Path]]
+
+    site.annotation = dict[str, pathlib.Path]
+    assert emit_module(mi)[-1] == "x: dict[str, Path]"
+    assert len(calls) == 2
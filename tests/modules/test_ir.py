@@ -12,6 +12,7 @@ from macrotype.modules.ir import (
     ClassDecl,
     Decl,
     FuncDecl,
+    ImportBlock,
     ModuleDecl,
     TypeDefDecl,
     VarDecl,
@@ -279,3 +280,22 @@ def test_strict_mode_raises_on_invalid_annotation() -> None:
             from_module(mod, strict=True)
     finally:
         sys.modules.pop("tests.strict_error", None)
+
+
+def test_import_cull_matches_whole_words() -> None:
+    block = ImportBlock(
+        typing={"Any", "Final", "Self"},
+        froms={"a": {"Path", "Purepath", "Q as R", "é"}, "b": {"Unused"}},
+    )
+    block.cull(["x: Final[Path]", "def f(y: R) -> PurePath: ...", "z = 'é'"], ["Self"])
+    assert block.typing == {"Final", "Self"}
+    assert block.froms == {"a": {"Path", "Q as R", "é"}}
+
+
+def test_import_usage_collects_chunks() -> None:
+    block = ImportBlock(froms={"a": {"Path", "os.path", "sys.path"}, "b": {"Unused"}})
+    usage = block.usage()
+    usage.update(["x: Path"])
+    usage.update(["y: os.path"])
+    block.cull_unused(usage, [])
+    assert block.froms == {"a": {"Path", "os.path"}}
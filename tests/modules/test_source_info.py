@@ -32,3 +32,66 @@ def test_source_info_tree_cached() -> None:
     first = info.tree
     second = info.tree
     assert first is second
+
+
+def test_source_index_single_pass() -> None:
+    code = (
+        "from typing import TYPE_CHECKING\n"
+        "if TYPE_CHECKING:\n"
+        "    from os import PathLike\n"
+        "X: list[int] = []  # the x\n"
+        "@decorator\n"
+        "class Outer:\n"
+        "    class Inner:\n"
+        "        y: int  # the y\n"
+        "    def method(self) -> None: ...\n"
+        "def f(a: dict[str, int], *args: int) -> set[str]: ...\n"
+    )
+    index = extract_source_info(code).index
+    assert index.comments == {4: "# the x", 8: "# the y"}
+    assert index.ranges["Outer"] == [(5, 9)]
+    assert index.ranges["Outer.Inner"] == [(7, 8)]
+    assert index.ranges["Outer.method"] == [(9, 9)]
+    assert index.var_annotations["X"] == "list[int]"
+    assert index.param_annotations[("f", 0, "a")] == "dict[str, int]"
+    assert index.param_annotations[("f", 0, "args")] == "int"
+    assert index.return_annotations[("f", 0)] == "set[str]"
+    assert index.tc_imports == {"os": {"PathLike"}}
+
+
+def test_range_of_redefined_class() -> None:
+    code = "class A:\n    x: int  # first\n\nclass A:\n    x: int  # second\n"
+    index = extract_source_info(code).index
+    assert index.range_of("A", 4) == (4, 5)
+    # Without ``__firstlineno__`` (Python < 3.13), like inspect.getsourcelines.
+    assert index.range_of("A") == (1, 2)
+    assert index.range_of("B") is None
+
+
+def test_comments_from_index_without_source_file() -> None:
+    from macrotype.stubgen import load_module_from_code, stub_lines
+
+    code = "class A:\n    class B:\n        x: int  # inner\n\nY: int = 1  # outer\n"
+    mod = load_module_from_code(code, "source_index_comments")
+    try:
+        lines = stub_lines(mod, source_info=extract_source_info(code))
+    finally:
+        sys.modules.pop("source_index_comments", None)
+    assert "        x: int  # inner" in lines
+    assert "Y: int  # outer" in lines
+
+
+def test_comments_after_form_feed_and_line_separator() -> None:
+    from macrotype.stubgen import load_module_from_code, stub_lines
+
+    code = (
+        "\x0c\nY: int = 1\nS: str = 'a\u2028b'  # why s\n# see \u2028 below\nZ: int = 2  # why z\n"
+    )
+    mod = load_module_from_code(code, "source_index_form_feed")
+    try:
+        lines = stub_lines(mod, source_info=extract_source_info(code))
+    finally:
+        sys.modules.pop("source_index_form_feed", None)
+    assert "Y: int" in lines
+    assert "S: str  # why s" in lines
+    assert "Z: int  # why z" in lines
@@ -0,0 +1,51 @@
+import ast
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.run import compare, main, run
+from benchmarks.synthetic import CASES, generate
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_synthetic_modules_scale(case: str) -> None:
+    small, large = generate(case, 40), generate(case, 400)
+    ast.parse(large)
+    assert large.count("\n") > 5 * small.count("\n")
+
+
+def test_run_reports_phases() -> None:
+    results = run(20, cases=["functions", "overloads"], repeat=1)
+    functions = results["cases"]["functions"]
+    assert {"import", "scan_module", "emit"} <= set(functions["phases"])
+    assert functions["peak"] > 0
+    assert "expand_overloads" in results["cases"]["overloads"]["phases"]
+
+
+def _result(total: float, peak: int, emit: float) -> dict:
+    phases = {"emit": {"wall": emit, "peak": peak}, "tiny": {"wall": 0.001, "peak": 0}}
+    return {"cases": {"functions": {"total": total, "peak": peak, "phases": phases}}}
+
+
+def test_compare_flags_regressions_above_threshold() -> None:
+    base = _result(1.0, 1000, 0.5)
+    assert compare(_result(1.1, 1100, 0.55), base, threshold=0.25) == []
+    slower = _result(1.5, 1000, 0.8)
+    slower["cases"]["functions"]["phases"]["tiny"]["wall"] = 0.01
+    messages = compare(slower, base, threshold=0.25)
+    assert [m.split(":")[0] for m in messages] == ["functions total", "functions emit"]
+    assert compare(_result(1.0, 2000, 0.5), base)[0].startswith("functions peak memory")
+
+
+def test_main_exits_nonzero_on_regression(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    out = tmp_path / "bench.json"
+    assert main(["--scale", "5", "--repeat", "1", "--case", "enums", "--json", str(out)]) == 0
+    baseline = json.loads(out.read_text())
+    for stats in baseline["cases"]["enums"]["phases"].values():
+        stats["wall"] = 1e-9
+    baseline["cases"]["enums"]["total"] = 1e-9
+    out.write_text(json.dumps(baseline))
+    args = ["--scale", "5", "--repeat", "1", "--case", "enums", "--baseline", str(out)]
+    assert main([*args, "--min-time", "0"]) == 1
+    assert "regression: enums total" in capsys.readouterr().err
@@ -0,0 +1,149 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.cache import StubCache, imported_module_names
+from macrotype.modules.source import extract_source_info
+from macrotype.stubgen import process_file
+
+
+@pytest.fixture
+def project(tmp_packages, tmp_path: Path):
+    log = tmp_path / "imports.log"
+    mod = (
+        "import os\n"
+        f"os.write(os.open({str(log)!r}, os.O_WRONLY | os.O_CREAT | os.O_APPEND), b'x')\n"
+        "from .base import BASE\n"
+        "VALUE = BASE\n"
+    )
+    return tmp_packages.make("cache_pkg", {"base.py": "BASE = 1\n", "mod.py": mod}), log
+
+
+def test_cache_hit_skips_import(project, tmp_packages, tmp_path: Path) -> None:
+    pkg, log = project
+    out = tmp_path / "out.pyi"
+    process_file(pkg / "mod.py", out, cache=StubCache(tmp_path / "cache"))
+    first = out.read_text()
+    tmp_packages.forget()
+    out.unlink()
+
+    cache = StubCache(tmp_path / "cache")
+    process_file(pkg / "mod.py", out, cache=cache)
+    assert out.read_text() == first
+    assert log.read_text() == "x"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_dependency_change_invalidates(project, tmp_packages, tmp_path: Path) -> None:
+    pkg, log = project
+    out = tmp_path / "out.pyi"
+    process_file(pkg / "mod.py", out, cache=StubCache(tmp_path / "cache"))
+    assert "VALUE: int" in out.read_text()
+    tmp_packages.forget()
+
+    (pkg / "base.py").write_text("BASE = 'one'\n")
+    cache = StubCache(tmp_path / "cache")
+    process_file(pkg / "mod.py", out, cache=cache)
+    assert cache.misses == 1
+    assert "VALUE: str" in out.read_text()
+
+
+def test_failures_are_cached(tmp_path: Path) -> None:
+    src = tmp_path / "cache_broken.py"
+    log = tmp_path / "imports.log"
+    src.write_text(f"open({str(log)!r}, 'a').write('x')\nraise ValueError('boom')\n")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        for _ in range(2):
+            with pytest.raises(Exception, match="boom"):
+                process_file(src, tmp_path / "out.pyi", cache=StubCache(tmp_path / "cache"))
+            sys.modules.pop("cache_broken", None)
+    finally:
+        sys.path.remove(str(tmp_path))
+    assert log.read_text() == "x"
+
+
+def test_import_errors_are_not_cached(tmp_path: Path) -> None:
+    src = tmp_path / "cache_missing_dep.py"
+    # Imported dynamically, so the dependency is not part of the key.
+    src.write_text("import importlib\n\nX = importlib.import_module('cache_late_dep').X\n")
+    sys.path.insert(0, str(tmp_path))
+    try:
+        cache = StubCache(tmp_path / "cache")
+        with pytest.raises(ModuleNotFoundError, match="cache_late_dep"):
+            process_file(src, tmp_path / "out.pyi", cache=cache)
+        sys.modules.pop("cache_missing_dep", None)
+        (tmp_path / "cache_late_dep.py").write_text("X = 1\n")
+        cache = StubCache(tmp_path / "cache")
+        process_file(src, tmp_path / "out.pyi", cache=cache)
+    finally:
+        sys.path.remove(str(tmp_path))
+        for name in ["cache_missing_dep", "cache_late_dep"]:
+            sys.modules.pop(name, None)
+    assert cache.misses == 1
+    assert "X: int" in (tmp_path / "out.pyi").read_text()
+
+
+def test_size_based_eviction(tmp_path: Path) -> None:
+    cache = StubCache(tmp_path / "cache", max_bytes=2048)
+    from macrotype.cache import CacheEntry
+
+    for i in range(50):
+        src = tmp_path / f"m{i}.py"
+        code = f"X{i} = {i}\n"
+        src.write_text(code)
+        cache.put(src, code, CacheEntry(lines=[f"X{i}: int"] * 10))
+    total = sum(p.stat().st_size for p in (tmp_path / "cache").rglob("*.json"))
+    assert total <= 2048
+    last = tmp_path / "m49.py"
+    assert cache.get(last, last.read_text()) is not None
+
+
+def test_size_counts_replaced_entries_once(tmp_path: Path) -> None:
+    from macrotype.cache import CacheEntry
+
+    cache = StubCache(tmp_path / "cache")
+    src = tmp_path / "m.py"
+    code = "X = 'é'\n"
+    src.write_text(code)
+    for lines in (["X: str"], ["X: str"] * 10, ["X: str = 'é'"]):
+        cache.put(src, code, CacheEntry(lines=lines))
+        cache.put(tmp_path / "other.py", "Y = 1\n", CacheEntry(lines=lines))
+    assert cache._size == cache._disk_usage()
+
+
+def test_imported_module_names_resolves_relative_imports() -> None:
+    info = extract_source_info("import os\nfrom . import a\nfrom ..b import c\n")
+    names = imported_module_names(info.tree, "pkg.sub.mod", is_package=False)
+    assert names == {"os", "pkg.sub", "pkg.sub.a", "pkg.b", "pkg.b.c"}
+
+
+def test_hybrid_mode_has_its_own_entries(project, tmp_packages, tmp_path: Path) -> None:
+    pkg, log = project
+    out = tmp_path / "out.pyi"
+    process_file(pkg / "mod.py", out, cache=StubCache(tmp_path / "cache"))
+    tmp_packages.forget()
+
+    cache = StubCache(tmp_path / "cache")
+    process_file(pkg / "mod.py", out, cache=cache, hybrid=True)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert log.read_text() == "xx"
+
+
+def test_miss_parses_source_once(project, tmp_path: Path, monkeypatch) -> None:
+    import ast
+
+    pkg, _ = project
+    code = (pkg / "mod.py").read_text()
+    parsed: list[str] = []
+    parse = ast.parse
+
+    def counting_parse(source, *args, **kwargs):
+        if source == code:
+            parsed.append(source)
+        return parse(source, *args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", counting_parse)
+    process_file(pkg / "mod.py", tmp_path / "out.pyi", cache=StubCache(tmp_path / "cache"))
+    assert len(parsed) == 1
@@ -0,0 +1,115 @@
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from macrotype.cli.daemon import DaemonServer, main, request
+
+
+@pytest.fixture
+def project(tmp_packages) -> Path:
+    return tmp_packages.make(
+        "daemon_pkg",
+        {
+            "base.py": "class Base:\n    x: int\n",
+            "user.py": "from .base import Base\n\nVALUE: Base = Base()\n",
+        },
+    )
+
+
+@contextmanager
+def _serving(root: Path):
+    """Run a daemon for *root* in a thread; yield its socket and stop it after."""
+    sock = root / "d.sock"
+    server = DaemonServer(sock, root)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    try:
+        for _ in range(100):
+            if sock.exists():
+                break
+            threading.Event().wait(0.05)
+        yield sock
+    finally:
+        request(sock, {"command": "stop"})
+        thread.join(5)
+    assert not thread.is_alive()
+    assert not sock.exists()
+
+
+def test_daemon_serves_run_requests(project: Path, tmp_path: Path) -> None:
+    with _serving(tmp_path) as sock:
+        out = tmp_path / "out"
+        run = {"command": "run", "argv": ["daemon_pkg", "-o", str(out)], "cwd": str(tmp_path)}
+        first = request(sock, run)
+        assert first["code"] == 0
+        assert "3 stub(s) written" in first["stderr"]
+        assert "x: int" in (out / "base.pyi").read_text()
+
+        (project / "base.py").write_text("class Base:\n    x: str\n")
+        second = request(sock, {**run, "argv": [*run["argv"], "--no-cache"]})
+        assert second["code"] == 0
+        assert "x: str" in (out / "base.pyi").read_text()
+
+        status = request(sock, {"command": "status"})
+        assert status["requests"] == 2
+        assert status["modules"] >= 3
+
+
+def test_daemon_refreshes_modules_saved_during_a_request(
+    project: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from macrotype.cli import __main__
+
+    server = DaemonServer(tmp_path / "d.sock", tmp_path)
+    out = tmp_path / "out"
+    argv = ["daemon_pkg", "-o", str(out), "--no-cache"]
+    stub_main = __main__._stub_main
+
+    def save_during_run(argv, **kwargs):
+        code = stub_main(argv, **kwargs)
+        (project / "base.py").write_text("class Base:\n    x: bytes\n")
+        return code
+
+    monkeypatch.setattr(__main__, "_stub_main", save_during_run)
+    assert server.run(argv, tmp_path)["code"] == 0
+    assert "x: int" in (out / "base.pyi").read_text()
+    monkeypatch.setattr(__main__, "_stub_main", stub_main)
+
+    assert server.run(argv, tmp_path)["code"] == 0
+    assert "x: bytes" in (out / "base.pyi").read_text()
+    (project / "base.py").write_text("class Base:\n    x: str\n")
+    assert server.run(argv, tmp_path)["code"] == 0
+    assert "x: str" in (out / "base.pyi").read_text()
+
+
+def test_daemon_rejects_cwd_outside_root(tmp_path: Path) -> None:
+    (tmp_path / "root").mkdir()
+    server = DaemonServer(tmp_path / "d.sock", tmp_path / "root")
+    response = server.run(["pkg"], tmp_path)
+    assert response["code"] == 2
+    assert "outside the daemon root" in response["stderr"]
+    assert server.run(["--help"], tmp_path / "root")["code"] == 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        [],
+        "run",
+        {"command": "run", "argv": 5},
+        {"command": "run", "argv": ["pkg", 1]},
+        {"command": "run", "argv": [], "cwd": 5},
+    ],
+)
+def test_daemon_survives_malformed_requests(tmp_path: Path, payload: object) -> None:
+    with _serving(tmp_path) as sock:
+        assert request(sock, payload) == {"error": "malformed request"}
+        assert request(sock, {"command": "status"})["requests"] == 0
+
+
+def test_client_reports_missing_daemon(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    assert main(["run", "--socket", str(tmp_path / "none.sock"), "pkg"]) == 2
+    assert "not running" in capsys.readouterr().err
+    assert main(["status", "--socket", str(tmp_path / "none.sock")]) == 1
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.cli import _strip_options
+from macrotype.cli.__main__ import main
+from macrotype.depgraph import DependencyGraph
+from macrotype.stubgen import process_directory
+
+
+@pytest.fixture
+def project(tmp_packages, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.chdir(tmp_path)
+    return tmp_packages.make(
+        "graph_pkg",
+        {
+            "base.py": "class Base:\n    x: int\n",
+            "user.py": "from .base import Base\n\nVALUE: Base = Base()\n",
+            "other.py": "Y = 1\n",
+        },
+    )
+
+
+def test_graph_records_dependents(project: Path, tmp_path: Path) -> None:
+    graph = DependencyGraph(tmp_path / "graph.json")
+    process_directory(project, tmp_path / "out", graph=graph)
+    assert "graph_pkg.base" in graph.deps["graph_pkg.user"]
+    assert graph.affected([project / "base.py"]) == {
+        (project / "base.py").resolve(),
+        (project / "user.py").resolve(),
+    }
+
+    graph.save()
+    loaded = DependencyGraph.load(tmp_path / "graph.json")
+    assert loaded.deps == graph.deps
+    assert loaded.files == graph.files
+
+
+def test_changed_files_regenerates_affected_closure(
+    project: Path, tmp_packages, tmp_path: Path
+) -> None:
+    out = tmp_path / "out"
+    cache_dir = tmp_path / "cache"
+    argv = [str(project), "-o", str(out), "--cache-dir", str(cache_dir)]
+    assert main(argv) == 0
+    first = (out / "user.pyi").read_text()
+    tmp_packages.forget()
+
+    (project / "base.py").write_text("class Base:\n    x: str\n")
+    (project / "other.py").write_text("Y = 'one'\n")
+    assert main([*argv, "--changed-files", str(project / "base.py")]) == 0
+    assert "x: str" in (out / "base.pyi").read_text()
+    assert (out / "user.pyi").read_text() == first
+    assert "Y: int" in (out / "other.pyi").read_text()
+
+
+def test_no_cache_writes_only_the_stub(
+    project: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    out = tmp_path / "x.pyi"
+    assert main([str(project / "other.py"), "-o", str(out), "--no-cache"]) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["graph_pkg", "x.pyi"]
+    assert sorted(p.name for p in project.iterdir()) == [
+        "__init__.py",
+        "base.py",
+        "other.py",
+        "user.py",
+    ]
+
+
+def test_strip_options_removes_changed_files() -> None:
+    argv = ["pkg", "--changed-files", "a.py", "b.py", "--strict"]
+    assert _strip_options(argv, set(), lists={"--changed-files"}) == ["pkg", "--strict"]
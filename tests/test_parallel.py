@@ -0,0 +1,234 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from macrotype.cli import EXECUTION_FLAGS, EXECUTION_OPTIONS, _strip_options
+from macrotype.stubgen import WriteStats, generate_many, process_directory, write_stub
+
+
+def _make_pkg(tmp_packages) -> Path:
+    return tmp_packages.make(
+        "par_pkg",
+        {
+            "a.py": "A = 1\n\ndef f(x: int) -> str: ...\n",
+            "b.py": "from .a import A\n\nB: list[int] = [A]\n",
+            "broken.py": "raise RuntimeError('boom')\n",
+        },
+    )
+
+
+@pytest.mark.parametrize("options", [{"jobs": 2}, {"preload": ["json"]}])
+def test_parallel_matches_sequential(
+    tmp_packages, tmp_path: Path, capsys: pytest.CaptureFixture[str], options: dict
+) -> None:
+    pkg = _make_pkg(tmp_packages)
+    seq = process_directory(pkg, tmp_path / "seq", command="macrotype par_pkg")
+    seq_err = capsys.readouterr().err
+    tmp_packages.forget()
+    par = process_directory(pkg, tmp_path / "par", command="macrotype par_pkg", **options)
+    par_err = capsys.readouterr().err
+
+    assert [p.relative_to(tmp_path / "par") for p in par] == [
+        p.relative_to(tmp_path / "seq") for p in seq
+    ]
+    for p in seq:
+        rel = p.relative_to(tmp_path / "seq")
+        assert (tmp_path / "par" / rel).read_bytes() == p.read_bytes()
+    assert "Skipping" in seq_err and "broken.py: boom" in seq_err
+    assert par_err == seq_err
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_generate_many_matches_process_directory(
+    tmp_packages, tmp_path: Path, capsys: pytest.CaptureFixture[str], jobs: int
+) -> None:
+    from macrotype.cache import StubCache
+
+    pkg = _make_pkg(tmp_packages)
+    cache = StubCache(tmp_path / "cache")
+    seq = process_directory(pkg, tmp_path / "seq")
+    capsys.readouterr()
+    tmp_packages.forget()
+    results = list(generate_many([pkg], jobs=jobs, cache=cache, out_dir=tmp_path / "many"))
+    cached = list(generate_many([str(pkg)], cache=cache, out_dir=tmp_path / "many"))
+
+    assert capsys.readouterr().err == ""
+    by_module = {r.module: r for r in results}
+    assert sorted(by_module) == ["par_pkg.__init__", "par_pkg.a", "par_pkg.b", "par_pkg.broken"]
+    broken = by_module.pop("par_pkg.broken")
+    assert broken.lines is None and broken.error == "boom"
+    for result in by_module.values():
+        assert result.error is None and not result.cached
+        assert {"import", "scan_module", "emit"} <= result.timings.keys()
+        write_stub(result.dest, result.lines)
+    assert sorted(r.dest for r in by_module.values()) == sorted(
+        tmp_path / "many" / p.relative_to(tmp_path / "seq") for p in seq
+    )
+    for p in seq:
+        assert (tmp_path / "many" / p.relative_to(tmp_path / "seq")).read_bytes() == p.read_bytes()
+    assert all(r.cached and r.timings == {} for r in cached)
+    assert {r.module: (r.lines, r.error) for r in cached} == {
+        r.module: (r.lines, r.error) for r in results
+    }
+
+
+def test_abandoned_generate_many_returns_promptly(tmp_packages, tmp_path: Path) -> None:
+    flag = tmp_path / "release"
+    slow = (
+        "import os, time\n\n"
+        "for _ in range(1000):\n"
+        f"    if os.path.exists({str(flag)!r}):\n"
+        "        break\n"
+        "    time.sleep(0.01)\n"
+    )
+    pkg = tmp_packages.make("abandon_pkg", {"fast.py": "X = 1\n", "slow.py": slow})
+    results = generate_many([pkg], jobs=2)
+    try:
+        first = next(results)
+        assert first.module != "abandon_pkg.slow"
+        start = time.monotonic()
+        results.close()
+        assert time.monotonic() - start < 5
+    finally:
+        flag.touch()
+
+
+def test_strip_options_removes_jobs() -> None:
+    argv = ["pkg", "-j", "4", "--jobs=2", "-j8", "--strict"]
+    assert _strip_options(argv, {"-j", "--jobs"}) == ["pkg", "--strict"]
+
+
+def test_strip_options_removes_preload() -> None:
+    argv = ["pkg", "--preload", "sqlalchemy,numpy", "--preload=pydantic", "--strict"]
+    assert _strip_options(argv, EXECUTION_OPTIONS) == ["pkg", "--strict"]
+
+
+def test_strip_options_removes_memory_options() -> None:
+    argv = ["pkg", "--max-rss", "2048", "--evict-modules", "--strict"]
+    assert _strip_options(argv, EXECUTION_OPTIONS, EXECUTION_FLAGS) == ["pkg", "--strict"]
+
+
+def _make_batch_pkg(tmp_packages, log: Path) -> Path:
+    code = (
+        "import os\nfrom typing import overload\n\n"
+        f"with open({str(log)!r}, 'a') as f:\n    f.write(f'{{os.getpid()}}\\n')\n\n"
+        "@overload\ndef f(x: int) -> int: ...\n@overload\ndef f(x: str) -> str: ...\n"
+        "def f(x): return x\n"
+    )
+    files = {f"{name}.py": code for name in "abc"}
+    files["d.py"] = "from .a import f\n\nX: int = f(1)\n"
+    return tmp_packages.make("batch_pkg", files)
+
+
+def test_evict_modules_matches_sequential(tmp_packages, tmp_path: Path) -> None:
+    from macrotype.meta_types import _OVERLOAD_REGISTRY
+
+    pkg = _make_batch_pkg(tmp_packages, tmp_path / "pids.log")
+    seq = process_directory(pkg, tmp_path / "seq")
+    tmp_packages.forget()
+    evicted = process_directory(pkg, tmp_path / "evicted", evict=True)
+    assert not [m for m in sys.modules if m.startswith("batch_pkg")]
+    assert not [m for m in _OVERLOAD_REGISTRY if m.startswith("batch_pkg")]
+    for p, q in zip(seq, evicted, strict=True):
+        assert q.read_bytes() == p.read_bytes()
+
+
+def test_max_rss_recycles_workers(tmp_packages, tmp_path: Path) -> None:
+    from macrotype.depgraph import DependencyGraph
+
+    log = tmp_path / "pids.log"
+    pkg = _make_batch_pkg(tmp_packages, log)
+    seq = process_directory(pkg, tmp_path / "seq")
+    tmp_packages.forget()
+    log.unlink()
+    stats, graph = WriteStats(), DependencyGraph()
+    # Every worker is over the limit after its first stub.
+    recycled = process_directory(pkg, tmp_path / "recycled", max_rss=1, stats=stats, graph=graph)
+    for p, q in zip(seq, recycled, strict=True):
+        assert q.read_bytes() == p.read_bytes()
+    # d imports a again in its own worker.
+    assert len(set(log.read_text().split())) == 4
+    assert stats.written == 5
+    assert graph.deps["batch_pkg.d"] >= {"batch_pkg.a"}
+
+
+def test_max_rss_rejects_jobs(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="jobs=1"):
+        process_directory(tmp_path, jobs=2, max_rss=1)
+
+
+def test_max_rss_rejects_in_process_options(tmp_path: Path) -> None:
+    from macrotype.cli import main
+    from macrotype.profiling import ImportProfiler, PassProfiler
+
+    for options in [
+        {"debug_failure": True},
+        {"profile": PassProfiler()},
+        {"import_profile": ImportProfiler()},
+    ]:
+        with pytest.raises(ValueError, match="max_rss cannot be combined"):
+            process_directory(tmp_path, max_rss=1, **options)
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "--max-rss", "1", "--profile-passes"])
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_process_file_releases_module_decl(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_cache: bool
+) -> None:
+    import weakref
+
+    from macrotype import modules
+    from macrotype.cache import StubCache
+    from macrotype.stubgen import process_file
+
+    refs: list[weakref.ref] = []
+    from_module = modules.from_module
+
+    def tracked(*args, **kwargs):
+        mi = from_module(*args, **kwargs)
+        refs.extend(weakref.ref(obj) for obj in (mi, mi.source, mi.source.tree))
+        return mi
+
+    monkeypatch.setattr(modules, "from_module", tracked)
+    src = tmp_path / "released_mod.py"
+    src.write_text("class C:\n    x: int = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    cache = StubCache(tmp_path / "cache") if use_cache else None
+    try:
+        process_file(src, tmp_path / "released_mod.pyi", cache=cache)
+    finally:
+        sys.modules.pop("released_mod", None)
+    assert len(refs) == 3
+    assert [ref() for ref in refs] == [None, None, None]
+
+
+def _preloaded(name: str) -> bool:
+    return name in sys.modules
+
+
+def test_changed_preload_falls_back_to_spawn() -> None:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from macrotype import stubgen
+
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        pytest.skip("no fork server")
+    # Whatever list an earlier test configured stays in place; only the
+    # first list ever used may reach the fork server.
+    first = stubgen._forkserver_preload or [*stubgen._PRELOAD, "json"]
+    preload = first[len(stubgen._PRELOAD) :]
+    ctx = stubgen._pool_context(preload)
+    assert ctx.get_start_method() == "forkserver"
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        assert all(pool.submit(_preloaded, name).result() for name in preload)
+
+    changed = stubgen._pool_context([*preload, "tomllib"])
+    assert changed.get_start_method() == "spawn"
+    with ProcessPoolExecutor(max_workers=1, mp_context=changed) as pool:
+        assert pool.submit(_preloaded, "macrotype").result()
+    assert stubgen._forkserver_preload == first
+    assert stubgen._pool_context(preload).get_start_method() == "forkserver"
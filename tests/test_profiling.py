@@ -0,0 +1,197 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.cli.__main__ import main
+from macrotype.modules import _PASSES, from_module
+from macrotype.profiling import MemoryProfiler, PassProfiler, memory_group
+
+
+def test_from_module_profiles_every_pass() -> None:
+    profile = PassProfiler()
+    try:
+        from_module(sys.modules[__name__], strict=True, profile=profile)
+    finally:
+        profile.close()
+    phases = profile.stats[__name__]
+    assert {"scan_module", "normalize", *_PASSES} <= phases.keys()
+    assert phases["recover_custom_generics"].calls == 2
+    assert all(s.wall >= 0 for s in phases.values())
+
+
+def test_pass_profiler_without_tracemalloc() -> None:
+    import tracemalloc
+
+    profile = PassProfiler(trace_memory=False)
+    with profile.phase("m", "emit"):
+        assert not tracemalloc.is_tracing()
+    stats = profile.stats["m"]["emit"]
+    assert (stats.calls, stats.alloc, stats.peak) == (1, 0, 0)
+
+
+def test_cli_profile_passes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    src = tmp_path / "profiled_mod.py"
+    src.write_text("X: int = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "out.pyi"
+    report = tmp_path / "profile.json"
+    try:
+        main([str(src), "-o", str(out), "--profile-passes", "--profile-json", str(report)])
+    finally:
+        sys.modules.pop("profiled_mod", None)
+    err = capsys.readouterr().err
+    assert any(line.startswith("phase ") for line in err.splitlines())
+    assert any(line.startswith("profiled_mod ") for line in err.splitlines())
+    phases = json.loads(report.read_text())["modules"]["profiled_mod"]
+    assert {"parse_source", "import", "scan_module", "emit", "write"} <= phases.keys()
+    assert "--profile" not in out.read_text()
+
+
+def test_memory_groups() -> None:
+    groups = {memory_group(name) for name in ["import", "parse_source", "normalize", "write"]}
+    assert groups == {"import", "scan", "normalize", "emit"}
+    assert {memory_group(name) for name in _PASSES} == {"transform"}
+
+
+def test_cli_memory_report(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    src = tmp_path / "mem_mod.py"
+    src.write_text(
+        "from enum import Enum\n\nBLOB = [str(i) for i in range(20000)]\n\n"
+        "class Color(Enum):\n    RED = 1\n    BLUE = 2\n\n"
+        "def f(x: list[int]) -> int:\n    return 1\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "out.pyi"
+    report = tmp_path / "memory.json"
+    try:
+        main([str(src), "-o", str(out), "--strict", "--memory-report", str(report)])
+    finally:
+        sys.modules.pop("mem_mod", None)
+    assert "phase " not in capsys.readouterr().err
+    assert "--memory-report" not in out.read_text()
+    data = json.loads(report.read_text())
+    module = data["modules"]["mem_mod"]
+    phases = module["phases"]
+    assert phases.keys() == {"import", "scan", "transform", "normalize", "emit"}
+    assert "transform_enums" in phases["transform"]["steps"]
+    assert phases["import"]["retained"] > 1_000_000
+    assert module["peak"] == phases["import"]["peak"]
+    top = phases["import"]["sites"][0]
+    assert top["site"] == f"{src}:3" and top["size"] > 1_000_000
+    assert data["phases"]["import"]["sites"][0] == top
+
+
+def test_memory_profiler_counts_only_its_phases() -> None:
+    import tracemalloc
+
+    profile = MemoryProfiler(top=1)
+    keep = [bytes(1000) for _ in range(1000)]
+    try:
+        with profile.phase("m", "scan_module"):
+            keep.extend(bytes(1000) for _ in range(100))
+        with profile.phase("m", "emit"):
+            pass
+    finally:
+        profile.close()
+    assert not tracemalloc.is_tracing()
+    phases = profile.report()["modules"]["m"]["phases"]
+    assert 100_000 <= phases["scan"]["retained"] < 200_000
+    assert len(phases["scan"]["sites"]) == 1
+    assert phases["emit"]["retained"] < 10_000
+
+
+def _make_import_pkgs(root: Path) -> None:
+    dep = root / "imp_dep_pkg"
+    dep.mkdir()
+    (dep / "__init__.py").write_text("from . import heavy\n")
+    (dep / "heavy.py").write_text("import time\ntime.sleep(0.02)\n")
+    proj = root / "imp_proj"
+    proj.mkdir()
+    (proj / "__init__.py").write_text("")
+    (proj / "a.py").write_text("import imp_dep_pkg\n\nX: int = 1\n")
+    (proj / "b.py").write_text("from .a import X\n\nY: int = X\n")
+
+
+def test_import_profiler_attributes_packages(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import importlib
+
+    from macrotype.profiling import ImportProfiler
+
+    _make_import_pkgs(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    meta_path = list(sys.meta_path)
+    profile = ImportProfiler()
+    try:
+        for name in ["imp_proj.a", "imp_proj.b"]:
+            with profile.measure(name):
+                importlib.import_module(name)
+        loaded = [sys.modules[name] for name in ["imp_proj.a", "imp_dep_pkg.heavy"]]
+        assert all(type(m.__loader__).__name__ == "SourceFileLoader" for m in loaded)
+        assert all(m.__spec__.loader is m.__loader__ for m in loaded)
+    finally:
+        for name in [m for m in sys.modules if m.startswith(("imp_proj", "imp_dep_pkg"))]:
+            del sys.modules[name]
+    assert sys.meta_path == meta_path
+    a, b = profile.imports["imp_proj.a"], profile.imports["imp_proj.b"]
+    assert a.modules == ["imp_proj", "imp_dep_pkg.heavy", "imp_dep_pkg", "imp_proj.a"]
+    assert b.modules == ["imp_proj.b"]
+    assert a.wall >= 0.02 > b.wall
+    packages = profile.by_package()
+    assert list(packages) == ["imp_dep_pkg"]
+    assert sorted(packages["imp_dep_pkg"].modules) == ["imp_dep_pkg", "imp_dep_pkg.heavy"]
+    assert 0.02 <= packages["imp_dep_pkg"].wall <= a.wall
+    assert profile.self_times["imp_dep_pkg.heavy"] >= 0.02 > profile.self_times["imp_dep_pkg"]
+
+
+def test_import_profiler_nests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import importlib
+
+    from macrotype.profiling import ImportProfiler
+
+    _make_import_pkgs(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    meta_path = list(sys.meta_path)
+    outer, inner = ImportProfiler(), ImportProfiler()
+    try:
+        with outer.measure("imp_proj.a"):
+            with inner.measure("imp_dep_pkg"):
+                importlib.import_module("imp_dep_pkg")
+            assert len(sys.meta_path) == len(meta_path) + 1
+            importlib.import_module("imp_proj.a")
+        heavy = sys.modules["imp_dep_pkg.heavy"]
+        assert type(heavy.__loader__).__name__ == "SourceFileLoader"
+    finally:
+        for name in [m for m in sys.modules if m.startswith(("imp_proj", "imp_dep_pkg"))]:
+            del sys.modules[name]
+    assert sys.meta_path == meta_path
+    assert inner.self_times["imp_dep_pkg.heavy"] >= 0.02
+    assert outer.self_times["imp_dep_pkg.heavy"] >= 0.02
+    assert "imp_proj.a" in outer.self_times and "imp_proj.a" not in inner.self_times
+
+
+def test_cli_import_profile(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    _make_import_pkgs(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    try:
+        main(["imp_proj", "-o", str(tmp_path / "out"), "--import-profile"])
+    finally:
+        for name in [m for m in sys.modules if m.startswith(("imp_proj", "imp_dep_pkg"))]:
+            del sys.modules[name]
+    lines = capsys.readouterr().err.splitlines()
+    imports = lines[lines.index(next(line for line in lines if line.startswith("import "))) :]
+    assert imports[1].split()[0] == "imp_proj.a"
+    assert imports[-1].split()[::2] == ["imp_dep_pkg", "2"]
+    assert "--import-profile" not in (tmp_path / "out/a.pyi").read_text()
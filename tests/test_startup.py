@@ -0,0 +1,89 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules that only stub generation needs; ``--help`` must not import them.
+HEAVY_MODULES = {
+    "macrotype.stubgen",
+    "macrotype.modules",
+    "macrotype.types",
+    "macrotype.cache",
+    "inspect",
+    "ast",
+    "tokenize",
+}
+
+ENTRY_POINTS = {
+    "macrotype": ("macrotype.cli", "main", "macrotype.cli.__main__"),
+    "macrotype-check": ("macrotype.cli", "check_main", "macrotype.cli.typecheck"),
+}
+
+
+def _import_times(module: str, func: str) -> tuple[dict[str, int], dict[str, int]]:
+    """Run ``func(['--help'])``, then import the stub generator, under ``-X importtime``.
+
+    Return the cumulative import times in microseconds of the modules loaded
+    by each step.  The stub generator is imported after the CLI, so its times
+    only cover what the CLI did not already load.
+    """
+    repo_root = Path(__file__).resolve().parents[1]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(repo_root)
+    code = (
+        f"import sys\nfrom {module} import {func}\n"
+        f"try:\n    {func}(['--help'])\nexcept SystemExit:\n    pass\n"
+        "print('---', file=sys.stderr)\n"
+        "import macrotype.stubgen\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    startup: dict[str, int] = {}
+    times = startup
+    for line in result.stderr.splitlines():
+        if line == "---":
+            times = {}
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return startup, times
+
+
+@pytest.mark.parametrize("script", sorted(ENTRY_POINTS))
+def test_help_skips_stub_generation_imports(script: str) -> None:
+    module, func, _ = ENTRY_POINTS[script]
+    startup, _ = _import_times(module, func)
+    assert not HEAVY_MODULES & startup.keys()
+
+
+@pytest.mark.parametrize("script", sorted(ENTRY_POINTS))
+def test_startup_import_budget(script: str) -> None:
+    # Both costs come from the same interpreter run, so a slow or busy
+    # machine scales them alike; an absolute budget in milliseconds did not.
+    module, func, command = ENTRY_POINTS[script]
+    runs = [_import_times(module, func) for _ in range(3)]
+    startup = min(times[module] + times[command] for times, _ in runs)
+    pipeline = min(times["macrotype.stubgen"] for _, times in runs)
+    assert startup < pipeline
+
+
+def test_cli_import_skips_stub_generation_imports() -> None:
+    repo_root = Path(__file__).resolve().parents[1]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(repo_root)
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, macrotype.cli; print(*sys.modules)"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert result.returncode == 0, result.stderr
+    assert not HEAVY_MODULES & set(result.stdout.split())
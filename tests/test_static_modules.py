@@ -0,0 +1,230 @@
+import ast
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.modules.static import dynamic_construct, static_module
+from macrotype.stubgen import WriteStats, process_directory
+
+STATIC = [
+    "import json\n\ndef f() -> int:\n    return json.loads('1')\n",
+    "from enum import Enum, auto\n\nclass C(Enum):\n    A = auto()\n",
+    "from dataclasses import dataclass, field\n\n@dataclass\nclass P:\n"
+    "    x: list[int] = field(default_factory=list)\n",
+    "class C:\n    @property\n    def x(self) -> int: ...\n    @x.setter\n"
+    "    def x(self, value: int) -> None: ...\n",
+    "X = frozenset({1, 2})\nY: 'dict[str, int]' = {}\n",
+    "def main() -> None: ...\n\nif __name__ == '__main__':\n    main()\n",
+    "from typing import TYPE_CHECKING\nif TYPE_CHECKING:\n    import json\n",
+    "import typing\nif typing.TYPE_CHECKING:\n    from json import loads\n",
+    "import typing as t\nfrom typing import NewType\n\nT = t.TypeVar('T')\n"
+    "UserId = NewType('UserId', int)\n",
+]
+
+DYNAMIC = [
+    ("import json\nX = json.dumps({})\n", "calls json.dumps"),
+    ("import numpy as np\n\ndef f() -> np.ndarray: ...\n", "uses 'np'"),
+    ("import numpy as np\n\ndef f() -> 'np.ndarray': ...\n", "uses 'np'"),
+    ("from .sibling import A\n", "import from .sibling"),
+    (
+        "from typing import TYPE_CHECKING\nif TYPE_CHECKING:\n    import json\nelse:\n    json = 1\n",
+        "If statement",
+    ),
+    ("TYPE_CHECKING = True\nif TYPE_CHECKING:\n    import json\n", "If statement"),
+    ("def make(): ...\nX = make()\n", "calls make"),
+    (
+        "from dataclasses import dataclass\ndataclass = print\n@dataclass\nclass C: ...\n",
+        "decorator",
+    ),
+    ("class C:\n    def __init_subclass__(cls): ...\n", "__init_subclass__"),
+    (
+        "from enum import Enum\nclass C(Enum):\n    A = 1\n    def __init__(self, v): ...\n",
+        "__init__",
+    ),
+    ("class C(metaclass=Meta): ...\n", "custom metaclass"),
+    ("X = [i for i in range(3)]\n", "ListComp"),
+    ("import json\njson = 1\n", "bound more than once"),
+    ("from operator import call\n\ndef boot() -> int: ...\n\nX: int = call(boot)\n", "calls call"),
+    ("import functools\nX = functools.reduce(max, [1, 2])\n", "calls functools.reduce"),
+    ("from operator import methodcaller\nM = methodcaller('run')\n", "calls methodcaller"),
+]
+
+
+@pytest.mark.parametrize("code", STATIC)
+def test_static_modules_have_no_dynamic_construct(code: str) -> None:
+    assert dynamic_construct(ast.parse(code)) is None
+
+
+@pytest.mark.parametrize(("code", "reason"), DYNAMIC)
+def test_dynamic_construct_reason(code: str, reason: str) -> None:
+    found = dynamic_construct(ast.parse(code))
+    assert found is not None and reason in found
+
+
+def test_static_module_uses_placeholders(tmp_path: Path) -> None:
+    src = tmp_path / "static_mod.py"
+    src.write_text("import hyb_not_installed\n\ndef f() -> int:\n    return 1\n")
+    with static_module("static_mod", src, ast.parse(src.read_text())) as module:
+        assert sys.modules["static_mod"] is module
+        assert module.hyb_not_installed.__name__ == "hyb_not_installed"
+        assert module.f.__module__ == "static_mod"
+    assert "static_mod" not in sys.modules
+    assert "hyb_not_installed" not in sys.modules
+
+
+def test_hybrid_matches_import(tmp_packages, tmp_path: Path) -> None:
+    a = (
+        "import json\nfrom enum import Enum\n\nclass Mode(Enum):\n    ON = 1\n\n"
+        "def dump(mode: Mode = Mode.ON) -> str:\n    return json.dumps(mode.value)\n"
+    )
+    files = {
+        "a.py": a,
+        "b.py": "from .a import Mode\n\nDEFAULT: Mode = Mode.ON\n",
+        # Dynamic itself, so it is imported along with d in any order.
+        "c.py": "from .d import LOADED\n\nX = LOADED.bit_length()\n",
+        "d.py": "import json\n\nLOADED = json.loads('1')\n",
+        "e.py": "from hyb_pkg.a import Mode\nfrom .b import DEFAULT\n\n"
+        "class Sub:\n    mode: Mode = DEFAULT\n",
+    }
+    pkg = tmp_packages.make("hyb_pkg", files)
+    imported = process_directory(pkg, tmp_path / "imported", command="macrotype hyb_pkg")
+    tmp_packages.forget()
+    stats = WriteStats()
+    hybrid = process_directory(
+        pkg, tmp_path / "hybrid", command="macrotype hyb_pkg", stats=stats, hybrid=True
+    )
+    assert sorted(m for m in sys.modules if m.startswith("hyb_pkg.")) == ["hyb_pkg.c", "hyb_pkg.d"]
+
+    for p, q in zip(imported, hybrid, strict=True):
+        assert q.read_bytes() == p.read_bytes()
+    assert (stats.static, stats.imported) == (4, 2)
+    assert stats.summary().endswith("; 4 module(s) stubbed statically, 2 imported")
+
+
+def test_static_sibling_modules_are_not_kept(tmp_packages, tmp_path: Path) -> None:
+    b = "from .a import Base\n\nclass User(Base):\n    y: str\n"
+    pkg = tmp_packages.make("hyb_sib", {"a.py": "class Base:\n    x: int\n", "b.py": b})
+    tree = ast.parse(b)
+    assert dynamic_construct(tree, "hyb_sib.b", pkg / "b.py") is None
+    with static_module("hyb_sib.b", pkg / "b.py", tree) as module:
+        assert sys.modules["hyb_sib.a"].Base is module.Base
+        assert module.Base.__module__ == "hyb_sib.a"
+    assert not [m for m in sys.modules if m.startswith("hyb_sib")]
+
+
+def test_imported_modules_are_static_to_import_from(tmp_packages) -> None:
+    b = "from .a import X\nfrom os import sep\n\ndef f() -> X: ...\n"
+    pkg = tmp_packages.make("hyb_imp", {"a.py": "import json\n\nX = json.loads('1')\n", "b.py": b})
+    found = dynamic_construct(ast.parse(b), "hyb_imp.b", pkg / "b.py")
+    assert found is not None and "import from dynamic hyb_imp.a" in found
+
+    a = importlib.import_module("hyb_imp.a")
+    assert dynamic_construct(ast.parse(b), "hyb_imp.b", pkg / "b.py") is None
+    with static_module("hyb_imp.b", pkg / "b.py", ast.parse(b)) as module:
+        assert module.X == a.X
+    assert sys.modules["hyb_imp.a"] is a
+
+
+@pytest.mark.parametrize(
+    ("a", "b", "reason"),
+    [
+        (
+            "import json\nX = json.dumps({})\n",
+            "from .a import X\n",
+            "import from dynamic hyb_dyn.a",
+        ),
+        ("X = 1\n", "from .a import X, Y\n", "'Y' is not defined by hyb_dyn.a"),
+        ("import json\n", "from .a import json\n", "'json' is not defined by hyb_dyn.a"),
+        ("from .b import Y\nX = 1\n", "from .a import X\nY = 1\n", "circular import of hyb_dyn.b"),
+        (None, "from .a import X\n", "import from hyb_dyn.a"),
+        ("X = 1\n", "from .a import *\n", "star import"),
+    ],
+)
+def test_project_import_reason(tmp_packages, a: str | None, b: str, reason: str) -> None:
+    pkg = tmp_packages.make("hyb_dyn", {"b.py": b} if a is None else {"a.py": a, "b.py": b})
+    found = dynamic_construct(ast.parse(b), "hyb_dyn.b", pkg / "b.py")
+    assert found is not None and reason in found
+
+
+def test_hybrid_skips_missing_dependencies(
+    tmp_packages, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+):
+    m = "import hyb_not_installed\n\ndef f(x: int) -> int:\n    return x\n"
+    pkg = tmp_packages.make("hyb_missing", {"m.py": m})
+    assert process_directory(pkg, tmp_path / "imported") == [tmp_path / "imported/__init__.pyi"]
+    assert "No module named 'hyb_not_installed'" in capsys.readouterr().err
+    out = process_directory(pkg, tmp_path / "hybrid", hybrid=True)
+    assert tmp_path / "hybrid/m.pyi" in out
+    assert (tmp_path / "hybrid/m.pyi").read_text().splitlines()[-1] == "def f(x: int) -> int: ..."
+
+
+def test_failed_static_run_is_undone(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    from macrotype import modules, stubgen
+    from macrotype.meta_types import _OVERLOAD_REGISTRY
+
+    src = tmp_path / "hyb_overloads.py"
+    src.write_text(
+        "from typing import overload\n\n@overload\ndef f(x: int) -> int: ...\n"
+        "@overload\ndef f(x: str) -> str: ...\ndef f(x): return x\n"
+    )
+    from_module, load_module = modules.from_module, stubgen.load_module
+    before_import = []
+
+    def fail_static(module, **kwargs):
+        if not before_import:
+            raise RuntimeError("static scan failed")
+        return from_module(module, **kwargs)
+
+    def load(name, **kwargs):
+        before_import.append((name in sys.modules, name in _OVERLOAD_REGISTRY))
+        return load_module(name, **kwargs)
+
+    monkeypatch.setattr(modules, "from_module", fail_static)
+    monkeypatch.setattr(stubgen, "load_module", load)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    try:
+        stubgen.process_file(src, tmp_path / "hyb_overloads.pyi", hybrid=True, debug_failure=True)
+    finally:
+        sys.modules.pop("hyb_overloads", None)
+        _OVERLOAD_REGISTRY.pop("hyb_overloads", None)
+    assert before_import == [(False, False)]
+    assert (tmp_path / "hyb_overloads.pyi").read_text().count("@overload") == 2
+    err = capsys.readouterr().err
+    assert "static stub failed" in err and "RuntimeError: static scan failed" in err
+
+
+@pytest.mark.parametrize(
+    "src", sorted(Path(__file__).parent.glob("annotations*.py")), ids=lambda p: p.stem
+)
+def test_hybrid_stubs_match_imported_stubs(tmp_path: Path, src: Path) -> None:
+    from macrotype.stubgen import process_file
+
+    name = f"tests.{src.stem}"
+    loaded = sys.modules.pop(name, None)
+    stats = WriteStats()
+    try:
+        try:
+            imported = process_file(src, tmp_path / "imported.pyi", command="macrotype")
+        except ModuleNotFoundError as exc:
+            pytest.skip(str(exc))
+        sys.modules.pop(name, None)
+        hybrid = process_file(
+            src, tmp_path / "hybrid.pyi", command="macrotype", stats=stats, hybrid=True
+        )
+    finally:
+        sys.modules.pop(name, None)
+        if loaded is not None:
+            sys.modules[name] = loaded
+    assert hybrid.read_bytes() == imported.read_bytes()
+    assert stats.static == (dynamic_construct(ast.parse(src.read_text())) is None)
+
+
+def test_hybrid_is_kept_in_header() -> None:
+    from macrotype.cli import EXECUTION_FLAGS, EXECUTION_OPTIONS, _strip_options
+
+    argv = ["pkg", "--hybrid", "--jobs", "2"]
+    assert _strip_options(argv, EXECUTION_OPTIONS, EXECUTION_FLAGS) == ["pkg", "--hybrid"]
@@ -0,0 +1,96 @@
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.cli.warm import WarmWorker
+
+
+@pytest.fixture
+def project(tmp_packages) -> Path:
+    return tmp_packages.make(
+        "warm_pkg",
+        {
+            "base.py": "class Base:\n    x: int\n",
+            "user.py": "from .base import Base\n\nVALUE: Base = Base()\n",
+            "other.py": "Y = 1\n",
+        },
+    )
+
+
+def _worker(pkg: Path, calls: list[str]) -> WarmWorker:
+    from macrotype import stubgen
+
+    def regenerate(src: Path) -> None:
+        calls.append(src.name)
+        stubgen.load_module(stubgen._module_name_from_path(src))
+
+    def regenerate_all() -> None:
+        for src in stubgen.iter_python_files(pkg):
+            regenerate(src.resolve())
+
+    return WarmWorker([pkg], regenerate, regenerate_all)
+
+
+def test_update_regenerates_changed_module_and_dependents(project: Path) -> None:
+    calls: list[str] = []
+    worker = _worker(project, calls)
+    assert worker.start()
+    other = sys.modules["warm_pkg.other"]
+
+    calls.clear()
+    (project / "base.py").write_text("class Base:\n    x: int\n    y: str\n")
+    assert worker.update({project / "base.py"})
+    assert sorted(calls) == ["base.py", "user.py"]
+    assert sys.modules["warm_pkg.other"] is other
+    assert sys.modules["warm_pkg.user"].Base is sys.modules["warm_pkg.base"].Base
+    assert "y" in sys.modules["warm_pkg.base"].Base.__annotations__
+
+
+def test_broken_module_is_skipped_warm(
+    project: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    from macrotype.cli.__main__ import _warm_worker
+
+    monkeypatch.chdir(tmp_path)
+    (project / "abad.py").write_text("raise ValueError('boom')\n")
+    out = tmp_path / "out"
+    args = argparse.Namespace(
+        paths=[str(project)], output=str(out), strict=False, allow_type_checking=False
+    )
+    worker = _warm_worker(args, "macrotype warm_pkg")
+    assert worker.start()
+    assert f"Skipping {project / 'abad.py'}: boom" in capsys.readouterr().err
+    assert sorted(p.name for p in out.iterdir()) == [
+        "__init__.pyi",
+        "base.pyi",
+        "other.pyi",
+        "user.pyi",
+    ]
+    other = sys.modules["warm_pkg.other"]
+
+    (project / "base.py").write_text("class Base:\n    y: str\n")
+    assert worker.update({project / "base.py"})
+    assert "y: str" in (out / "base.pyi").read_text()
+    assert sys.modules["warm_pkg.other"] is other
+
+    assert worker.update({project / "abad.py"})
+    assert "boom" in capsys.readouterr().err
+
+
+def test_failed_update_drops_project_modules(project: Path) -> None:
+    calls: list[str] = []
+    worker = _worker(project, calls)
+    assert worker.start()
+
+    (project / "base.py").write_text("raise RuntimeError('broken')\n")
+    assert not worker.update({project / "base.py"})
+    assert not worker.project_modules()
+
+    (project / "base.py").write_text("class Base:\n    z: bytes\n")
+    assert worker.update({project / "base.py"})
+    assert "z" in sys.modules["warm_pkg.base"].Base.__annotations__
@@ -4,10 +4,17 @@ import threading
 import time
 from pathlib import Path
 
-from macrotype.cli.watch import watch_and_run
+import pytest
 
+from macrotype.cli.watch import PollingWatcher, make_watcher, watch_and_run
 
-def test_watch_and_run_regenerates(tmp_path: Path) -> None:
+linux_only = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is Linux only"
+)
+
+
+@pytest.mark.parametrize("backend", ["auto", "poll"])
+def test_watch_and_run_regenerates(tmp_path: Path, backend: str) -> None:
     src = tmp_path / "m.py"
     src.write_text("a=1\n")
     dest = tmp_path / "out.pyi"
@@ -24,7 +31,13 @@ def test_watch_and_run_regenerates(tmp_path: Path) -> None:
     thread = threading.Thread(
         target=watch_and_run,
         args=([src], cmd),
-        kwargs={"interval": 0.1, "stop_event": stop, "cwd": tmp_path, "env": env},
+        kwargs={
+            "interval": 0.1,
+            "stop_event": stop,
+            "cwd": tmp_path,
+            "env": env,
+            "backend": backend,
+        },
         daemon=True,
     )
     thread.start()
@@ -47,3 +60,54 @@ def test_watch_and_run_regenerates(tmp_path: Path) -> None:
     finally:
         stop.set()
         thread.join(5)
+
+
+@linux_only
+def test_inotify_reports_exact_paths_and_coalesces(tmp_path: Path) -> None:
+    from macrotype.cli.inotify import InotifyWatcher
+
+    (tmp_path / "pkg").mkdir()
+    a = tmp_path / "pkg" / "a.py"
+    b = tmp_path / "b.py"
+    a.write_text("A = 1\n")
+    b.write_text("B = 1\n")
+    with InotifyWatcher([tmp_path], debounce=0.2) as watcher:
+        assert watcher.wait(0.05) == set()
+        # An editor-style save burst: several writes plus an atomic rename.
+        for i in range(3):
+            a.write_text(f"A = {i}\n")
+        tmp = tmp_path / "pkg" / ".a.py.swp"
+        tmp.write_text("A = 9\n")
+        tmp.rename(a)
+        (tmp_path / "notes.txt").write_text("ignored")
+        assert watcher.wait(2) == {a}
+
+        new_dir = tmp_path / "sub"
+        new_dir.mkdir()
+        assert watcher.wait(0.5) == set()
+        c = new_dir / "c.py"
+        c.write_text("C = 1\n")
+        assert watcher.wait(2) == {c}
+
+
+@linux_only
+def test_make_watcher_prefers_inotify(tmp_path: Path) -> None:
+    from macrotype.cli.inotify import InotifyWatcher
+
+    watcher = make_watcher([tmp_path])
+    try:
+        assert isinstance(watcher, InotifyWatcher)
+    finally:
+        watcher.close()
+    assert isinstance(make_watcher([tmp_path], backend="poll"), PollingWatcher)
+
+
+def test_polling_watcher_reports_changed_files(tmp_path: Path) -> None:
+    a = tmp_path / "a.py"
+    a.write_text("A = 1\n")
+    watcher = PollingWatcher([tmp_path], interval=0.01)
+    assert watcher.wait() == set()
+    b = tmp_path / "b.py"
+    b.write_text("B = 1\n")
+    os.utime(a, (0, 0))
+    assert watcher.wait() == {a, b}
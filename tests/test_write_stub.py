@@ -0,0 +1,116 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import pytest
+
+from macrotype.stubgen import WriteStats, process_directory, process_file, write_stub
+
+
+def test_write_stub_skips_identical_content(tmp_path: Path) -> None:
+    dest = tmp_path / "pkg" / "mod.pyi"
+    assert write_stub(dest, ["X: int"], "macrotype mod")
+    before = dest.stat().st_mtime_ns
+    assert not write_stub(dest, ["X: int"], "macrotype mod")
+    assert dest.stat().st_mtime_ns == before
+    assert write_stub(dest, ["X: str"], "macrotype mod")
+    assert dest.read_text().splitlines()[-1] == "X: str"
+    assert list(dest.parent.iterdir()) == [dest]
+
+
+def test_write_stub_streams_lines(tmp_path: Path) -> None:
+    dest = tmp_path / "mod.pyi"
+    assert write_stub(dest, (f"X{i}: int" for i in range(3)))
+    assert dest.read_text() == "X0: int\nX1: int\nX2: int\n"
+    assert not write_stub(dest, iter(["X0: int", "X1: int", "X2: int"]))
+    assert write_stub(dest, iter(["X0: int", "X1: int"]))
+    assert dest.read_text() == "X0: int\nX1: int\n"
+    assert write_stub(dest, iter(["X0: int", "X1: str", "X2: int"]))
+    assert dest.read_text() == "X0: int\nX1: str\nX2: int\n"
+    assert write_stub(dest, iter([]))
+    assert dest.read_text() == "\n"
+    assert list(tmp_path.iterdir()) == [dest]
+
+
+def test_write_stub_rewrites_other_line_endings(tmp_path: Path) -> None:
+    dest = tmp_path / "mod.pyi"
+    dest.write_bytes(b"X: int\r\n")
+    assert write_stub(dest, ["X: int"])
+    assert dest.read_bytes() == b"X: int\n"
+    assert not write_stub(dest, ["X: int"])
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_write_stub_permissions(tmp_path: Path) -> None:
+    umask = os.umask(0o022)
+    try:
+        new = tmp_path / "new.pyi"
+        write_stub(new, ["X: int"])
+        assert stat.S_IMODE(new.stat().st_mode) == 0o644
+        old = tmp_path / "old.pyi"
+        old.write_text("X: str\n")
+        old.chmod(0o640)
+        assert write_stub(old, ["X: int"])
+        assert stat.S_IMODE(old.stat().st_mode) == 0o640
+    finally:
+        os.umask(umask)
+
+
+def test_process_file_streams_uncached_stubs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import macrotype.depgraph as depgraph
+    import macrotype.modules as modules
+    from macrotype.modules import emit
+
+    streamed: list[str] = []
+    iter_emit_module = modules.iter_emit_module
+
+    def spy(mi):
+        streamed.append(mi.obj.__name__)
+        return iter_emit_module(mi)
+
+    def no_deps(mi):
+        raise AssertionError("dependencies computed without a graph")
+
+    monkeypatch.setattr(modules, "iter_emit_module", spy)
+    monkeypatch.setattr(depgraph, "module_dependencies", no_deps)
+    # Every rendered declaration spills to disk.
+    monkeypatch.setattr(emit, "SPOOL_MAX", 1)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    src = tmp_path / "stream_mod.py"
+    src.write_text("from pathlib import Path\n\nX: int = 1\n\ndef f(p: Path) -> None: ...\n")
+    try:
+        process_file(src)
+    finally:
+        sys.modules.pop("stream_mod", None)
+    assert (tmp_path / "stream_mod.pyi").read_text() == (
+        "from pathlib import Path\n\nX: int\n\ndef f(p: Path) -> None: ...\n"
+    )
+    assert streamed == ["stream_mod"]
+
+
+def test_process_directory_reports_untouched(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "write_stats_a.py").write_text("A = 1\n")
+    (src / "write_stats_b.py").write_text("B = 'b'\n")
+    out = tmp_path / "out"
+    monkeypatch.syspath_prepend(str(src))
+
+    first = WriteStats()
+    process_directory(src, out, stats=first)
+    assert (first.written, first.unchanged) == (2, 0)
+
+    (src / "write_stats_b.py").write_text("B = 2\n")
+    for name in ("write_stats_a", "write_stats_b"):
+        sys.modules.pop(name, None)
+    second = WriteStats()
+    process_directory(src, out, stats=second)
+    assert (second.written, second.unchanged) == (1, 1)
+    assert second.summary() == "1 stub(s) written, 1 unchanged"
+    for name in ("write_stats_a", "write_stats_b"):
+        sys.modules.pop(name, None)
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import copy
+import gc
+import pickle
+from dataclasses import replace
+
 from macrotype.types.ir import (
     Ty,
+    TyAnnoTree,
     TyApp,
+    TyLiteral,
     TyType,
     TyUnion,
     has_type_member,
+    interned_count,
     strip_type_members,
 )
 
@@ -88,3 +96,65 @@ def test_has_and_strip_helpers() -> None:
     stripped = strip_type_members(u, {type(None)})
     assert stripped.base_type is int
     assert stripped.union_types == (t_int(),)
+
+
+# ---------- Interning --------------------------------------------------------
+
+
+def test_identical_nodes_are_shared() -> None:
+    assert t_list(t_int()) is t_list(t_int())
+    assert t_dict(t_int(), t_list(t_none())) is t_dict(t_int(), t_list(t_none()))
+    assert t_list(t_int()) is not t_list(t_none())
+    annotated = replace(t_int(), annotations=TyAnnoTree(annos=("meta",)))
+    assert annotated is replace(t_int(), annotations=TyAnnoTree(annos=("meta",)))
+    assert annotated is not t_int()
+    assert copy.deepcopy(annotated) is annotated
+    assert pickle.loads(pickle.dumps(t_list(t_int()))) is t_list(t_int())
+
+
+def test_interning_distinguishes_equal_values_of_other_types() -> None:
+    assert TyLiteral(values=(1,)) is TyLiteral(values=(1,))
+    assert TyLiteral(values=(1,)) is not TyLiteral(values=(True,))
+    assert TyType(type_=int | str) is not TyType(type_=str | int)
+
+
+def test_equality_stays_structural() -> None:
+    # ``list[int]`` builds a new alias each time, so these are not interned
+    # together but still compare and hash like the dataclasses they are.
+    a, b = TyType(type_=list[int]), TyType(type_=list[int])
+    assert a is not b
+    assert a == b
+    assert hash(a) == hash(b)
+    assert t_list(a) == t_list(b)
+    assert len({a, b}) == 1
+    assert TyType(type_=int) != TyType(type_=str)
+    assert TyType(type_=int) != TyLiteral(values=(int,))
+
+
+def test_interned_nodes_are_released() -> None:
+    class Local:
+        pass
+
+    # Shared with other list nodes; keep it alive so only Local's nodes go.
+    list_type = TyType(type_=list)
+    node = t_list(TyType(type_=Local))
+    node.memo["test"] = "cached"
+    assert t_list(TyType(type_=Local)).memo["test"] == "cached"
+    gc.collect()
+    before = interned_count()
+    del node
+    gc.collect()
+    assert interned_count() == before - 2
+    assert t_list(t_int()).base is list_type
+
+
+def test_ty_key_matches_repr_and_is_cached() -> None:
+    from macrotype.types.ir import TyCallable, ty_key
+
+    node = TyUnion(options=(t_list(t_int()), TyLiteral(values=("a", (1, None)))))
+    call = TyCallable(params=(node,), ret=t_dict(t_int(), node))
+    assert ty_key(call) == repr(call)
+    assert ty_key(TyCallable(params=Ellipsis, ret=t_int())) == repr(
+        TyCallable(params=Ellipsis, ret=t_int())
+    )
+    assert node.memo["key"] == repr(node)
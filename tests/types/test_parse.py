@@ -278,3 +278,42 @@ def test_union_order_insensitive():
 def test_inner_final_disallowed():
     with pytest.raises(ValueError):
         parse(list[t.Final[int]])
+
+
+def test_parse_cache_is_bounded_and_identity_safe():
+    from macrotype.types.parse import ParseCache, ParseEnv
+
+    cache = ParseCache(maxsize=2)
+    env = ParseEnv()
+    calls: list[object] = []
+
+    def compute(tp, env):
+        calls.append(tp)
+        return TyType(type_=tp)
+
+    first, second, third = list[int], list[str], list[bytes]
+    assert cache.get(first, env, compute) == TyType(type_=first)
+    cache.get(second, env, compute)
+    cache.get(first, env, compute)
+    cache.get(third, env, compute)  # evicts ``second``, the least recently used
+    cache.get(second, env, compute)
+    assert calls == [first, second, third, second]
+    assert cache.info() == (1, 4, 2, 2)
+    # Entries keep their key alive, so an id cannot be reused for another object.
+    assert all(key[0] == id(tp) for key, (tp, _) in cache._entries.items())
+
+    cache.maxsize = 1
+    assert cache.info().currsize == 1
+    cache.clear()
+    assert cache.info() == (0, 0, 1, 0)
+
+
+def test_parse_env_with_typevars_is_cacheable():
+    from macrotype.types.parse import ParseEnv, parse_cache
+
+    tv = TyTypeVar(name="T", bound=None, constraints=(), cov=False, contrav=False)
+    env = ParseEnv(typevars={"T": tv})
+    before = parse_cache.info()
+    assert parse(list[int], env) == parse(list[int], env)
+    after = parse_cache.info()
+    assert after.hits > before.hits
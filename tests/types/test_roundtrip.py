@@ -23,3 +23,26 @@ def test_callable_concatenate_roundtrip():
     P = t.ParamSpec("P")
     ann = t.Callable[t.Concatenate[int, P], int]
     assert repr(unparse_top(from_type(ann))) == repr(ann)
+
+
+def test_normalize_many_dedupes_by_identity_and_context(monkeypatch) -> None:
+    import macrotype.types as types_mod
+    from macrotype.types.validate import TypeValidationError
+
+    calls: list[tuple[object, str]] = []
+    orig = types_mod.normalize_annotation
+
+    def counting(obj, *, ctx="top"):
+        calls.append((obj, ctx))
+        return orig(obj, ctx=ctx)
+
+    monkeypatch.setattr(types_mod, "normalize_annotation", counting)
+    opt = int | None
+    anns = [opt, str, opt, t.List[int], opt, str]
+    out = types_mod.normalize_many(anns, ctx=["top", "top", "top", "top", "call_params", "top"])
+    assert out == [None | int, str, None | int, list[int], None | int, str]
+    assert out[0] is out[2]
+    assert calls == [(opt, "top"), (str, "top"), (t.List[int], "top"), (opt, "call_params")]
+
+    with pytest.raises(TypeValidationError):
+        types_mod.normalize_many([int, tuple[..., int]])